@@ -0,0 +1,155 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from config import Config
+from prompts import estimate_tokens
+
+
+# Caps the number of model calls in flight across every upload handled by this process
+_process_slots = threading.BoundedSemaphore(Config.MAX_CONCURRENT_MODEL_CALLS)
+
+
+def run_limited(func, *args, **kwargs):
+    """Run a model call while holding one of the process-wide slots"""
+    with _process_slots:
+        return func(*args, **kwargs)
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one; later callers wait for its result.
+
+    Keys are only held while a call is in flight, so this deduplicates work
+    within a process and leaves caching of finished results to the caller.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, func, *args):
+        """Return func(*args), or the result of the identical call already in flight"""
+        return self.run_many([key], lambda _items: [func(*args)], [None])[0]
+
+    def run_many(self, keys, func, items):
+        """Return one result per item, calling func(owned_items) only for keys nobody is computing.
+
+        `func` receives the items whose keys this caller claimed (each key
+        once) and must return their results in the same order; results for
+        keys claimed by other callers are awaited.
+        """
+        futures = {}
+        owned = []
+        with self._lock:
+            for key in keys:
+                if key in futures:
+                    continue
+                future = self._calls.get(key)
+                if future is None:
+                    future = self._calls[key] = Future()
+                    owned.append(key)
+                futures[key] = future
+
+        if owned:
+            first_item = {}
+            for key, item in zip(keys, items):
+                first_item.setdefault(key, item)
+            try:
+                results = list(func([first_item[key] for key in owned]))
+                if len(results) != len(owned):
+                    raise ValueError(f"Expected {len(owned)} results, got {len(results)}")
+            except BaseException as e:
+                for key in owned:
+                    futures[key].set_exception(e)
+                raise
+            else:
+                for key, result in zip(owned, results):
+                    futures[key].set_result(result)
+            finally:
+                with self._lock:
+                    for key in owned:
+                        del self._calls[key]
+
+        return [futures[key].result() for key in keys]
+
+
+def pack_clause_batches(clauses, token_budget=None, max_clauses=None):
+    """Group consecutive clauses into batches that fit the prompt token budget"""
+    if token_budget is None:
+        token_budget = Config.CLAUSE_BATCH_TOKEN_BUDGET
+    if max_clauses is None:
+        max_clauses = Config.CLAUSE_BATCH_MAX_CLAUSES
+
+    batches = []
+    current = []
+    current_tokens = 0
+    for clause in clauses:
+        # Clause text is fitted to CLAUSE_TOKEN_BUDGET in the prompt, as in analyze_clause
+        tokens = min(estimate_tokens(clause["content"]), Config.CLAUSE_TOKEN_BUDGET)
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_clauses):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(clause)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _analyze_single(analyze, clause_text):
+    """Adapt a single-clause analyzer to the batch result shape"""
+    return [analyze(clause_text)]
+
+
+def iter_analysis(text, clauses, summarize, analyze, max_workers=None, analyze_batch=None, summarize_last=False):
+    """Summarize the document and analyze every clause concurrently, yielding as work finishes.
+
+    `summarize(text)` returns the document summary and `analyze(clause_text)`
+    returns a (summary, risk) pair, so a fake model client with injected
+    latency can be passed in place of the Gemini-backed functions. When
+    `analyze_batch(clause_texts)` is given, clauses are packed into batches
+    and each batch is analyzed with a single call instead. With
+    `summarize_last` the summary is only started once every clause is
+    analyzed, so it can be built from their results.
+
+    Yields ("summary", summary_text) once and ("clause", clause) for every
+    clause, in completion order. Clauses are updated in place.
+    """
+    if max_workers is None:
+        max_workers = Config.MAX_CONCURRENT_ANALYSES_PER_UPLOAD
+    max_workers = max(1, min(max_workers, len(clauses) + 1))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+    try:
+        futures = {} if summarize_last else {executor.submit(run_limited, summarize, text): None}
+        if analyze_batch is not None:
+            for batch in pack_clause_batches(clauses):
+                future = executor.submit(run_limited, analyze_batch, [clause["content"] for clause in batch])
+                futures[future] = batch
+        else:
+            for clause in clauses:
+                futures[executor.submit(run_limited, _analyze_single, analyze, clause["content"])] = [clause]
+
+        for future in as_completed(futures):
+            batch = futures[future]
+            if batch is None:
+                yield "summary", future.result()
+                continue
+            for clause, (summary, risk) in zip(batch, future.result()):
+                clause["summary"], clause["risk"] = summary, risk
+                yield "clause", clause
+
+        if summarize_last:
+            yield "summary", run_limited(summarize, text)
+    finally:
+        # Drop queued work if the consumer stops early (e.g. a closed stream)
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def analyze_document(text, clauses, summarize, analyze, max_workers=None, analyze_batch=None, summarize_last=False):
+    """Run iter_analysis to completion and return (summary, clauses) in document order"""
+    summary = ""
+    for kind, payload in iter_analysis(text, clauses, summarize, analyze, max_workers, analyze_batch, summarize_last):
+        if kind == "summary":
+            summary = payload
+    return summary, clauses
@@ -0,0 +1,167 @@
+import re
+import threading
+
+from cache import content_key
+from retrieval import STOPWORDS
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Capitalized words past the start of a sentence: names of parties, products, places
+_NAME_RE = re.compile(r"(?<![.!?]\s)(?<!^)\b[A-Z][A-Za-z0-9]+")
+
+# Stopwords for retrieval, but they decide what a question asks ("when" vs "where")
+_QUESTION_WORDS = frozenset(['how', 'what', 'when', 'where', 'which', 'who', 'why'])
+
+# Words that flip or pin down what a question asks; near-duplicates must agree on all of them
+_NEGATIONS = frozenset(['not', 'no', 'never', 'without', 'nor', 'neither', 'none', 'unless', 'except'])
+_NUMBER_WORDS = frozenset([
+    'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten', 'eleven', 'twelve',
+    'first', 'second', 'third', 'fourth', 'fifth', 'last', 'half', 'hundred', 'thousand', 'million',
+])
+_PARTY_WORDS = frozenset([
+    'landlord', 'tenant', 'lessor', 'lessee', 'buyer', 'seller', 'purchaser', 'vendor', 'employer',
+    'employee', 'contractor', 'client', 'customer', 'supplier', 'licensor', 'licensee', 'lender',
+    'borrower', 'guarantor', 'party', 'me', 'we', 'us', 'they', 'them', 'he', 'she', 'him', 'her',
+])
+
+# Contractions folded before tokenizing so "what's" and "what is" normalize alike
+_CONTRACTIONS = [
+    (re.compile(r"\bcannot\b"), "can not"),
+    (re.compile(r"\bcan'?t\b"), "can not"),
+    (re.compile(r"\bwon'?t\b"), "will not"),
+    (re.compile(r"n't\b"), " not"),
+    (re.compile(r"\b(what|that|there|it|who|where|how|when)'?s\b"), r"\1"),
+    (re.compile(r"'(s|re|ll|ve|d|m)\b"), ""),
+]
+
+
+def _stem(token):
+    """Very light stemming: fold plain plurals"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def normalize_question(question):
+    """Content words of a question, lowercased, de-contracted and stemmed, in order"""
+    text = question.lower().replace('’', "'")
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    return [_stem(token) for token in _TOKEN_RE.findall(text)
+            if token not in STOPWORDS or token in _QUESTION_WORDS]
+
+
+def question_shingles(tokens):
+    """Unigrams plus bigrams, so word order still matters ("landlord pays tenant" vs "tenant pays landlord")"""
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def decisive_terms(question, tokens):
+    """Numbers, negations, parties, question words and names in a question.
+
+    Changing any one of these changes what is asked, however similar the
+    rest of the wording is.
+    """
+    terms = {token for token in tokens if token.isdigit() or token in _NEGATIONS or token in _NUMBER_WORDS
+             or token in _PARTY_WORDS or token in _QUESTION_WORDS}
+    terms.update(_stem(name.lower()) for name in _NAME_RE.findall(question.strip()))
+    return terms
+
+
+def similarity(a, b):
+    """Jaccard similarity of two shingle sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class AnswerCache:
+    """Answers keyed by document content hash, normalized question and target language.
+
+    Only the same normalized question is served a cached answer unless
+    `fuzzy` is set. Then a question whose shingles are at least `threshold`
+    similar to one already answered for the same document, and which has
+    the same decisive terms, is served that answer too. Entries live in a
+    ResultCache.
+    """
+
+    def __init__(self, cache, version, threshold=0.9, fuzzy=False, max_questions=200):
+        self.cache = cache
+        self.version = version
+        self.threshold = threshold
+        self.fuzzy = fuzzy
+        self.max_questions = max_questions
+        self.counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def _answer_key(self, document_hash, normalized, language):
+        return content_key('answer', self.version, document_hash, normalized, language)
+
+    def _index_key(self, document_hash):
+        # Entries are [normalized question, decisive terms]
+        return content_key('questions-v2', self.version, document_hash)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, document_hash, question, language):
+        """Return the cached answer for this or a near-duplicate question, or None"""
+        tokens = normalize_question(question)
+        if not tokens:
+            self._count("misses")
+            return None
+
+        normalized = ' '.join(tokens)
+        answer = self.cache.get(self._answer_key(document_hash, normalized, language))
+        if answer is not None:
+            self._count("exact_hits")
+            return answer
+        if not self.fuzzy:
+            self._count("misses")
+            return None
+
+        shingles = question_shingles(tokens)
+        terms = decisive_terms(question, tokens)
+        best, best_score = None, 0.0
+        for candidate, candidate_terms in self.cache.get(self._index_key(document_hash)) or []:
+            if candidate == normalized or set(candidate_terms) != terms:
+                continue
+            score = similarity(shingles, question_shingles(candidate.split(' ')))
+            if score > best_score:
+                best, best_score = candidate, score
+
+        if best is not None and best_score >= self.threshold:
+            answer = self.cache.get(self._answer_key(document_hash, best, language))
+            if answer is not None:
+                self._count("similar_hits")
+                return answer
+
+        self._count("misses")
+        return None
+
+    def set(self, document_hash, question, language, answer):
+        """Store an answer and remember the question for near-duplicate matching"""
+        tokens = normalize_question(question)
+        if not tokens:
+            return
+
+        normalized = ' '.join(tokens)
+        self.cache.set(self._answer_key(document_hash, normalized, language), answer)
+        if not self.fuzzy:
+            return
+
+        with self._lock:
+            index_key = self._index_key(document_hash)
+            questions = self.cache.get(index_key) or []
+            if normalized not in [candidate for candidate, _terms in questions]:
+                questions.append([normalized, sorted(decisive_terms(question, tokens))])
+                self.cache.set(index_key, questions[-self.max_questions:])
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = sum(stats.values())
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["similar_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
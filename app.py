@@ -1,496 +1,645 @@
-from flask import Flask, render_template, request, jsonify, session
-from flask_cors import CORS
 import os
-import PyPDF2
-import docx
-import google.generativeai as genai
-from xhtml2pdf import pisa
+import sys
+
+if __name__ == '__main__':
+    # Importing this module creates the API clients and starts background threads, and spawned
+    # extraction and batch workers re-import the main script, so serve from serve.py instead
+    os.execv(sys.executable, [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py')]
+             + sys.argv[1:])
+
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context, send_file, g
+from flask_cors import CORS
+import shutil
+import zipfile
+import uuid
 from io import BytesIO
 import base64
 import re
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import translate_v2 as translate
-from datetime import datetime
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.units import inch, mm
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
-from reportlab.lib.colors import HexColor
+from google.auth.credentials import AnonymousCredentials
+from config import Config
+from analysis import SingleFlight, analyze_document, iter_analysis, pack_clause_batches, run_limited
+from batch import run_batch_input
+from metrics import SIZE_BUCKETS, TOKEN_BUCKETS, MetricsRegistry
+from model_gateway import ModelGateway
+from model_clients import ModelClientRegistry
+from cache import ResultCache, content_key
+from document_store import create_document_store, new_document_id
+from jobs import JobQueue, JobWorker, JobFailed
+from extraction import ExtractionLimitError, extract_docx, extract_pdf
+from segmenter import split_into_clauses
+from uploads import UploadRequest, extraction_slots
+from prompts import estimate_tokens, fit_to_budget, pack_chunks, split_paragraphs
+from retrieval import build_index, select_context
+from answers import AnswerCache
+from revisions import plan_revision, revision_report
+from translation import Translator, split_complete_sentences
+from report import UnsupportedReportLanguage, report_filename
+from exports import EXPORT_FORMATS, ExportCache, Exporter
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
 
 
 app = Flask(__name__)
+# Size caps and spooling of uploads; see uploads.py
+app.request_class = UploadRequest
+if Config.UPLOAD_TMP_DIR:
+    os.makedirs(Config.UPLOAD_TMP_DIR, exist_ok=True)
 CORS(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'legislens-secret-key-change-in-production')
 
-# Configure Gemini (you'll need to set GEMINI_API_KEY in your environment)
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Stage timings, model call and cache counters for /metrics and the optional Server-Timing header
+metrics = MetricsRegistry()
+http_requests = metrics.counter('http_requests_total', 'HTTP requests by endpoint, method and status',
+                                ('endpoint', 'method', 'status'))
+http_request_seconds = metrics.histogram('http_request_seconds', 'Time until the response starts, by endpoint',
+                                         labelnames=('endpoint',))
+http_request_bytes = metrics.histogram('http_request_bytes', 'Request body sizes', SIZE_BUCKETS, ('endpoint',))
+http_response_bytes = metrics.histogram('http_response_bytes', 'Non-streamed response body sizes', SIZE_BUCKETS,
+                                        ('endpoint',))
+model_calls = metrics.counter('model_calls_total', 'Model requests by model, kind and outcome',
+                              ('model', 'kind', 'outcome'))
+model_tokens = metrics.counter('model_tokens_total', 'Estimated model tokens by model and direction',
+                               ('model', 'direction'))
+prompt_tokens = metrics.histogram('prompt_tokens', 'Estimated tokens of each prompt built, by task', TOKEN_BUCKETS,
+                                  ('task',))
+prompt_truncations = metrics.counter('prompt_truncations_total',
+                                     'Prompts whose document text was cut to fit its token budget', ('task',))
+export_bytes = metrics.histogram('export_bytes', 'Rendered report sizes', SIZE_BUCKETS, ('format',))
+ask_ttft_seconds = metrics.histogram('ask_ttft_seconds', 'Time to first token of streamed answers')
+
+# Gemini clients are created once per worker process and reused by every request
+# (you'll need to set GEMINI_API_KEY in your environment)
+model_clients = ModelClientRegistry(Config.GEMINI_API_KEY, endpoint=Config.GEMINI_API_ENDPOINT)
 
 # Initialize translation client
 try:
-    translate_client = translate.Client()
+    if Config.TRANSLATE_API_ENDPOINT:
+        translate_client = translate.Client(
+            credentials=AnonymousCredentials(),
+            client_options={"api_endpoint": Config.TRANSLATE_API_ENDPOINT}
+        )
+    else:
+        translate_client = translate.Client()
 except Exception as e:
     print(f"Translation client initialization failed: {e}")
     translate_client = None
 
-# Store processed documents in memory (for demo purposes)
-document_data = {"clauses": [], "full_text": "", "summary": ""}
+# Batched, persistently cached translation; static UI labels are pre-translated at startup
+translator = None
+if translate_client:
+    translator = Translator(
+        translate_client,
+        Config.CACHE_PATH,
+        max_entries=Config.TRANSLATION_CACHE_MAX_ENTRIES,
+        ttl_seconds=Config.TRANSLATION_CACHE_TTL_SECONDS,
+        metrics=metrics
+    )
+    if Config.PREWARM_TRANSLATIONS:
+        translator.prewarm()
+
+# Processed documents, keyed by the document id returned from /upload
+document_store = create_document_store(Config)
+
+# Uploads are processed as background jobs; see process_document_job and worker.py
+job_queue = JobQueue(Config.JOB_STORE_PATH)
+
+# Gemini results are cached by content and model name so repeated boilerplate skips the network.
+# Bump a prompt version whenever its prompt changes to invalidate old entries.
+SUMMARY_PROMPT_VERSION = 'summary-v2'
+CLAUSE_PROMPT_VERSION = 'clause-v2'
+
+def record_model_call(model_name, kind, outcome, prompt, text=''):
+    """Count a model request and its estimated prompt and response tokens"""
+    model_calls.inc(model=model_name, kind=kind, outcome=outcome)
+    model_tokens.inc(estimate_tokens(prompt), model=model_name, direction='prompt')
+    if text:
+        model_tokens.inc(estimate_tokens(text), model=model_name, direction='response')
+
+
+def record_prompt(task, prompt, truncated=False):
+    """Report the tokens a prompt uses and whether its text was cut to fit the budget; returns the prompt"""
+    prompt_tokens.observe(estimate_tokens(prompt), task=task)
+    if truncated:
+        prompt_truncations.inc(task=task)
+    return prompt
+
+
+def call_gemini(model_name, prompt, timeout):
+    """One Gemini request; use model_gateway.generate instead of calling this directly"""
+    try:
+        with metrics.span('model_call'):
+            text = model_clients.get(model_name).generate_content(prompt, request_options={"timeout": timeout}).text
+    except Exception:
+        record_model_call(model_name, 'generate', 'error', prompt)
+        raise
+    record_model_call(model_name, 'generate', 'ok', prompt, text)
+    return text
+
+
+def call_gemini_stream(model_name, prompt, timeout):
+    """One streamed Gemini request yielding text chunks; use model_gateway.stream instead"""
+    # Not a span: the time between chunks includes the consumer's own work
+    chunks = []
+    try:
+        response = model_clients.get(model_name).generate_content(
+            prompt, stream=True, request_options={"timeout": timeout}
+        )
+        for chunk in response:
+            # Chunks without text parts (e.g. a final safety-ratings chunk) raise on .text
+            if chunk.parts:
+                chunks.append(chunk.text)
+                yield chunk.text
+    except Exception as e:
+        metrics.errors.inc(stage='model_stream', type=type(e).__name__)
+        record_model_call(model_name, 'stream', 'error', prompt, ''.join(chunks))
+        raise
+    record_model_call(model_name, 'stream', 'ok', prompt, ''.join(chunks))
+
+
+model_gateway = ModelGateway(
+    call_gemini,
+    requests_per_minute=Config.MODEL_REQUESTS_PER_MINUTE,
+    tokens_per_minute=Config.MODEL_TOKENS_PER_MINUTE,
+    max_concurrency=Config.MAX_CONCURRENT_MODEL_CALLS,
+    min_concurrency=Config.MODEL_MIN_CONCURRENCY,
+    max_retries=Config.MODEL_MAX_RETRIES,
+    backoff_base=Config.MODEL_BACKOFF_BASE_SECONDS,
+    backoff_max=Config.MODEL_BACKOFF_MAX_SECONDS,
+    timeout=Config.MODEL_TIMEOUT_SECONDS,
+    stream_call=call_gemini_stream
+)
+
+analysis_cache = ResultCache(
+    Config.CACHE_PATH,
+    table='analyses',
+    max_entries=Config.CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.CACHE_TTL_SECONDS
+)
+
+# Answers to earlier questions about the same document text, per target language
+ANSWER_PROMPT_VERSION = 'answer-v1'
+answer_cache = AnswerCache(
+    ResultCache(
+        Config.CACHE_PATH,
+        table='answers',
+        max_entries=Config.ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds=Config.ANSWER_CACHE_TTL_SECONDS
+    ),
+    version=f"{Config.QA_MODEL}:{ANSWER_PROMPT_VERSION}:{Config.ASK_CONTEXT_TOKEN_BUDGET}:{Config.ASK_TOP_K_CLAUSES}",
+    threshold=Config.ANSWER_SIMILARITY_THRESHOLD,
+    fuzzy=Config.ANSWER_FUZZY_MATCH
+)
+
+# Time to first token of recent streamed answers, in milliseconds
+ask_ttft_ms = deque(maxlen=1000)
+
+# Rendered reports, keyed by document, analysis revision, language and format
+export_cache = ExportCache(
+    Config.EXPORT_CACHE_PATH,
+    max_bytes=Config.EXPORT_CACHE_MAX_BYTES,
+    max_entries=Config.EXPORT_CACHE_MAX_ENTRIES
+)
+exporter = Exporter(
+    export_cache,
+    translate_many=translator.translate_many if translator else None,
+    workers=Config.EXPORT_RENDER_WORKERS
+)
+
+def cache_metric_samples(read):
+    """One sample per cache of this process, reading a value with read(cache)"""
+    caches = {"analyses": analysis_cache, "answers": answer_cache.cache, "exports": export_cache}
+    if translator:
+        caches["translations"] = translator.cache
+    return [({"cache": name}, read(cache)) for name, cache in caches.items()]
+
+
+GATEWAY_EVENTS = ('retries', 'throttled', 'timeouts', 'failed')
+
+metrics.collector('cache_hits_total', 'Cache hits in this process', 'counter',
+                  lambda: cache_metric_samples(lambda cache: cache.hits))
+metrics.collector('cache_misses_total', 'Cache misses in this process', 'counter',
+                  lambda: cache_metric_samples(lambda cache: cache.misses))
+metrics.collector('cache_entries', 'Entries currently stored per cache', 'gauge',
+                  lambda: cache_metric_samples(lambda cache: cache.stats()["entries"]))
+metrics.collector('answer_cache_lookups_total', 'Answer cache lookups by result', 'counter',
+                  lambda: [({"result": name}, value) for name, value in answer_cache.stats().items() if name != "hit_rate"])
+metrics.collector('model_gateway_events_total', 'Model gateway retries, throttling, timeouts and final failures',
+                  'counter', lambda: [({"event": name}, model_gateway.stats()[name]) for name in GATEWAY_EVENTS])
+metrics.collector('model_concurrency_limit', 'Current adaptive limit on concurrent model calls', 'gauge',
+                  lambda: [({}, model_gateway.stats()["concurrency_limit"])])
+metrics.collector('model_calls_in_flight', 'Model calls currently in flight', 'gauge',
+                  lambda: [({}, model_gateway.stats()["in_flight"])])
+
+
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    metrics.begin_request()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Count and time every request; add a Server-Timing header of its stages when enabled"""
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    http_request_seconds.observe(elapsed, endpoint=endpoint)
+    if request.content_length:
+        http_request_bytes.observe(request.content_length, endpoint=endpoint)
+    if not response.is_streamed and response.content_length is not None:
+        http_response_bytes.observe(response.content_length, endpoint=endpoint)
+    if Config.SERVER_TIMING_HEADER:
+        response.headers['Server-Timing'] = metrics.server_timing(elapsed)
+    return response
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"Upload is too large (limit is {request.max_content_length} bytes)"}), 413
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text-format metrics of this worker process"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 
 @app.route('/health')
 def health_check():
     return jsonify({"status": "healthy"})
-def generate_pdf_content(document_data, language='en'):
-    """Generate HTML content for PDF export"""
-
-    # Risk level translations
-    risk_translations = {
-        'en': {'high': 'High Risk', 'medium': 'Medium Risk', 'low': 'Low Risk', 'unknown': 'Unknown Risk'},
-        'hi': {'high': 'उच्च जोखिम', 'medium': 'मध्यम जोखिम', 'low': 'कम जोखिम', 'unknown': 'अज्ञात जोखिम'},
-        'es': {'high': 'Alto Riesgo', 'medium': 'Riesgo Medio', 'low': 'Bajo Riesgo', 'unknown': 'Riesgo Desconocido'},
-        'fr': {'high': 'Risque Élevé', 'medium': 'Risque Moyen', 'low': 'Faible Risque', 'unknown': 'Risque Inconnu'}
-    }
 
-    risk_texts = risk_translations.get(language, risk_translations['en'])
-
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>LegisLens Analysis Report</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }}
-            .header {{ text-align: center; margin-bottom: 30px; border-bottom: 2px solid #3498db; padding-bottom: 20px; }}
-            .summary {{ background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin-bottom: 30px; }}
-            .clause {{ margin-bottom: 25px; padding: 15px; border-left: 4px solid #95a5a6; page-break-inside: avoid; }}
-            .risk-high {{ border-left-color: #ff6b6b; background-color: #fff5f5; }}
-            .risk-medium {{ border-left-color: #ffd93d; background-color: #fff9e6; }}
-            .risk-low {{ border-left-color: #6bcb77; background-color: #f0fff4; }}
-            .risk-badge {{ 
-                display: inline-block; padding: 4px 12px; border-radius: 12px; 
-                font-weight: bold; margin-left: 15px; font-size: 0.8em; 
-            }}
-            .risk-high-badge {{ background-color: #ff6b6b; color: white; }}
-            .risk-medium-badge {{ background-color: #ffd93d; color: #333; }}
-            .risk-low-badge {{ background-color: #6bcb77; color: white; }}
-            .risk-unknown-badge {{ background-color: #95a5a6; color: white; }}
-            .clause-content {{ margin-top: 10px; }}
-            .original-text {{ font-style: italic; color: #666; border-top: 1px solid #eee; padding-top: 10px; margin-top: 10px; }}
-            @media print {{
-                body {{ margin: 20px; }}
-                .clause {{ page-break-inside: avoid; }}
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>LegisLens Analysis Report</h1>
-            <p>Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-        </div>
-
-        <div class="summary">
-            <h2>Document Summary</h2>
-            <p>{document_data.get('summary', 'No summary available.')}</p>
-        </div>
-
-        <h2>Clause Analysis</h2>
-    """
 
-    # Add each clause to the report
-    for clause in document_data.get("clauses", []):
-        risk_class = f"risk-{clause.get('risk', 'unknown')}"
-        risk_badge = f"<span class='risk-badge risk-{clause.get('risk', 'unknown')}-badge'>{risk_texts.get(clause.get('risk', 'unknown'), 'Unknown Risk')}</span>"
-
-        html_content += f"""
-        <div class="clause {risk_class}">
-            <h3>{clause.get('title', f'Clause {clause.get("id", "")}')} {risk_badge}</h3>
-            <div class="clause-content">
-                <p><strong>Summary:</strong> {clause.get('summary', 'No summary available.')}</p>
-                <div class="original-text">
-                    <p><strong>Original Text:</strong> {clause.get('content', '')[:500]}...</p>
-                </div>
-            </div>
-        </div>
-        """
+def get_request_document_id():
+    """Resolve the document id from the request, falling back to the caller's last upload"""
+    data = request.get_json(silent=True) or {}
+    return data.get('document_id') or request.args.get('document_id') or session.get('document_id')
 
-    html_content += """
-    </body>
-    </html>
-    """
 
-    return html_content
-@app.route('/export_pdf', methods=['POST'])
-def export_pdf():
-    """Generate a professional PDF report"""
-    global document_data
+def make_document(text, page_offsets, summary, clauses, retrieval_index=None):
+    """Build the stored record for a processed document, including its retrieval index"""
+    if retrieval_index is None:
+        retrieval_index = build_index(clauses)
+    return {
+        "full_text": text,
+        "content_hash": content_key(text),
+        "page_offsets": page_offsets,
+        "summary": summary,
+        "clauses": clauses,
+        "retrieval_index": retrieval_index
+    }
 
-    if not document_data or not document_data.get("clauses"):
-        return jsonify({"error": "No document data available"}), 400
 
-    try:
-        # Create PDF buffer
-        pdf_buffer = BytesIO()
-
-        # Create PDF document with margins
-        doc = SimpleDocTemplate(
-            pdf_buffer,
-            pagesize=A4,
-            leftMargin=20 * mm,
-            rightMargin=20 * mm,
-            topMargin=20 * mm,
-            bottomMargin=20 * mm
-        )
+def document_hash(document):
+    """Content hash of a stored document's text (computed for documents stored before it was recorded)"""
+    return document.get("content_hash") or content_key(document["full_text"])
 
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Custom styles
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=HexColor('#2c3e50'),
-            fontName='Helvetica-Bold'
-        )
 
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Normal'],
-            fontSize=11,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            textColor=HexColor('#7f8c8d')
-        )
+def load_previous_version():
+    """Return (previous_document_id, document) named by an upload's previous_document_id, if any"""
+    previous_document_id = request.form.get('previous_document_id') or request.args.get('previous_document_id')
+    if not previous_document_id:
+        return None, None
+    return previous_document_id, document_store.get(previous_document_id)
 
-        heading_style = ParagraphStyle(
-            'Heading2',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=20,
-            textColor=HexColor('#2c3e50'),
-            fontName='Helvetica-Bold'
-        )
 
-        clause_title_style = ParagraphStyle(
-            'ClauseTitle',
-            parent=styles['Heading3'],
-            fontSize=12,
-            spaceAfter=6,
-            textColor=HexColor('#2c3e50'),
-            fontName='Helvetica-Bold'
-        )
+def start_revision(previous_document_id, previous, text, clauses):
+    """Plan the analysis of an upload, reusing a previous version's results where the text is unchanged
 
-        risk_style = ParagraphStyle(
-            'Risk',
-            parent=styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            textColor=HexColor('#ffffff'),
-            backColor=HexColor('#e74c3c'),
-            alignment=TA_CENTER
-        )
+    Returns (pending_clauses, summarize, revision); revision is None for a
+    plain upload and is passed to finish_revision once analysis is done.
+    """
+    summarize = generate_summary
+    if Config.SUMMARY_MODE == 'clauses':
+        summarize = lambda summary_text: clause_tree_summary(summary_text, clauses)
+    if previous is None:
+        return clauses, summarize, None
+
+    pending, matches, removed = plan_revision(previous["clauses"], clauses, Config.REVISION_MATCH_SIMILARITY)
+    if document_hash(previous) == content_key(text) and previous.get("summary"):
+        summarize = lambda _text: previous["summary"]
+    revision = {"previous_document_id": previous_document_id, "matches": matches,
+                "removed": removed, "analyzed": len(pending)}
+    return pending, summarize, revision
+
+
+def finish_revision(revision, clauses):
+    """Report of changed, added and removed clauses and their risk movement, or None for a plain upload"""
+    if revision is None:
+        return None
+    return revision_report(revision["previous_document_id"], clauses, revision["matches"],
+                           revision["removed"], revision["analyzed"])
 
-        summary_style = ParagraphStyle(
-            'Summary',
-            parent=styles['Normal'],
-            fontSize=10,
-            spaceAfter=8,
-            textColor=HexColor('#2c3e50'),
-            alignment=TA_JUSTIFY
-        )
 
-        content_style = ParagraphStyle(
-            'Content',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=12,
-            textColor=HexColor('#7f8c8d'),
-            alignment=TA_JUSTIFY
-        )
+def load_document():
+    """Return (document_id, document) for the current request; document is None if unknown or expired"""
+    document_id = get_request_document_id()
+    if not document_id:
+        return None, None
+    return document_id, document_store.get(document_id)
 
-        # Header
-        story.append(Paragraph("LEGISLENS ANALYSIS REPORT", title_style))
-        story.append(Paragraph(f"Generated on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}", subtitle_style))
-        story.append(Spacer(1, 20))
-
-        # Document Summary Section
-        story.append(Paragraph("DOCUMENT OVERVIEW", heading_style))
-        summary_text = document_data.get('summary', 'No summary available.')
-        story.append(Paragraph(summary_text, summary_style))
-        story.append(Spacer(1, 25))
-
-        # Risk Legend
-        risk_data = [
-            ['RISK LEVEL', 'DESCRIPTION'],
-            ['HIGH RISK', 'Unusual terms, heavily favors one party, removes standard protections'],
-            ['MEDIUM RISK', 'Somewhat unfavorable terms or slightly unusual clauses'],
-            ['LOW RISK', 'Standard, fair terms that protect both parties equally']
-        ]
-
-        risk_table = Table(risk_data, colWidths=[60 * mm, 100 * mm])
-        risk_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), HexColor('#2c3e50')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (0, 1), HexColor('#e74c3c')),
-            ('BACKGROUND', (0, 2), (0, 2), HexColor('#f39c12')),
-            ('BACKGROUND', (0, 3), (0, 3), HexColor('#27ae60')),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-        ]))
-
-        story.append(Paragraph("RISK ASSESSMENT GUIDE", heading_style))
-        story.append(risk_table)
-        story.append(Spacer(1, 25))
-
-        # Clause Analysis Section
-        story.append(Paragraph("DETAILED CLAUSE ANALYSIS", heading_style))
-        story.append(Spacer(1, 15))
-
-        for i, clause in enumerate(document_data.get("clauses", [])):
-            # Add page break after every 3 clauses to avoid overcrowding
-            if i > 0 and i % 3 == 0:
-                story.append(PageBreak())
-                story.append(Paragraph("DETAILED CLAUSE ANALYSIS (CONTINUED)", heading_style))
-                story.append(Spacer(1, 15))
-
-            # Risk badge with color coding
-            risk_level = clause.get('risk', 'unknown').upper()
-            risk_color = HexColor('#95a5a6')  # Default unknown color
-
-            if risk_level == 'HIGH':
-                risk_color = HexColor('#e74c3c')
-            elif risk_level == 'MEDIUM':
-                risk_color = HexColor('#f39c12')
-            elif risk_level == 'LOW':
-                risk_color = HexColor('#27ae60')
-
-            risk_style.textColor = colors.white
-            risk_style.backColor = risk_color
-
-            # Clause header with risk badge
-            clause_header = [
-                [Paragraph(f"<b>{clause.get('title', f'Clause {clause.get('id', '')}')}</b>", clause_title_style),
-                 Paragraph(risk_level, risk_style)]
-            ]
 
-            clause_table = Table(clause_header, colWidths=[120 * mm, 40 * mm])
-            clause_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-                ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-            ]))
-
-            story.append(clause_table)
-
-            # Clause summary
-            summary_text = clause.get('summary', 'No analysis available.')
-            story.append(Paragraph(f"<b>Analysis:</b> {summary_text}", summary_style))
-
-            # Original text (truncated for readability)
-            original_text = clause.get('content', '')
-            if len(original_text) > 3000:
-                original_text = original_text[:3000] + '...'
-
-            story.append(Paragraph(f"<b>Original Text:</b> {original_text}", content_style))
-            story.append(Spacer(1, 20))
-
-        # Footer with page numbers
-        def add_page_number(canvas, doc):
-            canvas.saveState()
-            canvas.setFont('Helvetica', 8)
-            canvas.setFillColor(HexColor('#7f8c8d'))
-            page_num = f"Page {doc.page}"
-            canvas.drawString(100 * mm, 15 * mm, page_num)
-            canvas.drawString(20 * mm, 15 * mm, "Generated by LegisLens - Your Legal Document Assistant")
-            canvas.restoreState()
-
-        # Build PDF
-        doc.build(story, onFirstPage=add_page_number, onLaterPages=add_page_number)
-        pdf_buffer.seek(0)
-
-        # Return PDF as base64
-        pdf_base64 = base64.b64encode(pdf_buffer.getvalue()).decode('utf-8')
-
-        return jsonify({
-            "pdf_data": pdf_base64,
-            "filename": f"LegisLens_Analysis_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        })
+@app.route('/export_pdf', methods=['POST'])
+def export_pdf():
+    """Generate a professional PDF report
+
+    Streams the report as a download, served from the export cache when
+    this revision of the analysis was already rendered in the requested
+    language. {"format": "html"} returns the HTML report instead; clients
+    that still expect the older JSON response with base64 PDF data can send
+    {"format": "json"} (or ?format=json).
+    """
+    document_id, document_data = load_document()
 
+    if not document_data or not document_data.get("clauses"):
+        return jsonify({"error": "No document data available"}), 400
+
+    data = request.get_json(silent=True) or {}
+    response_format = data.get('format') or request.args.get('format', 'pdf')
+    language = data.get('language') or request.args.get('language') or session.get('current_language', 'en')
+    export_format = 'pdf' if response_format == 'json' else response_format
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported export format: {export_format}"}), 400
+
+    try:
+        with metrics.span('export'):
+            document_data = ensure_analyzed(document_id, document_data)
+            content = exporter.get(document_id, document_data, language, export_format)
+        export_bytes.observe(len(content), format=export_format)
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        filename = report_filename(extension)
+
+        if response_format == 'json':
+            # Return PDF as base64
+            pdf_base64 = base64.b64encode(content).decode('utf-8')
+            return jsonify({"pdf_data": pdf_base64, "filename": filename})
+
+        return send_file(BytesIO(content), mimetype=mimetype, as_attachment=True, download_name=filename)
+
+    except UnsupportedReportLanguage as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"PDF generation error: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": f"PDF generation failed: {str(e)}"}), 500
-def extract_text_from_file(file):
-    """Extract text from uploaded PDF or DOCX file"""
-    text = ""
-    try:
-        if file.filename.endswith('.pdf'):
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        elif file.filename.endswith('.docx'):
-            doc = docx.Document(file)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        else:
-            return None
-        return text
-    except Exception as e:
-        print(f"Error extracting text: {str(e)}")
-        return None
-
-
-def extract_title_from_header(header):
-    """Extract a clean title from a section header"""
-    # Remove excessive whitespace
-    header = ' '.join(header.split())
 
-    # Remove common prefixes and clean up
-    patterns = [
-        r'^(ARTICLE|SECTION|CLAUSE|§|[\dIVX]+\.)\s*',
-        r'^\s*[\dIVX]+\s*[-–]\s*',
-        r'^\s*\([a-zA-Z]\)\s*'
-    ]
-
-    for pattern in patterns:
-        header = re.sub(pattern, '', header, flags=re.IGNORECASE)
-
-    # Limit length and ensure it's not empty
-    if not header or header.isspace():
-        return "Untitled Clause"
 
-    if len(header) > 60:
-        return header[:57] + '...'
+def prerender_exports(document_id, document, language='en'):
+    """Start rendering a finished analysis' reports so the export click is served from the cache"""
+    # Reports of partly analyzed documents would be stale as soon as the rest arrives
+    if Config.PRERENDER_EXPORTS and not any(is_unanalyzed(clause) for clause in document["clauses"]):
+        exporter.prerender(document_id, document, languages=('en', language), formats=Config.EXPORT_PRERENDER_FORMATS)
 
-    return header
 
+@metrics.timed('extract')
+def extract_document(file):
+    """Extract text and page offsets from an uploaded PDF or DOCX file
 
-def split_into_clauses(text):
-    """Improved algorithm to split legal text into clauses with meaningful titles"""
-    clauses = []
-
-    # First, try to find sections based on common legal patterns
-    patterns = [
-        r'(\n\s*(ARTICLE|ARTICLE\s+\d+)[^\n]*\n)',
-        r'(\n\s*(SECTION|SECTION\s+[\d\.]+)[^\n]*\n)',
-        r'(\n\s*(CLAUSE|CLAUSE\s+[\d\.]+)[^\n]*\n)',
-        r'(\n\s*§\s*[\d\.]+[^\n]*\n)',
-        r'(\n\s*[\dIVX]+\.\s+[A-Z][^\n]*\n)',
-    ]
-
-    # Try each pattern until we find a good split
-    for pattern in patterns:
-        sections = re.split(pattern, text)
-        if len(sections) > 3:  # If we found reasonable splits
-            for i in range(1, len(sections), 3):
-                if i + 2 < len(sections):
-                    clause_header = sections[i].strip()
-                    clause_content = sections[i + 2].strip()
-
-                    if len(clause_content) > 50:  # Ensure it's a meaningful clause
-                        title = extract_title_from_header(clause_header)
-                        preview = clause_content[:150].replace('\n', ' ') + '...' if len(
-                            clause_content) > 150 else clause_content
-
-                        clauses.append({
-                            "id": len(clauses),
-                            "title": title,
-                            "content": clause_content,
-                            "preview": preview,
-                            "summary": "",
-                            "risk": "unknown"
-                        })
-            if clauses:  # If we found clauses with this pattern, break
-                break
-
-    # If no sections found with patterns, try a different approach
-    if len(clauses) < 2:
-        clauses = []  # Reset
-        # Split by double newlines and look for potential headings
-        sections = re.split(r'\n\s*\n', text)
-        for i, section in enumerate(sections):
-            section = section.strip()
-            if len(section) > 100:
-                # Check if the first line looks like a heading
-                lines = section.split('\n')
-                first_line = lines[0].strip()
-
-                # Heuristic: Heading-like lines are usually short and often in title case or all caps
-                is_heading = (len(first_line) < 80 and
-                              (first_line.isupper() or
-                               (len(first_line.split()) < 8 and first_line.istitle())))
-
-                if is_heading and len(lines) > 1:
-                    title = first_line
-                    content = '\n'.join(lines[1:])
-                else:
-                    title = f"Clause {i + 1}"
-                    content = section
-
-                preview = content[:150].replace('\n', ' ') + '...' if len(content) > 150 else content
+    Returns None if the file cannot be read; raises ExtractionLimitError
+    if it exceeds the configured page, byte or text length limits.
+    """
+    try:
+        with extraction_slots:
+            if file.filename.endswith('.pdf'):
+                return extract_pdf(
+                    file.stream,
+                    max_pages=Config.MAX_PDF_PAGES,
+                    max_bytes=Config.MAX_EXTRACT_BYTES,
+                    parallel_min_pages=Config.PDF_PARALLEL_MIN_PAGES,
+                    workers=Config.PDF_EXTRACT_WORKERS,
+                    max_chars=Config.MAX_EXTRACTED_CHARS
+                )
+            elif file.filename.endswith('.docx'):
+                return extract_docx(file.stream, Config.MAX_EXTRACT_BYTES, Config.MAX_DOCX_XML_BYTES,
+                                    Config.MAX_EXTRACTED_CHARS)
+            else:
+                return None
+    except ExtractionLimitError:
+        raise
+    except Exception as e:
+        print(f"Error extracting text: {str(e)}")
+        return None
 
-                clauses.append({
-                    "id": i,
-                    "title": title,
-                    "content": content,
-                    "preview": preview,
-                    "summary": "",
-                    "risk": "unknown"
-                })
 
-    return clauses
+def extract_text_from_file(file):
+    """Extract text from uploaded PDF or DOCX file"""
+    try:
+        extracted = extract_document(file)
+    except ExtractionLimitError as e:
+        print(f"Error extracting text: {str(e)}")
+        return None
+    return extracted.text if extracted is not None else None
 
 
 print("GEMINI_API_KEY exists:", bool(os.environ.get('GEMINI_API_KEY')))
 print("GOOGLE_APPLICATION_CREDENTIALS exists:", bool(os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')))
 
 
+@metrics.timed('summary')
 def generate_summary(text):
     """Generate a summary of the entire document using Gemini"""
     try:
-        # Debug information
-        api_key = os.environ.get('GEMINI_API_KEY')
-        print(f"GEMINI_API_KEY present: {bool(api_key)}")
-
         # For demo purposes, use mock data if no API key
-        if not api_key:
+        if not Config.GEMINI_API_KEY:
             demo_msg = "This is a DEMO summary. Please add your GEMINI_API_KEY to get real analysis.\n\n"
             demo_msg += "This rental agreement outlines the terms between John Doe (Tenant) and ABC Properties (Landlord). "
             demo_msg += "Key points include a 12-month lease term, monthly rent of $1500, and a security deposit."
             return demo_msg
 
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        prompt = f"""
-        Please provide a concise, plain-English summary of this legal document. 
+        fitted = fit_to_budget(text, Config.SUMMARY_TOKEN_BUDGET)
+        # Without clause results to build on, the clauses mode summarizes the text like map_reduce
+        map_reduce = fitted.truncated and Config.SUMMARY_MODE in ('map_reduce', 'clauses')
+        cache_key = content_key(text if map_reduce else fitted.text, Config.SUMMARY_MODEL,
+                                SUMMARY_PROMPT_VERSION + ('-map-reduce' if map_reduce else ''))
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if map_reduce:
+            response_text = map_reduce_summary(text)
+        else:
+            prompt = f"""
+        Please provide a concise, plain-English summary of this legal document.
         Focus on the overall purpose, main obligations of each party, and key terms.
         Keep it under 150 words.
 
         Document text:
-        {text[:5000]}  # Reduced length for safety
+        {fitted.text}
+        """
+            record_prompt('summary', prompt, fitted.truncated)
+            response_text = model_gateway.generate(Config.SUMMARY_MODEL, prompt)
+        analysis_cache.set(cache_key, response_text)
+        return response_text
+    except Exception as e:
+        error_msg = f"Unable to generate summary: {str(e)}"
+        print(error_msg)
+        return error_msg
+
+
+def summarize_part(part):
+    """Summary of one budget-sized part of a long document, cached by the part's text"""
+    cache_key = content_key(part, Config.SUMMARY_MODEL, SUMMARY_PROMPT_VERSION + '-part')
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    prompt = f"""
+        Below is one part of a longer legal document.
+        Summarize in plain English the obligations, rights, amounts, dates and deadlines it contains.
+        Keep it under 100 words and do not guess about the rest of the document.
+
+        Document part:
+        {part}
+        """
+    record_prompt('summary_map', prompt)
+    response_text = model_gateway.generate(Config.SUMMARY_MODEL, prompt)
+    analysis_cache.set(cache_key, response_text)
+    return response_text
+
+
+def combine_summaries(summaries, final):
+    """Merge summaries of consecutive document parts into one (the document summary when final)"""
+    fitted = fit_to_budget("\n\n".join(summaries), Config.SUMMARY_TOKEN_BUDGET)
+    if final:
+        instructions = """Combine them into one concise, plain-English summary of the whole document.
+        Focus on the overall purpose, main obligations of each party, and key terms.
+        Keep it under 150 words."""
+    else:
+        instructions = """Combine them into one plain-English summary of these parts, keeping every
+        obligation, amount and deadline. Keep it under 150 words."""
+    prompt = f"""
+        Below are summaries of consecutive parts of one legal document, in order.
+        {instructions}
+
+        Part summaries:
+        {fitted.text}
+        """
+    record_prompt('summary_reduce', prompt, fitted.truncated)
+    return model_gateway.generate(Config.SUMMARY_MODEL, prompt)
+
+
+def map_reduce_summary(text):
+    """Summarize a document too long for one prompt: every part on its own, then the part summaries together"""
+    parts = pack_chunks(split_paragraphs(text), Config.SUMMARY_TOKEN_BUDGET)
+    workers = max(1, min(Config.SUMMARY_MAP_WORKERS, len(parts)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summary-map') as executor:
+        summaries = list(executor.map(summarize_part, parts))
+
+    # Very long documents produce more part summaries than fit in one prompt; combine them in rounds
+    while True:
+        groups = pack_chunks(summaries, Config.SUMMARY_TOKEN_BUDGET)
+        if len(groups) == 1 or len(groups) >= len(summaries):
+            break
+        summaries = [combine_summaries([group], final=False) for group in groups]
+    return combine_summaries(summaries, final=True)
+
+
+def clause_leaf(clause):
+    """A clause as a leaf of the summary tree: its summary and risk, or its opening text until analyzed"""
+    if is_unanalyzed(clause):
+        text = f"{clause['title']}: {clause['content']}"
+    else:
+        text = f"{clause['title']} ({clause['risk']} risk): {clause['summary']}"
+    return fit_to_budget(text, Config.SUMMARY_NODE_TOKENS).text
+
+
+def summarize_clause_group(items):
+    """Inner node of the summary tree: one short summary of consecutive clause (or node) summaries"""
+    cache_key = content_key("\n".join(items), Config.SUMMARY_MODEL, SUMMARY_PROMPT_VERSION + '-node')
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    joined = "\n".join(items)
+    prompt = f"""
+        Below are plain-English summaries of consecutive clauses of one legal document, in order.
+        Summarize them together in under 60 words, keeping amounts, deadlines and anything high risk.
+
+        Clause summaries:
+        {joined}
         """
+    record_prompt('summary_node', prompt)
+    response_text = fit_to_budget(model_gateway.generate(Config.SUMMARY_MODEL, prompt),
+                                  Config.SUMMARY_NODE_TOKENS).text
+    analysis_cache.set(cache_key, response_text)
+    return response_text
+
 
-        response = model.generate_content(prompt)
-        return response.text
+def clause_tree_summary(text, clauses):
+    """Document summary reduced from the clause summaries in a tree (SUMMARY_MODE='clauses').
+
+    Consecutive leaves are grouped SUMMARY_TOKEN_BUDGET / SUMMARY_NODE_TOKENS
+    at a time, so group boundaries do not move when a summary changes, and
+    every node is cached by its input: after one clause is re-analyzed only
+    the nodes on its path to the root are recomputed.
+    """
+    if not Config.GEMINI_API_KEY or not clauses:
+        return generate_summary(text)
+
+    try:
+        fan_in = max(2, Config.SUMMARY_TOKEN_BUDGET // max(1, Config.SUMMARY_NODE_TOKENS))
+        level = [clause_leaf(clause) for clause in clauses]
+        while len(level) > fan_in:
+            groups = [level[i:i + fan_in] for i in range(0, len(level), fan_in)]
+            workers = max(1, min(Config.SUMMARY_MAP_WORKERS, len(groups)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summary-tree') as executor:
+                level = list(executor.map(summarize_clause_group, groups))
+
+        cache_key = content_key("\n".join(level), Config.SUMMARY_MODEL, SUMMARY_PROMPT_VERSION + '-root')
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        response_text = combine_summaries(level, final=True)
+        analysis_cache.set(cache_key, response_text)
+        return response_text
     except Exception as e:
         error_msg = f"Unable to generate summary: {str(e)}"
         print(error_msg)
         return error_msg
 
 
+def parse_risk_level(risk_text):
+    """Normalize a free-form risk answer to low/medium/high/unknown"""
+    risk_text = str(risk_text).strip().lower()
+    if "low" in risk_text:
+        return "low"
+    elif "medium" in risk_text:
+        return "medium"
+    elif "high" in risk_text:
+        return "high"
+    return "unknown"
+
+
+def parse_clause_analysis(response_text):
+    """Parse a SUMMARY:/RISK: formatted model response into (summary, risk)"""
+    summary = ""
+    risk_level = "unknown"
+
+    if "SUMMARY:" in response_text and "RISK:" in response_text:
+        parts = response_text.split("RISK:")
+        summary = parts[0].replace("SUMMARY:", "").strip()
+        risk_level = parse_risk_level(parts[1])
+
+    return summary, risk_level
+
+
+def clause_cache_key(clause_text):
+    """Cache key for a clause analysis, shared by the single and batched prompts"""
+    return content_key(clause_text, Config.CLAUSE_MODEL, CLAUSE_PROMPT_VERSION)
+
+
+@metrics.timed('clause_analysis')
 def analyze_clause(clause_text):
     """Analyze a clause and return summary and risk assessment"""
     try:
         # For demo purposes, use mock data if no API key
-        if not os.environ.get('GEMINI_API_KEY'):
+        if not Config.GEMINI_API_KEY:
             summaries = [
                 "This clause outlines the payment terms and schedule.",
                 "This section describes the termination conditions for the agreement.",
@@ -505,7 +654,12 @@ def analyze_clause(clause_text):
             import random
             return random.choice(summaries), random.choice(risks)
 
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        cache_key = clause_cache_key(clause_text)
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return tuple(cached)
+
+        fitted = fit_to_budget(clause_text, Config.CLAUSE_TOKEN_BUDGET)
         prompt = f"""
         You are a legal expert explaining complex documents to everyday people.
 
@@ -515,75 +669,307 @@ def analyze_clause(clause_text):
            Consider it "high" if it contains unusual terms, heavily favors one party, 
            or removes standard protections.
 
-        Clause: {clause_text[:2000]}  # Limit text length
+        Clause: {fitted.text}
 
         Respond in this exact format:
         SUMMARY: [your summary here]
         RISK: [low/medium/high]
         """
+        record_prompt('clause', prompt, fitted.truncated)
 
-        response = model.generate_content(prompt)
-        response_text = response.text
+        response_text = model_gateway.generate(Config.CLAUSE_MODEL, prompt)
+        summary, risk_level = parse_clause_analysis(response_text)
+        if summary:
+            analysis_cache.set(cache_key, [summary, risk_level])
+        return summary, risk_level
 
-        # Parse the response
-        summary = ""
-        risk_level = "unknown"
+    except Exception as e:
+        return f"Analysis failed: {str(e)}", "unknown"
 
-        if "SUMMARY:" in response_text and "RISK:" in response_text:
-            parts = response_text.split("RISK:")
-            summary_part = parts[0].replace("SUMMARY:", "").strip()
-            risk_part = parts[1].strip().lower()
 
-            summary = summary_part
-            if "low" in risk_part:
-                risk_level = "low"
-            elif "medium" in risk_part:
-                risk_level = "medium"
-            elif "high" in risk_part:
-                risk_level = "high"
+def parse_batch_analysis(response_text, clause_ids):
+    """Parse a batched analysis response into {clause_id: (summary, risk)}
 
-        return summary, risk_level
+    The model is asked for a JSON array, but fenced or chatty output is
+    tolerated, and a per-clause "CLAUSE <id>" / SUMMARY: / RISK: layout is
+    accepted as a fallback. Clauses missing from the response are left out.
+    """
+    results = {}
 
+    # Strip markdown code fences and anything around the outermost JSON array
+    start = response_text.find('[')
+    end = response_text.rfind(']')
+    if start != -1 and end > start:
+        try:
+            items = json.loads(response_text[start:end + 1])
+        except ValueError:
+            items = []
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            try:
+                clause_id = int(item.get("id"))
+            except (TypeError, ValueError):
+                continue
+            summary = str(item.get("summary") or "").strip()
+            if clause_id in clause_ids and summary:
+                results[clause_id] = (summary, parse_risk_level(item.get("risk", "")))
+
+    if not results:
+        # Fall back to the single-clause SUMMARY:/RISK: format, one block per clause
+        blocks = re.split(r'^\s*CLAUSE\s+(\d+)\s*:?\s*$', response_text, flags=re.MULTILINE | re.IGNORECASE)
+        for i in range(1, len(blocks) - 1, 2):
+            clause_id = int(blocks[i])
+            summary, risk = parse_clause_analysis(blocks[i + 1])
+            if clause_id in clause_ids and summary:
+                results[clause_id] = (summary, risk)
+
+    return results
+
+
+@metrics.timed('clause_batch_analysis')
+def analyze_clauses_batch(clause_texts):
+    """Analyze several clauses with one model call, returning (summary, risk) pairs in order"""
+    # Demo mode has no model call to batch
+    if not Config.GEMINI_API_KEY:
+        return [analyze_clause(clause_text) for clause_text in clause_texts]
+
+    results = {}
+
+    # Serve cached clauses directly and only send the misses to the model
+    for i, clause_text in enumerate(clause_texts):
+        cached = analysis_cache.get(clause_cache_key(clause_text))
+        if cached is not None:
+            results[i] = tuple(cached)
+    pending = [i for i in range(len(clause_texts)) if i not in results]
+    if not pending:
+        return [results[i] for i in range(len(clause_texts))]
+
+    try:
+        fitted = {i: fit_to_budget(clause_texts[i], Config.CLAUSE_TOKEN_BUDGET) for i in pending}
+        clauses_block = "\n\n".join(
+            f"CLAUSE {i}:\n{fitted[i].text}" for i in pending
+        )
+        prompt = f"""
+        You are a legal expert explaining complex documents to everyday people.
+
+        For EACH of the legal clauses below, provide:
+        1. A very simple 1-2 sentence plain English summary.
+        2. A risk assessment: "low", "medium", or "high".
+           Consider it "high" if it contains unusual terms, heavily favors one party,
+           or removes standard protections.
+
+        {clauses_block}
+
+        Respond with only a JSON array containing one object per clause, in this exact format:
+        [{{"id": 0, "summary": "your summary here", "risk": "low/medium/high"}}]
+        """
+        record_prompt('clause_batch', prompt, any(item.truncated for item in fitted.values()))
+
+        response_text = model_gateway.generate(Config.CLAUSE_MODEL, prompt)
+        batch_results = parse_batch_analysis(response_text, set(pending))
+        for i, (summary, risk) in batch_results.items():
+            analysis_cache.set(clause_cache_key(clause_texts[i]), [summary, risk])
+        results.update(batch_results)
     except Exception as e:
-        return f"Analysis failed: {str(e)}", "unknown"
+        print(f"Batch analysis failed, falling back to single clauses: {e}")
 
+    # Re-analyze individually any clause the batch response did not cover
+    return [
+        results[i] if i in results else analyze_clause(clause_text)
+        for i, clause_text in enumerate(clause_texts)
+    ]
 
-def answer_question(question, context):
-    """Answer a question about the document"""
+
+# Requests for the same clause text (on demand, in the background or from another upload) share one model call
+clause_flights = SingleFlight()
+
+# Clauses deferred by the lazy and prioritized analysis policies are finished here
+background_analysis = ThreadPoolExecutor(
+    max_workers=max(1, Config.BACKGROUND_ANALYSIS_WORKERS),
+    thread_name_prefix='background-analysis'
+)
+
+def analyze_clause_once(clause_text):
+    """analyze_clause, joining an identical analysis already in flight"""
+    return clause_flights.run(clause_cache_key(clause_text), analyze_clause, clause_text)
+
+
+def analyze_clauses_batch_once(clause_texts):
+    """analyze_clauses_batch for the clauses nobody else is analyzing, waiting for the rest"""
+    return clause_flights.run_many(
+        [clause_cache_key(clause_text) for clause_text in clause_texts], analyze_clauses_batch, clause_texts
+    )
+
+
+def is_unanalyzed(clause):
+    return not clause.get("summary") or clause.get("risk") == "unknown"
+
+
+def split_by_policy(clauses):
+    """Return (clauses to analyze during the upload, clauses deferred) under Config.ANALYSIS_POLICY"""
+    if Config.ANALYSIS_POLICY == 'lazy':
+        return [], clauses
+    if Config.ANALYSIS_POLICY == 'prioritized':
+        return clauses[:Config.ANALYSIS_PRIORITY_CLAUSES], clauses[Config.ANALYSIS_PRIORITY_CLAUSES:]
+    return clauses, []
+
+
+def analyze_pending_clauses(clauses):
+    """Analyze clauses without a result yet, in packed batches; returns {clause_id: (summary, risk)}"""
+    results = {}
+    if Config.BATCH_CLAUSE_ANALYSIS:
+        for batch in pack_clause_batches(clauses):
+            analyzed = run_limited(analyze_clauses_batch_once, [clause["content"] for clause in batch])
+            results.update((clause["id"], result) for clause, result in zip(batch, analyzed))
+    else:
+        for clause in clauses:
+            results[clause["id"]] = run_limited(analyze_clause_once, clause["content"])
+    return results
+
+
+def store_clause_results(document_id, results):
+    """Write clause results into the stored document without losing concurrent updates; returns it"""
+    def apply(document):
+        for clause in document["clauses"]:
+            if clause["id"] in results:
+                clause["summary"], clause["risk"] = results[clause["id"]]
+
+    # Atomic in the store, so updates from other worker processes are not overwritten
+    return document_store.update(document_id, apply)
+
+
+def refresh_summary(document_id):
+    """Rebuild a stored document's summary from its current clause results (SUMMARY_MODE='clauses')"""
+    if Config.SUMMARY_MODE != 'clauses':
+        return None
+    document = document_store.get(document_id)
+    if document is None:
+        return None
+    summary = clause_tree_summary(document["full_text"], document["clauses"])
+    basis = [(clause["summary"], clause["risk"]) for clause in document["clauses"]]
+
+    def apply(document):
+        # Skip the write when clause results changed meanwhile; the refresh that follows them will save
+        if [(clause["summary"], clause["risk"]) for clause in document["clauses"]] != basis:
+            return False
+        document["summary"] = summary
+
+    return document_store.update(document_id, apply)
+
+
+def ensure_analyzed(document_id, document):
+    """Analyze whatever a lazy upload left pending, e.g. before rendering a report"""
+    pending = [clause for clause in document["clauses"] if is_unanalyzed(clause)]
+    if not pending:
+        return document
+    document = store_clause_results(document_id, analyze_pending_clauses(pending)) or document
+    return refresh_summary(document_id) or document
+
+
+def finish_deferred_analysis(document_id, clauses, language):
+    """Background task: analyze the deferred clauses, storing results batch by batch"""
     try:
-        # For demo purposes, use mock data if no API key
-        if not os.environ.get('GEMINI_API_KEY'):
-            answers = [
-                "Based on the document, the termination notice period is 30 days.",
-                "The document specifies that payments are due within 15 days of invoice.",
-                "According to section 4.2, confidential information must be protected for 3 years after termination.",
-                "The liability is limited to the amount paid under this agreement.",
-                "The governing law specified in the document is the state of California."
-            ]
+        for batch in pack_clause_batches(clauses):
+            # Stop if the document expired from the store in the meantime
+            if store_clause_results(document_id, analyze_pending_clauses(batch)) is None:
+                return
+        refresh_summary(document_id)
+        document = document_store.get(document_id)
+        if document is not None:
+            prerender_exports(document_id, document, language)
+    except Exception as e:
+        print(f"Background analysis of {document_id} failed: {e}")
 
-            import random
-            return random.choice(answers)
 
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        prompt = f"""
+def schedule_deferred_analysis(document_id, clauses, language='en'):
+    """Hand the clauses a prioritized upload deferred to the background workers"""
+    if clauses and Config.ANALYSIS_POLICY == 'prioritized':
+        background_analysis.submit(finish_deferred_analysis, document_id, clauses, language)
+
+
+DEMO_ANSWERS = [
+    "Based on the document, the termination notice period is 30 days.",
+    "The document specifies that payments are due within 15 days of invoice.",
+    "According to section 4.2, confidential information must be protected for 3 years after termination.",
+    "The liability is limited to the amount paid under this agreement.",
+    "The governing law specified in the document is the state of California."
+]
+
+
+def build_answer_prompt(question, context):
+    return record_prompt('answer', f"""
         Based on the following legal document, please answer the user's question.
         Provide a clear, concise response in plain English.
         If the answer cannot be found in the document, say so.
 
-        Legal document:
-        {context[:8000]}
+        Relevant excerpts from the legal document:
+        {context}
 
         User's question: {question}
 
         Answer:
-        """
+        """)
+
+
+@metrics.timed('answer')
+def generate_answer(question, context):
+    """Answer a question about the document; raises if the model call fails"""
+    # For demo purposes, use mock data if no API key
+    if not Config.GEMINI_API_KEY:
+        import random
+        return random.choice(DEMO_ANSWERS)
+
+    return model_gateway.generate(Config.QA_MODEL, build_answer_prompt(question, context))
 
-        response = model.generate_content(prompt)
-        return response.text
+
+def answer_question(question, context):
+    """Answer a question about the document"""
+    try:
+        return generate_answer(question, context)
     except Exception as e:
         return f"I'm sorry, I couldn't process your question: {str(e)}"
 
 
+def lookup_answer(doc_hash, question, target_language):
+    """Cached answer to this or a near-duplicate question in the target language, or None
+
+    A cached English answer is translated (and cached) when only the
+    translation is missing, so Gemini is skipped either way.
+    """
+    if not Config.ANSWER_CACHE or not Config.GEMINI_API_KEY:
+        return None
+    answer = answer_cache.get(doc_hash, question, target_language)
+    if answer is None and target_language != 'en':
+        english = answer_cache.get(doc_hash, question, 'en')
+        if english is not None:
+            answer = translate_answer(english, target_language)
+            if answer != english:
+                answer_cache.set(doc_hash, question, target_language, answer)
+    return answer
+
+
+def remember_answer(doc_hash, question, target_language, english, translated):
+    """Cache a fresh answer in English and, when translation succeeded, in the target language"""
+    if not Config.ANSWER_CACHE or not Config.GEMINI_API_KEY:
+        return
+    answer_cache.set(doc_hash, question, 'en', english)
+    if target_language != 'en' and translated != english:
+        answer_cache.set(doc_hash, question, target_language, translated)
+
+
+def stream_answer(question, context):
+    """Yield the answer to a question in chunks as the model generates it"""
+    # For demo purposes, stream a mock answer word by word if no API key
+    if not Config.GEMINI_API_KEY:
+        import random
+        for word in random.choice(DEMO_ANSWERS).split(' '):
+            yield word + ' '
+        return
+
+    yield from model_gateway.stream(Config.QA_MODEL, build_answer_prompt(question, context))
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -592,8 +978,6 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and processing"""
-    global document_data
-
     if 'file' not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
@@ -601,62 +985,458 @@ def upload_file():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
+    previous_document_id, previous = load_previous_version()
+    if previous_document_id and previous is None:
+        return jsonify({"error": "Previous document not found"}), 404
+
+    if Config.ASYNC_UPLOADS:
+        return enqueue_upload(file, previous_document_id)
+
     # Extract text from the file
-    text = extract_text_from_file(file)
-    if text is None:
+    try:
+        extracted = extract_document(file)
+    except ExtractionLimitError as e:
+        return jsonify({"error": str(e)}), 413
+    if extracted is None:
         return jsonify({"error": "Failed to extract text from file"}), 400
+    text = extracted.text
 
-    # Store the full text
-    document_data["full_text"] = text
+    # Split into clauses
+    with metrics.span('split'):
+        clauses = split_into_clauses(text, extracted.page_offsets, extracted.headings)
+
+    # A revision only re-analyzes the clauses whose text changed since the previous version
+    pending, summarize, revision = start_revision(previous_document_id, previous, text, clauses)
+    # The lazy and prioritized policies leave some clauses for later
+    pending, deferred = split_by_policy(pending)
+
+    # Generate the overall summary and analyze the remaining clauses concurrently
+    with metrics.span('analyze'):
+        summary, _ = analyze_document(
+            text, pending, summarize, analyze_clause_once,
+            analyze_batch=analyze_clauses_batch_once if Config.BATCH_CLAUSE_ANALYSIS else None,
+            summarize_last=Config.SUMMARY_MODE == 'clauses'
+        )
 
-    # Generate overall summary
-    document_data["summary"] = generate_summary(text)
+    document_id = new_document_id()
+    language = session.get('current_language', 'en')
+    document = make_document(text, extracted.page_offsets, summary, clauses)
+    document_store.save(document_id, document)
+    session['document_id'] = document_id
+    prerender_exports(document_id, document, language)
+    schedule_deferred_analysis(document_id, deferred, language)
 
-    # Split into clauses
-    clauses = split_into_clauses(text)
+    response = {
+        "message": "File uploaded successfully",
+        "document_id": document_id,
+        "summary": summary,
+        "clauses": clauses,
+        "pending_clauses": [clause["id"] for clause in deferred]
+    }
+    if revision is not None:
+        response["revision"] = finish_revision(revision, clauses)
+    return jsonify(response)
+
+
+def enqueue_upload(file, previous_document_id=None):
+    """Spool the upload to disk and queue it for background processing"""
+    job_id = uuid.uuid4().hex
+    document_id = new_document_id()
+
+    upload_dir = os.path.join(Config.UPLOAD_DIR, job_id)
+    os.makedirs(upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, secure_filename(file.filename) or 'upload')
+    file.save(path)
+
+    job_queue.enqueue(
+        'process_document',
+        {"path": path, "filename": file.filename, "document_id": document_id,
+         "language": session.get('current_language', 'en'), "previous_document_id": previous_document_id},
+        max_attempts=Config.JOB_MAX_ATTEMPTS,
+        job_id=job_id
+    )
+    if Config.JOB_WORKER_MODE == 'local':
+        job_worker.start()
+
+    session['document_id'] = document_id
+    return jsonify({
+        "message": "File queued for processing",
+        "job_id": job_id,
+        "document_id": document_id,
+        "status_url": f"/jobs/{job_id}"
+    }), 202
 
-    # Analyze all clauses immediately
-    analyzed_clauses = []
-    for clause in clauses:
-        summary, risk = analyze_clause(clause["content"])
-        clause["summary"] = summary
-        clause["risk"] = risk
-        analyzed_clauses.append(clause)
 
-    document_data["clauses"] = analyzed_clauses
+def process_document_job(payload, context):
+    """Run the upload pipeline for a queued job, reporting progress as it goes"""
+    document_id = payload["document_id"]
+
+    context.stage("extract")
+    with open(payload["path"], 'rb') as stream:
+        try:
+            extracted = extract_document(FileStorage(stream=stream, filename=payload["filename"]))
+        except ExtractionLimitError as e:
+            raise JobFailed(str(e))
+    if extracted is None:
+        raise JobFailed("Failed to extract text from file")
+    text = extracted.text
+    page_offsets = extracted.page_offsets
+
+    previous = None
+    previous_document_id = payload.get("previous_document_id")
+    if previous_document_id:
+        previous = document_store.get(previous_document_id)
+        if previous is None:
+            raise JobFailed("Previous document not found")
+
+    context.stage("split")
+    with metrics.span('split'):
+        clauses = split_into_clauses(text, extracted.page_offsets, extracted.headings)
+    retrieval_index = build_index(clauses)
+    pending, summarize, revision = start_revision(previous_document_id, previous, text, clauses)
+    document_store.save(document_id, make_document(text, page_offsets, "", clauses, retrieval_index))
+    pending_ids = {c["id"] for c in pending}
+    pending, deferred = split_by_policy(pending)
+    analyzed = [{"id": c["id"], "summary": c["summary"], "risk": c["risk"]} for c in clauses if c["id"] not in pending_ids]
+    context.progress(len(analyzed), len(clauses), document_id=document_id, summary="", clauses=analyzed)
+
+    context.stage("analyze")
+    summary = ""
+    for kind, result in iter_analysis(
+        text, pending, summarize, analyze_clause_once,
+        analyze_batch=analyze_clauses_batch_once if Config.BATCH_CLAUSE_ANALYSIS else None,
+        summarize_last=Config.SUMMARY_MODE == 'clauses'
+    ):
+        context.check_cancelled()
+        if kind == "summary":
+            summary = result
+        else:
+            analyzed.append({"id": result["id"], "summary": result["summary"], "risk": result["risk"]})
+        context.progress(len(analyzed), len(clauses), summary=summary, clauses=analyzed)
+
+    context.stage("save")
+    document = make_document(text, page_offsets, summary, clauses, retrieval_index)
+    document_store.save(document_id, document)
+    prerender_exports(document_id, document, payload.get("language", "en"))
+    schedule_deferred_analysis(document_id, deferred, payload.get("language", "en"))
+    result = {"document_id": document_id, "summary": summary, "clauses": clauses,
+              "pending_clauses": [clause["id"] for clause in deferred]}
+    if revision is not None:
+        result["revision"] = finish_revision(revision, clauses)
+    return result
+
+
+def process_batch_job(payload, context):
+    """Run a batch over an uploaded zip or a server directory, appending results to the job's JSONL file"""
+    context.stage("analyze")
+
+    def report(stats):
+        data = stats.as_dict()
+        context.progress(data["total"] - data["remaining"], data["total"], stats=data)
+
+    stats = run_batch_input(
+        payload.get("path") or payload["directory"],
+        payload["output"],
+        generate_summary,
+        analyze_clause,
+        analyze_batch=analyze_clauses_batch if Config.BATCH_CLAUSE_ANALYSIS else None,
+        on_progress=report,
+        check_cancelled=context.check_cancelled
+    )
+    return {"output": payload["output"], "stats": stats.as_dict()}
+
+
+def remove_job_upload(job):
+    """Delete a job's spooled upload once it can no longer be retried"""
+    if job["payload"].get("path"):
+        shutil.rmtree(os.path.dirname(job["payload"]["path"]), ignore_errors=True)
+
+
+job_worker = JobWorker(
+    job_queue,
+    {"process_document": process_document_job, "process_batch": process_batch_job},
+    concurrency=Config.JOB_WORKER_THREADS,
+    retry_backoff=Config.JOB_RETRY_BACKOFF_SECONDS,
+    lease_seconds=Config.JOB_LEASE_SECONDS,
+    on_finished=remove_job_upload
+)
+
+
+@app.before_request
+def start_local_job_worker():
+    """Start the local workers with the server, so jobs queued before a restart still run.
+
+    Not started at import, as the batch CLI and worker.py import this module too.
+    """
+    if Config.JOB_WORKER_MODE == 'local':
+        job_worker.start()
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report a background job's status, progress, stage timings and partial results"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
 
     return jsonify({
-        "message": "File uploaded successfully",
-        "summary": document_data["summary"],
-        "clauses": analyzed_clauses
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "timings": job["timings"],
+        "partial": job["partial"],
+        "result": job["result"],
+        "error": job["error"],
+        "attempts": job["attempts"]
     })
 
 
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job, or stop a running one at its next checkpoint"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    job_queue.cancel(job_id)
+    job = job_queue.get(job_id)
+    if job["status"] == 'cancelled':
+        # Never claimed by a worker, so nobody else will clean up the upload
+        remove_job_upload(job)
+    return jsonify({"job_id": job_id, "status": job["status"], "cancel_requested": job["cancel_requested"]})
+
+
+@app.route('/batch', methods=['POST'])
+def start_batch():
+    """Queue batch analysis of a zip of PDF/DOCX files, or of a directory under BATCH_INPUT_ROOT"""
+    job_id = uuid.uuid4().hex
+    payload = {"output": os.path.join(Config.BATCH_OUTPUT_DIR, f"{job_id}.jsonl")}
+
+    file = request.files.get('file')
+    if file and file.filename:
+        if not zipfile.is_zipfile(file.stream):
+            return jsonify({"error": "Batch uploads must be a zip file"}), 400
+        file.stream.seek(0)
+        upload_dir = os.path.join(Config.UPLOAD_DIR, job_id)
+        os.makedirs(upload_dir, exist_ok=True)
+        payload["path"] = os.path.join(upload_dir, 'batch.zip')
+        file.save(payload["path"])
+    else:
+        directory = (request.get_json(silent=True) or {}).get('directory')
+        if not directory:
+            return jsonify({"error": "Provide a zip file or a directory"}), 400
+        if not Config.BATCH_INPUT_ROOT:
+            return jsonify({"error": "Directory batches are disabled; set BATCH_INPUT_ROOT"}), 403
+        root = os.path.realpath(Config.BATCH_INPUT_ROOT)
+        directory = os.path.realpath(os.path.join(root, directory))
+        if os.path.commonpath([root, directory]) != root or not os.path.isdir(directory):
+            return jsonify({"error": "Directory not found under BATCH_INPUT_ROOT"}), 404
+        payload["directory"] = directory
+
+    job_queue.enqueue('process_batch', payload, max_attempts=Config.JOB_MAX_ATTEMPTS, job_id=job_id)
+    if Config.JOB_WORKER_MODE == 'local':
+        job_worker.start()
+
+    return jsonify({
+        "message": "Batch queued for processing",
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "results_url": f"/batch/{job_id}/results"
+    }), 202
+
+
+@app.route('/batch/<job_id>/results', methods=['GET'])
+def batch_results(job_id):
+    """Download a batch's JSONL results, including partial results while it is still running"""
+    job = job_queue.get(job_id)
+    if job is None or job["kind"] != 'process_batch':
+        return jsonify({"error": "Batch not found"}), 404
+    if not os.path.exists(job["payload"]["output"]):
+        return jsonify({"error": "No results yet"}), 404
+    return send_file(
+        os.path.abspath(job["payload"]["output"]),
+        mimetype='application/x-ndjson',
+        as_attachment=True,
+        download_name=f"legislens_batch_{job_id}.jsonl"
+    )
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/upload_stream', methods=['POST'])
+def upload_file_stream():
+    """Handle file upload and stream results as Server-Sent Events while they are produced"""
+    if 'file' not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"error": "No selected file"}), 400
+
+    # Extract before streaming so extraction failures still get a plain error response
+    try:
+        extracted = extract_document(file)
+    except ExtractionLimitError as e:
+        return jsonify({"error": str(e)}), 413
+    if extracted is None:
+        return jsonify({"error": "Failed to extract text from file"}), 400
+    text = extracted.text
+    page_offsets = extracted.page_offsets
+
+    previous_document_id, previous = load_previous_version()
+    if previous_document_id and previous is None:
+        return jsonify({"error": "Previous document not found"}), 404
+
+    # Register the document up front so /ask works while clauses are still being analyzed.
+    # The session has to be updated here, before the response headers are sent.
+    document_id = new_document_id()
+    document_store.save(document_id, make_document(text, page_offsets, "", []))
+    session['document_id'] = document_id
+    language = session.get('current_language', 'en')
+
+    def generate():
+        yield sse_event("stats", {
+            "pages": len(page_offsets),
+            "characters": len(text),
+            "words": len(text.split()),
+            "lines": text.count("\n")
+        })
+
+        with metrics.span('split'):
+            clauses = split_into_clauses(text, extracted.page_offsets, extracted.headings)
+        retrieval_index = build_index(clauses)
+        # Clauses unchanged since the previous version arrive already analyzed
+        pending, summarize, revision = start_revision(previous_document_id, previous, text, clauses)
+        pending, deferred = split_by_policy(pending)
+        document_store.save(document_id, make_document(text, page_offsets, "", clauses, retrieval_index))
+        yield sse_event("clauses", {
+            "document_id": document_id,
+            "clauses": [
+                {"id": c["id"], "title": c["title"], "preview": c["preview"],
+                 "content": c["content"], "summary": c["summary"], "risk": c["risk"]}
+                for c in clauses
+            ]
+        })
+
+        summary = ""
+        try:
+            for kind, payload in iter_analysis(
+                text, pending, summarize, analyze_clause_once,
+                analyze_batch=analyze_clauses_batch_once if Config.BATCH_CLAUSE_ANALYSIS else None,
+                summarize_last=Config.SUMMARY_MODE == 'clauses'
+            ):
+                if kind == "summary":
+                    summary = payload
+                    yield sse_event("summary", {"summary": summary})
+                else:
+                    yield sse_event("clause", {
+                        "id": payload["id"], "summary": payload["summary"], "risk": payload["risk"]
+                    })
+        except Exception as e:
+            print(f"Streaming analysis failed: {e}")
+            yield sse_event("error", {"error": f"Analysis failed: {str(e)}"})
+            return
+
+        document = make_document(text, page_offsets, summary, clauses, retrieval_index)
+        document_store.save(document_id, document)
+        prerender_exports(document_id, document, language)
+        schedule_deferred_analysis(document_id, deferred, language)
+
+        if revision is not None:
+            yield sse_event("revision", finish_revision(revision, clauses))
+        yield sse_event("done", {
+            "message": "File uploaded successfully",
+            "document_id": document_id,
+            "clause_count": len(clauses),
+            "pending_clauses": [clause["id"] for clause in deferred]
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.route('/analyze_clause/<int:clause_id>', methods=['GET'])
 def analyze_clause_route(clause_id):
     """Analyze a specific clause"""
-    global document_data
+    document_id, document_data = load_document()
+    if not document_data:
+        return jsonify({"error": "Document not found"}), 404
 
-    if clause_id < 0 or clause_id >= len(document_data["clauses"]):
+    # Clause ids are not always list positions, so look the clause up by id
+    clause = next((c for c in document_data["clauses"] if c["id"] == clause_id), None)
+    if clause is None:
         return jsonify({"error": "Invalid clause ID"}), 404
 
-    clause = document_data["clauses"][clause_id]
-
-    # If we haven't analyzed this clause yet, do it now
-    if not clause.get("summary") or clause.get("risk") == "unknown":
-        summary, risk = analyze_clause(clause["content"])
+    # If we haven't analyzed this clause yet, do it now (joining a background analysis of it, if any)
+    if is_unanalyzed(clause):
+        summary, risk = analyze_clause_once(clause["content"])
         clause["summary"] = summary
         clause["risk"] = risk
-        document_data["clauses"][clause_id] = clause
+        store_clause_results(document_id, {clause_id: (summary, risk)})
+        if Config.SUMMARY_MODE == 'clauses':
+            background_analysis.submit(refresh_summary, document_id)
 
     return jsonify(clause)
 
 
+def translate_answer(answer, target_language):
+    """Translate an answer (or part of one) for display; returns it unchanged for English or on failure"""
+    if target_language == 'en':
+        return answer
+    try:
+        # For demo purposes without API key
+        if not os.environ.get('GOOGLE_APPLICATION_CREDENTIALS') and translate_client is None:
+            # Simple word-based translation for demo
+            translations = {
+                'hi': {
+                    'Based on the document': 'दस्तावेज़ के आधार पर',
+                    'termination notice period': 'समाप्ति सूचना अवधि',
+                    'payments are due': 'भुगतान देय हैं',
+                    'confidential information': 'गोपनीय जानकारी',
+                    'liability is limited': 'दायित्व सीमित है',
+                    'governing law': 'लागू कानून'
+                },
+                'es': {
+                    'Based on the document': 'Según el documento',
+                    'termination notice period': 'período de preaviso de terminación',
+                    'payments are due': 'los pagos vencen',
+                    'confidential information': 'información confidencial',
+                    'liability is limited': 'la responsabilidad es limitada',
+                    'governing law': 'ley aplicable'
+                },
+                'fr': {
+                    'Based on the document': 'Selon le document',
+                    'termination notice period': 'délai de préavis de résiliation',
+                    'payments are due': 'les paiements sont dus',
+                    'confidential information': 'informations confidentielles',
+                    'liability is limited': 'la responsabilité est limitée',
+                    'governing law': 'droit applicable'
+                }
+            }
+
+            # Simple word replacement for demo
+            lang_translations = translations.get(target_language, {})
+            for eng_phrase, trans_phrase in lang_translations.items():
+                answer = answer.replace(eng_phrase, trans_phrase)
+        elif translator:
+            # Real translation with Google Cloud Translation API
+            answer = translator.translate(answer, target_language)
+    except Exception as e:
+        print(f"Answer translation failed: {e}")
+        # Continue with English answer if translation fails
+    return answer
+
+
 @app.route('/ask', methods=['POST'])
 def ask_question():
     """Handle questions about the document with translation support"""
-    global document_data
-
     data = request.json
     question = data.get('question', '')
     target_language = data.get('language', 'en')  # Get target language for answer translation
@@ -664,58 +1444,127 @@ def ask_question():
     if not question:
         return jsonify({"error": "No question provided"}), 400
 
-    if not document_data["full_text"]:
+    _, document_data = load_document()
+    if not document_data or not document_data["full_text"]:
         return jsonify({"error": "No document available for reference"}), 400
 
+    # Repeated and near-duplicate questions are answered from the cache, already translated
+    doc_hash = document_hash(document_data)
+    answer = lookup_answer(doc_hash, question, target_language)
+    if answer is not None:
+        return jsonify({"answer": answer, "cached": True})
+
     # Answer the question based on the document
-    answer = answer_question(question, document_data["full_text"])
+    # Send only the clauses most relevant to the question, within the context token budget
+    with metrics.span('retrieval'):
+        context = select_context(document_data, question, Config.ASK_CONTEXT_TOKEN_BUDGET, Config.ASK_TOP_K_CLAUSES)
+    try:
+        english = generate_answer(question, context)
+    except Exception as e:
+        return jsonify({"answer": f"I'm sorry, I couldn't process your question: {str(e)}"})
 
     # If a specific language is requested and not English, translate the answer
-    if target_language != 'en':
-        try:
-            # For demo purposes without API key
-            if not os.environ.get('GOOGLE_APPLICATION_CREDENTIALS') and translate_client is None:
-                # Simple word-based translation for demo
-                translations = {
-                    'hi': {
-                        'Based on the document': 'दस्तावेज़ के आधार पर',
-                        'termination notice period': 'समाप्ति सूचना अवधि',
-                        'payments are due': 'भुगतान देय हैं',
-                        'confidential information': 'गोपनीय जानकारी',
-                        'liability is limited': 'दायित्व सीमित है',
-                        'governing law': 'लागू कानून'
-                    },
-                    'es': {
-                        'Based on the document': 'Según el documento',
-                        'termination notice period': 'período de preaviso de terminación',
-                        'payments are due': 'los pagos vencen',
-                        'confidential information': 'información confidencial',
-                        'liability is limited': 'la responsabilidad es limitada',
-                        'governing law': 'ley aplicable'
-                    },
-                    'fr': {
-                        'Based on the document': 'Selon le document',
-                        'termination notice period': 'délai de préavis de résiliation',
-                        'payments are due': 'les paiements sont dus',
-                        'confidential information': 'informations confidentielles',
-                        'liability is limited': 'la responsabilité est limitée',
-                        'governing law': 'droit applicable'
-                    }
-                }
+    answer = translate_answer(english, target_language)
+    remember_answer(doc_hash, question, target_language, english, answer)
+
+    return jsonify({"answer": answer})
+
+
+@app.route('/ask_stream', methods=['POST'])
+def ask_question_stream():
+    """Stream the answer to a question as Server-Sent Events while the model generates it
 
-                # Simple word replacement for demo
-                lang_translations = translations.get(target_language, {})
-                for eng_phrase, trans_phrase in lang_translations.items():
-                    answer = answer.replace(eng_phrase, trans_phrase)
-            elif translate_client:
-                # Real translation with Google Cloud Translation API
-                result = translate_client.translate(answer, target_language=target_language)
-                answer = result['translatedText']
+    English answers are forwarded chunk by chunk; translated answers are
+    sent one complete sentence at a time. Cached answers are sent whole.
+    The final "done" event carries the full answer and the time to first
+    token.
+    """
+    started_at = time.perf_counter()
+    data = request.get_json(silent=True) or {}
+    question = data.get('question', '')
+    target_language = data.get('language', 'en')
+
+    if not question:
+        return jsonify({"error": "No question provided"}), 400
+
+    _, document_data = load_document()
+    if not document_data or not document_data["full_text"]:
+        return jsonify({"error": "No document available for reference"}), 400
+
+    doc_hash = document_hash(document_data)
+    cached = lookup_answer(doc_hash, question, target_language)
+    context = None
+    if cached is None:
+        with metrics.span('retrieval'):
+            context = select_context(document_data, question, Config.ASK_CONTEXT_TOKEN_BUDGET, Config.ASK_TOP_K_CLAUSES)
+
+    def generate():
+        if cached is not None:
+            ttft_ms = round((time.perf_counter() - started_at) * 1000, 1)
+            ask_ttft_ms.append(ttft_ms)
+            ask_ttft_seconds.observe(ttft_ms / 1000)
+            yield sse_event("token", {"text": cached})
+            yield sse_event("done", {"answer": cached, "ttft_ms": ttft_ms, "total_ms": ttft_ms, "cached": True})
+            return
+
+        first_token_at = None
+        english = []
+        parts = []
+        pending = ""
+        try:
+            for chunk in stream_answer(question, context):
+                english.append(chunk)
+                if target_language == 'en':
+                    text = chunk
+                else:
+                    pending += chunk
+                    complete, pending = split_complete_sentences(pending)
+                    if not complete:
+                        continue
+                    text = translate_answer(complete.strip(), target_language) + " "
+
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+
+            if pending.strip():
+                text = translate_answer(pending.strip(), target_language)
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(text)
+                yield sse_event("token", {"text": text})
         except Exception as e:
-            print(f"Answer translation failed: {e}")
-            # Continue with English answer if translation fails
+            print(f"Streaming answer failed: {e}")
+            yield sse_event("error", {"error": f"I'm sorry, I couldn't process your question: {str(e)}"})
+            return
+
+        answer = "".join(parts).strip()
+        remember_answer(doc_hash, question, target_language, "".join(english).strip(), answer)
+
+        ttft_ms = round((first_token_at - started_at) * 1000, 1) if first_token_at else None
+        if ttft_ms is not None:
+            ask_ttft_ms.append(ttft_ms)
+            ask_ttft_seconds.observe(ttft_ms / 1000)
+        yield sse_event("done", {
+            "answer": answer,
+            "ttft_ms": ttft_ms,
+            "total_ms": round((time.perf_counter() - started_at) * 1000, 1)
+        })
 
-    return jsonify({"answer": answer})
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers; None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
 
 
 @app.route('/translate', methods=['POST'])
@@ -781,8 +1630,7 @@ def translate_text():
             return jsonify({"translated_text": translated_text})
 
         # Real translation with Google Cloud Translation API (without context prefix)
-        result = translate_client.translate(text, target_language=target_language)
-        return jsonify({"translated_text": result['translatedText']})
+        return jsonify({"translated_text": translator.translate(text, target_language)})
     except Exception as e:
         print(f"Translation failed: {e}")
         return jsonify({"translated_text": text})  # Return original text on error
@@ -871,15 +1719,11 @@ def translate_bulk():
             translated_texts = mock_translations.get(target_language, mock_translations['en'])
             return jsonify({"translated_texts": translated_texts})
 
-        # Real translation with Google Cloud Translation API (without context prefix)
-        translated_texts = {}
-        for key, text in texts.items():
-            if text:  # Only translate non-empty texts
-                # Translate without adding context prefix
-                result = translate_client.translate(text, target_language=target_language)
-                translated_texts[key] = result['translatedText']
-            else:
-                translated_texts[key] = text
+        # Real translation with Google Cloud Translation API (without context prefix):
+        # cached strings are free and the rest go out in a single batched call
+        keys = list(texts)
+        translated = translator.translate_many([texts[key] for key in keys], target_language)
+        translated_texts = dict(zip(keys, translated))
 
         return jsonify({"translated_texts": translated_texts})
     except Exception as e:
@@ -887,12 +1731,24 @@ def translate_bulk():
         return jsonify({"error": f"Bulk translation failed: {str(e)}"}), 500
 
 
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Report cache hit/miss counters, model gateway counters and streamed answer time to first token"""
+    samples = list(ask_ttft_ms)
+    return jsonify({
+        "analysis_cache": analysis_cache.stats(),
+        "export_cache": export_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "model_gateway": model_gateway.stats(),
+        "ask_stream": {
+            "answers": len(samples),
+            "ttft_p50_ms": percentile(samples, 0.5),
+            "ttft_p95_ms": percentile(samples, 0.95)
+        }
+    })
+
+
 @app.route('/current_language', methods=['GET'])
 def get_current_language():
     return jsonify({"language": session.get('current_language', 'en')})
 
-
-if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5000))
-    debug = os.environ.get('FLASK_ENV') != 'production'
-    app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
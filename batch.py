@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from analysis import analyze_document
+from config import Config
+from extraction import extract_path
+from segmenter import split_into_clauses
+
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+# One input file: its name relative to the batch input, path on disk and content hash
+BatchSource = namedtuple('BatchSource', ['name', 'path', 'sha256'])
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _inside(root, path):
+    """True when path, with symlinks resolved, lies inside root"""
+    root = os.path.realpath(root)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def collect_sources(input_path, workdir):
+    """List the PDF and DOCX files in a directory tree or zip archive, in a stable order.
+
+    Zip members are extracted into `workdir`, which must outlive the batch run.
+    Files that resolve outside the input (absolute or ".." member names,
+    symlinks) are left out. Returns (sources, rejected), where rejected
+    counts the files left out that way.
+    """
+    entries = []
+    rejected = 0
+    if zipfile.is_zipfile(input_path):
+        with zipfile.ZipFile(input_path) as archive:
+            names = sorted(n for n in archive.namelist() if n.lower().endswith(SUPPORTED_EXTENSIONS))
+            for name in names:
+                # Use the path extract() wrote to, never the raw member name joined to workdir
+                path = archive.extract(name, workdir)
+                if _inside(workdir, path):
+                    entries.append((os.path.relpath(path, workdir), path))
+                else:
+                    rejected += 1
+    elif os.path.isdir(input_path):
+        for directory, subdirectories, filenames in os.walk(input_path):
+            subdirectories.sort()
+            for filename in sorted(filenames):
+                if filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.join(directory, filename)
+                    if _inside(input_path, path):
+                        entries.append((os.path.relpath(path, input_path), path))
+                    else:
+                        rejected += 1
+    else:
+        raise ValueError(f"Batch input must be a directory or a zip file: {input_path}")
+
+    sources = []
+    for name, path in entries:
+        if os.path.isfile(path):
+            sources.append(BatchSource(name.replace(os.sep, '/'), path, _file_sha256(path)))
+    return sources, rejected
+
+
+def load_completed(output_path):
+    """Return the (name, sha256) pairs already written successfully to a results file.
+
+    A line cut short by a crash is truncated away so appending resumes cleanly.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            f.truncate(end)
+
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") == "ok":
+            completed.add((record["source"], record["sha256"]))
+    return completed
+
+
+def prepare_document(path, max_pages, max_bytes):
+    """CPU stages for one file, run in a worker process: extract the text and split it into clauses"""
+    extracted = extract_path(path, max_pages, max_bytes, Config.MAX_DOCX_XML_BYTES, Config.MAX_EXTRACTED_CHARS)
+    if extracted is None:
+        raise ValueError("Failed to extract text from file")
+    clauses = split_into_clauses(extracted.text, extracted.page_offsets, extracted.headings)
+    return extracted.text, extracted.page_offsets, clauses
+
+
+class BatchStats:
+    """Running counts and throughput of a batch run.
+
+    `skipped` counts documents already done by an earlier run; `rejected`
+    counts input files left out for resolving outside the batch input.
+    """
+
+    def __init__(self, total, skipped, rejected=0):
+        self.total = total
+        self.skipped = skipped
+        self.rejected = rejected
+        self.succeeded = 0
+        self.failed = 0
+        self.clauses = 0
+        self.started_at = time.time()
+
+    def as_dict(self):
+        minutes = max(time.time() - self.started_at, 1e-9) / 60
+        processed = self.succeeded + self.failed
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "remaining": self.total - self.skipped - processed,
+            "clauses": self.clauses,
+            "elapsed_seconds": round(minutes * 60, 1),
+            "documents_per_minute": round(processed / minutes, 2),
+            "clauses_per_minute": round(self.clauses / minutes, 2),
+        }
+
+
+def run_batch(sources, output_path, summarize, analyze, analyze_batch=None, extract_workers=None,
+              concurrency=None, max_pages=None, max_bytes=None, on_progress=None, check_cancelled=None, rejected=0):
+    """Analyze every source and append one JSON line per document to output_path.
+
+    Extraction and clause splitting run in a process pool; documents are
+    analyzed on `concurrency` threads whose model calls share the
+    process-wide model call limit. Sources already recorded as "ok" in the
+    output are skipped, so a crashed or interrupted run resumes where it
+    stopped. `rejected`, the count of input files collect_sources left out,
+    is carried into the stats. Returns the final throughput stats.
+    """
+    extract_workers = extract_workers or Config.BATCH_EXTRACT_WORKERS
+    concurrency = concurrency or Config.BATCH_DOCUMENT_CONCURRENCY
+    max_pages = max_pages or Config.MAX_PDF_PAGES
+    max_bytes = max_bytes or Config.MAX_EXTRACT_BYTES
+
+    completed = load_completed(output_path)
+    pending = [source for source in sources if (source.name, source.sha256) not in completed]
+    stats = BatchStats(len(sources), len(sources) - len(pending), rejected)
+    write_lock = threading.Lock()
+
+    def analyze_prepared(source, prepared, started_at):
+        text, page_offsets, clauses = prepared
+        summary, analyzed = analyze_document(text, clauses, summarize, analyze, analyze_batch=analyze_batch)
+        return {
+            "source": source.name,
+            "sha256": source.sha256,
+            "status": "ok",
+            "pages": len(page_offsets),
+            "characters": len(text),
+            "summary": summary,
+            "clauses": [{key: value for key, value in clause.items() if key != "preview"} for clause in analyzed],
+            "seconds": round(time.time() - started_at, 3)
+        }
+
+    def record(out, line):
+        with write_lock:
+            out.write(json.dumps(line) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            if line["status"] == "ok":
+                stats.succeeded += 1
+                stats.clauses += len(line["clauses"])
+            else:
+                stats.failed += 1
+        if on_progress:
+            on_progress(stats)
+
+    def failure(source, error):
+        print(f"Batch document failed: {source.name}: {error}")
+        return {"source": source.name, "sha256": source.sha256, "status": "error", "error": str(error)}
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    remaining = iter(pending)
+    preparing = {}
+    analyzing = {}
+    # Prepare a little ahead of analysis, but never hold more than a window of documents in memory
+    window = concurrency * 2
+
+    pool = ProcessPoolExecutor(max_workers=extract_workers, mp_context=multiprocessing.get_context('spawn'))
+    analyzers = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch-analyze')
+    try:
+        with open(output_path, 'a', encoding='utf-8') as out:
+            while True:
+                while len(preparing) + len(analyzing) < window:
+                    source = next(remaining, None)
+                    if source is None:
+                        break
+                    future = pool.submit(prepare_document, source.path, max_pages, max_bytes)
+                    preparing[future] = (source, time.time())
+                if not preparing and not analyzing:
+                    break
+
+                finished, _ = wait(list(preparing) + list(analyzing), return_when=FIRST_COMPLETED)
+                if check_cancelled:
+                    check_cancelled()
+                for future in finished:
+                    if future in preparing:
+                        source, started_at = preparing.pop(future)
+                        try:
+                            prepared = future.result()
+                        except Exception as e:
+                            record(out, failure(source, e))
+                            continue
+                        analyzing[analyzers.submit(analyze_prepared, source, prepared, started_at)] = source
+                    else:
+                        source = analyzing.pop(future)
+                        try:
+                            record(out, future.result())
+                        except Exception as e:
+                            record(out, failure(source, e))
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        analyzers.shutdown(wait=True, cancel_futures=True)
+
+    return stats
+
+
+def run_batch_input(input_path, output_path, summarize, analyze, **kwargs):
+    """Collect the sources of a directory or zip file and run the batch over them"""
+    with tempfile.TemporaryDirectory(prefix='legislens-batch-') as workdir:
+        sources, rejected = collect_sources(input_path, workdir)
+        return run_batch(sources, output_path, summarize, analyze, rejected=rejected, **kwargs)
+
+
+def format_stats(stats):
+    data = stats.as_dict()
+    return (f"{data['succeeded'] + data['failed'] + data['skipped']}/{data['total']} documents "
+            f"({data['failed']} failed, {data['skipped']} skipped, {data['rejected']} rejected) - "
+            f"{data['documents_per_minute']} documents/min, {data['clauses_per_minute']} clauses/min")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a directory or zip of PDF/DOCX files into a JSONL file")
+    parser.add_argument('input', help="directory or .zip file of PDF and DOCX documents")
+    parser.add_argument('-o', '--output', default='batch_results.jsonl', help="JSONL results file, appended to and resumed from")
+    parser.add_argument('--concurrency', type=int, default=Config.BATCH_DOCUMENT_CONCURRENCY, help="documents analyzed at once")
+    parser.add_argument('--workers', type=int, default=Config.BATCH_EXTRACT_WORKERS, help="extraction processes")
+    args = parser.parse_args(argv)
+
+    # The model-backed functions live in the web app module
+    from app import analyze_clause, analyze_clauses_batch, generate_summary
+
+    stats = run_batch_input(
+        args.input, args.output, generate_summary, analyze_clause,
+        analyze_batch=analyze_clauses_batch if Config.BATCH_CLAUSE_ANALYSIS else None,
+        extract_workers=args.workers,
+        concurrency=args.concurrency,
+        on_progress=lambda s: print(format_stats(s), file=sys.stderr)
+    )
+    print(json.dumps(stats.as_dict()))
+    return 0 if stats.failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
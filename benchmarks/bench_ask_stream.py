@@ -0,0 +1,77 @@
+"""Compare time to first token of /ask_stream with the time /ask takes to return an answer.
+
+    python benchmarks/bench_ask_stream.py [--questions 20] [--chunk-delay 0.05] [--language en]
+
+The app runs in-process against the local Gemini stub, which generates an
+answer in chunks spaced --chunk-delay seconds apart.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+from stub_gemini import StubGeminiServer  # noqa: E402
+
+
+QUESTION = "What are the payment obligations?"
+
+
+def sample_docx():
+    import docx
+    document = docx.Document()
+    for i in range(6):
+        document.add_paragraph(f"ARTICLE {i + 1} - Payment Terms {i}")
+        document.add_paragraph("The Tenant shall pay the monthly rent on the first day of each month. " * 3)
+    out = io.BytesIO()
+    document.save(out)
+    out.seek(0)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--chunk-delay', type=float, default=0.05)
+    parser.add_argument('--language', default='en')
+    args = parser.parse_args()
+
+    server = StubGeminiServer(('127.0.0.1', 0), requests_per_second=1000, burst=100,
+                              latency=0.05, chunk_delay=args.chunk_delay)
+    server.start()
+    os.environ.update(GEMINI_API_ENDPOINT=server.endpoint, GEMINI_API_KEY='stub', ASYNC_UPLOADS='false',
+                      PRERENDER_EXPORTS='false')
+    import app  # noqa: E402  (reads the environment above at import)
+
+    client = app.app.test_client()
+    client.post('/upload', data={'file': (sample_docx(), 'lease.docx')}, content_type='multipart/form-data')
+    payload = {"question": QUESTION, "language": args.language}
+
+    blocking = []
+    first_tokens = []
+    for _ in range(args.questions):
+        start = time.perf_counter()
+        client.post('/ask', json=payload)
+        blocking.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = client.post('/ask_stream', json=payload, buffered=False)
+        first = None
+        for chunk in response.response:
+            if first is None and b'event: token' in chunk:
+                first = time.perf_counter() - start
+        first_tokens.append(first)
+
+    print(f"{'endpoint':>12} {'p50 ms':>8} {'max ms':>8}")
+    print(f"{'/ask answer':>12} {statistics.median(blocking) * 1000:>8.0f} {max(blocking) * 1000:>8.0f}")
+    print(f"{'stream TTFT':>12} {statistics.median(first_tokens) * 1000:>8.0f} {max(first_tokens) * 1000:>8.0f}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
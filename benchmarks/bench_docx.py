@@ -0,0 +1,138 @@
+"""Compare the streaming DOCX extractor with reading the document through python-docx.
+
+Writes a synthetic contract with styled headings, clause paragraphs and fee
+tables whose word/document.xml is about --size-mb megabytes, then extracts it
+both ways, each in a fresh process so peak memory is measured separately.
+
+    python benchmarks/bench_docx.py [--size-mb 50] [--keep PATH]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+WORDS = ("tenant landlord premises rent deposit term notice party agreement obligation payment "
+         "liability indemnify breach remedy termination renewal assignment insurance repair").split()
+
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def _paragraph(text, style=None):
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    return f'<w:p>{properties}<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def _table(rows):
+    cells = ''.join(
+        '<w:tr>' + ''.join(f'<w:tc><w:tcPr/>{_paragraph(cell)}</w:tc>' for cell in row) + '</w:tr>'
+        for row in rows
+    )
+    return f'<w:tbl><w:tblPr/><w:tblGrid/>{cells}</w:tbl>'
+
+
+def write_docx(path, size_mb, seed=7):
+    """Write a DOCX whose body is about size_mb of XML, streaming it into the zip"""
+    import docx
+
+    # Start from python-docx's default template so both extractors accept the file
+    template = io.BytesIO()
+    docx.Document().save(template)
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as out:
+        for item in source.infolist():
+            if item.filename != 'word/document.xml':
+                out.writestr(item, source.read(item.filename))
+
+        with out.open('word/document.xml', 'w', force_zip64=True) as body:
+            body.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                       f'<w:document xmlns:w="{_W_NS}"><w:body>'.encode('utf-8'))
+            written = 0
+            article = 0
+            while written < target:
+                article += 1
+                chunk = [_paragraph(f'ARTICLE {article} - {rng.choice(WORDS).title()} Terms', 'Heading1')]
+                for _ in range(rng.randint(2, 6)):
+                    chunk.append(_paragraph(' '.join(rng.choice(WORDS) for _ in range(rng.randint(30, 90))) + '.'))
+                if article % 3 == 0:
+                    chunk.append(_table([[f'Item {article}.{row}', rng.choice(WORDS), f'${rng.randint(10, 9999)}']
+                                         for row in range(rng.randint(2, 8))]))
+                data = ''.join(chunk).encode('utf-8')
+                body.write(data)
+                written += len(data)
+            body.write(b'<w:sectPr/></w:body></w:document>')
+
+
+def run_one(method, path):
+    """Extract path with one method in this process; prints seconds, peak RSS and text stats as JSON"""
+    start = time.perf_counter()
+    if method == 'python-docx':
+        import docx
+        document = docx.Document(path)
+        text = ''.join(paragraph.text + '\n' for paragraph in document.paragraphs)
+        headings = None
+    else:
+        from extraction import extract_docx
+        with open(path, 'rb') as stream:
+            extracted = extract_docx(stream)
+        text, headings = extracted.text, extracted.headings
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_rss_mb": peak_mb,
+        "characters": len(text),
+        "lines": text.count('\n'),
+        "table_rows": text.count(' | ') // 2,
+        "headings": len(headings) if headings is not None else None
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=50, help='approximate uncompressed size of word/document.xml')
+    parser.add_argument('--keep', help='write the generated DOCX here and keep it')
+    parser.add_argument('--run', choices=['python-docx', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('path', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run, args.path)
+        return
+
+    directory = tempfile.mkdtemp(prefix='bench-docx-')
+    path = args.keep or os.path.join(directory, 'contract.docx')
+    try:
+        start = time.perf_counter()
+        write_docx(path, args.size_mb)
+        print(f"Generated {path}: {os.path.getsize(path) / 1024 / 1024:.1f} MB zipped, "
+              f"~{args.size_mb} MB of XML in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'extractor':>12} {'seconds':>9} {'peak MB':>9} {'chars':>11} {'lines':>9} {'rows':>7} {'headings':>9}")
+        for method in ('python-docx', 'streaming'):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--run', method, path],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{method:>12} {result['seconds']:>9.2f} {result['peak_rss_mb']:>9.0f} {result['characters']:>11} "
+                  f"{result['lines']:>9} {result['table_rows']:>7} {str(result['headings']):>9}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
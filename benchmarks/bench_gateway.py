@@ -0,0 +1,82 @@
+"""Compare direct Gemini calls with calls through the model gateway against a throttling stub.
+
+    python benchmarks/bench_gateway.py [--calls 200] [--threads 16] [--rps 20]
+
+Both runs fire the same number of calls from the same number of threads at
+a local stub that allows --rps requests per second. Direct calls fail as soon
+as they are throttled; gateway calls are rate limited, back off and retry.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from model_clients import ModelClientRegistry  # noqa: E402
+from model_gateway import ModelGateway  # noqa: E402
+from stub_gemini import StubGeminiServer  # noqa: E402
+
+
+MODEL_NAME = 'gemini-2.0-flash'
+PROMPT = "Please analyze this legal clause.\n\nClause: The Tenant shall pay rent monthly.\n\nSUMMARY: ...\nRISK: ..."
+
+
+model_clients = None
+
+
+def call_gemini(model_name, prompt, timeout):
+    response = model_clients.get(model_name).generate_content(prompt, request_options={"timeout": timeout})
+    return response.text
+
+
+def run(label, server, call, calls, threads):
+    before = dict(server.counts)
+    failures = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(call) for _ in range(calls)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                failures += 1
+    elapsed = time.perf_counter() - start
+    throttled = server.counts["throttled"] - before["throttled"]
+    print(f"{label:>8} {calls - failures:>9} {failures:>8} {throttled:>10} {elapsed:>9.2f} {(calls - failures) / elapsed:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rps', type=float, default=20.0, help='stub server quota in requests per second')
+    args = parser.parse_args()
+
+    server = StubGeminiServer(('127.0.0.1', 0), requests_per_second=args.rps, burst=5, latency=0.05)
+    server.start()
+    global model_clients
+    model_clients = ModelClientRegistry('stub', endpoint=server.endpoint)
+
+    gateway = ModelGateway(
+        call_gemini,
+        requests_per_minute=args.rps * 60,
+        tokens_per_minute=10 ** 7,
+        max_concurrency=args.threads,
+        backoff_base=0.2,
+        backoff_max=2.0,
+        timeout=10.0
+    )
+
+    print(f"{'mode':>8} {'succeeded':>9} {'failed':>8} {'throttled':>10} {'seconds':>9} {'ok/s':>9}")
+    run('direct', server, lambda: call_gemini(MODEL_NAME, PROMPT, 10.0), args.calls, args.threads)
+    # Let the stub's bucket refill so both runs start from the same quota
+    time.sleep(1.0)
+    run('gateway', server, lambda: gateway.generate(MODEL_NAME, PROMPT), args.calls, args.threads)
+    print(f"gateway stats: {gateway.stats()}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
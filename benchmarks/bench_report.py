@@ -0,0 +1,62 @@
+"""Measure PDF report throughput for documents of 10, 100 and 1000 clauses.
+
+    python benchmarks/bench_report.py [--clauses 10 100 1000] [--seconds 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from report import write_report  # noqa: E402
+
+
+SAMPLE_TEXT = ("The Tenant shall pay the Landlord the monthly rent on or before the first day of each month "
+               "without any deduction or set-off. Late payments accrue interest at 1.5% per month & the "
+               "Landlord may terminate this Agreement on <30> days written notice. ")
+
+
+def synthetic_document(clause_count):
+    return {
+        "summary": "This lease sets out the rent, deposit, maintenance and termination terms. " * 3,
+        "clauses": [
+            {
+                "id": i,
+                "title": f"Clause {i + 1} Payment Terms",
+                "content": SAMPLE_TEXT * random.randint(2, 8),
+                "summary": "The tenant must pay rent monthly and late payments incur interest.",
+                "risk": random.choice(["low", "medium", "high", "unknown"])
+            }
+            for i in range(clause_count)
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clauses', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--seconds', type=float, default=5.0, help='minimum time to spend per size')
+    args = parser.parse_args()
+
+    random.seed(11)
+    print(f"{'clauses':>8} {'reports':>8} {'reports/s':>10} {'ms/report':>10} {'KB/report':>10}")
+    for clause_count in args.clauses:
+        document = synthetic_document(clause_count)
+        reports = 0
+        size = 0
+        start = time.perf_counter()
+        while reports == 0 or time.perf_counter() - start < args.seconds:
+            out = BytesIO()
+            write_report(document, out)
+            size = out.tell()
+            reports += 1
+        elapsed = time.perf_counter() - start
+        print(f"{clause_count:>8} {reports:>8} {reports / elapsed:>10.2f} "
+              f"{elapsed / reports * 1000:>10.1f} {size / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Compare segmenter.split_into_clauses with the original regex-retry implementation.
+
+Generates synthetic ~1 MB contracts in several heading styles, checks that
+both implementations produce the same clauses and reports timings.
+
+    python benchmarks/bench_segmenter.py [--size-mb 1] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from segmenter import split_into_clauses  # noqa: E402
+
+
+def legacy_extract_title_from_header(header):
+    """The original extract_title_from_header, kept verbatim for comparison"""
+    # Remove excessive whitespace
+    header = ' '.join(header.split())
+
+    # Remove common prefixes and clean up
+    patterns = [
+        r'^(ARTICLE|SECTION|CLAUSE|§|[\dIVX]+\.)\s*',
+        r'^\s*[\dIVX]+\s*[-–]\s*',
+        r'^\s*\([a-zA-Z]\)\s*'
+    ]
+
+    for pattern in patterns:
+        header = re.sub(pattern, '', header, flags=re.IGNORECASE)
+
+    # Limit length and ensure it's not empty
+    if not header or header.isspace():
+        return "Untitled Clause"
+
+    if len(header) > 60:
+        return header[:57] + '...'
+
+    return header
+
+
+def legacy_split_into_clauses(text):
+    """The original split_into_clauses, kept verbatim for comparison"""
+    clauses = []
+
+    # First, try to find sections based on common legal patterns
+    patterns = [
+        r'(\n\s*(ARTICLE|ARTICLE\s+\d+)[^\n]*\n)',
+        r'(\n\s*(SECTION|SECTION\s+[\d\.]+)[^\n]*\n)',
+        r'(\n\s*(CLAUSE|CLAUSE\s+[\d\.]+)[^\n]*\n)',
+        r'(\n\s*§\s*[\d\.]+[^\n]*\n)',
+        r'(\n\s*[\dIVX]+\.\s+[A-Z][^\n]*\n)',
+    ]
+
+    # Try each pattern until we find a good split
+    for pattern in patterns:
+        sections = re.split(pattern, text)
+        if len(sections) > 3:  # If we found reasonable splits
+            for i in range(1, len(sections), 3):
+                if i + 2 < len(sections):
+                    clause_header = sections[i].strip()
+                    clause_content = sections[i + 2].strip()
+
+                    if len(clause_content) > 50:  # Ensure it's a meaningful clause
+                        title = legacy_extract_title_from_header(clause_header)
+                        preview = clause_content[:150].replace('\n', ' ') + '...' if len(
+                            clause_content) > 150 else clause_content
+
+                        clauses.append({
+                            "id": len(clauses),
+                            "title": title,
+                            "content": clause_content,
+                            "preview": preview,
+                            "summary": "",
+                            "risk": "unknown"
+                        })
+            if clauses:  # If we found clauses with this pattern, break
+                break
+
+    # If no sections found with patterns, try a different approach
+    if len(clauses) < 2:
+        clauses = []  # Reset
+        # Split by double newlines and look for potential headings
+        sections = re.split(r'\n\s*\n', text)
+        for i, section in enumerate(sections):
+            section = section.strip()
+            if len(section) > 100:
+                # Check if the first line looks like a heading
+                lines = section.split('\n')
+                first_line = lines[0].strip()
+
+                # Heuristic: Heading-like lines are usually short and often in title case or all caps
+                is_heading = (len(first_line) < 80 and
+                              (first_line.isupper() or
+                               (len(first_line.split()) < 8 and first_line.istitle())))
+
+                if is_heading and len(lines) > 1:
+                    title = first_line
+                    content = '\n'.join(lines[1:])
+                else:
+                    title = f"Clause {i + 1}"
+                    content = section
+
+                preview = content[:150].replace('\n', ' ') + '...' if len(content) > 150 else content
+
+                clauses.append({
+                    "id": i,
+                    "title": title,
+                    "content": content,
+                    "preview": preview,
+                    "summary": "",
+                    "risk": "unknown"
+                })
+
+    return clauses
+
+
+WORDS = ("party tenant landlord shall agreement payment term notice breach liability indemnify "
+         "confidential information premises rent deposit termination obligations warranty governing "
+         "law dispute arbitration assignment consent written days month year").split()
+
+HEADINGS = {
+    'article': lambda n: f"ARTICLE {n} - {random.choice(WORDS).upper()} TERMS",
+    'section': lambda n: f"SECTION {n}.{random.randint(1, 9)} {random.choice(WORDS).title()}",
+    'clause': lambda n: f"CLAUSE {n} {random.choice(WORDS).title()}",
+    'paragraph': lambda n: f"§ {n}. {random.choice(WORDS).title()}",
+    'numbered': lambda n: f"{n}. {random.choice(WORDS).upper()}",
+    'plain': lambda n: random.choice(WORDS).title() + " " + random.choice(WORDS).title(),
+}
+
+
+def sentence():
+    words = [random.choice(WORDS) for _ in range(random.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+# The legacy loop steps through re.split output three items at a time, which is only right
+# for the two-group ARTICLE/SECTION/CLAUSE patterns. For the single-group § and numbered
+# patterns it pairs each heading with the next heading, so those outputs are not compared.
+LEGACY_MISALIGNED_STYLES = {'paragraph', 'numbered'}
+
+
+def synthetic_contract(style, size_bytes):
+    """Build a contract of roughly size_bytes with headings of the given style"""
+    parts = ["THIS AGREEMENT is made between the parties named below.\n"]
+    size = len(parts[0])
+    n = 1
+    while size < size_bytes:
+        body = "\n".join(" ".join(sentence() for _ in range(random.randint(2, 5)))
+                         for _ in range(random.randint(1, 4)))
+        part = f"\n{HEADINGS[style](n)}\n{body}\n"
+        parts.append(part)
+        size += len(part)
+        n += 1
+    return "".join(parts)
+
+
+def comparable(clauses):
+    return [(c["id"], c["title"], c["content"], c["preview"]) for c in clauses]
+
+
+def best_of(func, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    size_bytes = int(args.size_mb * 1024 * 1024)
+
+    print(f"{'style':<10} {'clauses':>8} {'legacy (ms)':>12} {'new (ms)':>10} {'speedup':>8}  match")
+    all_match = True
+    for style in HEADINGS:
+        text = synthetic_contract(style, size_bytes)
+        legacy_time, legacy = best_of(legacy_split_into_clauses, text, args.repeat)
+        new_time, new = best_of(split_into_clauses, text, args.repeat)
+        if style in LEGACY_MISALIGNED_STYLES:
+            match = 'n/a'
+        else:
+            match = 'yes' if comparable(legacy) == comparable(new) else 'NO'
+            all_match = all_match and match == 'yes'
+        print(f"{style:<10} {len(new):>8} {legacy_time * 1000:>12.1f} {new_time * 1000:>10.1f} "
+              f"{legacy_time / new_time:>7.1f}x  {match}")
+
+    return 0 if all_match else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""Check that concurrent uploads of large scanned PDFs stay within a memory ceiling.
+
+    python benchmarks/bench_upload_memory.py [--size-mb 100] [--uploads 4] [--max-anon-mb 128]
+        [--extract-workers 2] [--pdf scan.pdf]
+
+The app runs in a child process (demo mode, synchronous uploads) and the
+uploads are streamed to it from disk, so only the server's memory is
+measured. The resident memory of the server and its extraction workers is
+sampled while the uploads run. The check fails (exit status 1) when the peak
+anonymous memory, which unlike mapped file pages cannot be reclaimed by the
+kernel, grows by more than --max-anon-mb over the idle server.
+"""
+import argparse
+import http.client
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+SERVER = """
+from werkzeug.serving import make_server
+import app
+server = make_server('127.0.0.1', 0, app.app, threaded=True)
+print('PORT', server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+def write_scanned_pdf(path, size_mb, seed=1):
+    """A PDF of noise images (incompressible, like scans) with one line of text per page"""
+    from PIL import Image
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    rng = random.Random(seed)
+    side = 1024
+    pages = max(1, size_mb)
+    pdf = canvas.Canvas(path, pagesize=letter)
+    for page in range(pages):
+        image = Image.frombytes('L', (side, side), rng.randbytes(side * side))
+        pdf.drawImage(ImageReader(image), 36, 100, width=540, height=540)
+        pdf.drawString(36, 60, f"Page {page + 1}. The Tenant shall pay rent on the first day of each month.")
+        pdf.showPage()
+    pdf.save()
+
+
+def process_memory(pid):
+    """(VmRSS, RssAnon) in bytes of a process, or (0, 0) once it has exited"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                name, _, value = line.partition(':')
+                if name in ('VmRSS', 'RssAnon'):
+                    values[name] = int(value.split()[0]) * 1024
+    except OSError:
+        return 0, 0
+    return values.get('VmRSS', 0), values.get('RssAnon', 0)
+
+
+def tree_memory(pid):
+    """(VmRSS, RssAnon) summed over a process and its descendants"""
+    pids = [pid]
+    for current in pids:
+        try:
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pids.extend(int(child) for child in children.read().split())
+        except OSError:
+            pass
+    totals = [process_memory(current) for current in pids]
+    return sum(rss for rss, _ in totals), sum(anon for _, anon in totals)
+
+
+class Sampler(threading.Thread):
+    """Records the peak memory of a process tree every few milliseconds"""
+
+    def __init__(self, pid, interval=0.005):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = self.peak_anon = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            rss, anon = tree_memory(self.pid)
+            self.peak_rss = max(self.peak_rss, rss)
+            self.peak_anon = max(self.peak_anon, anon)
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def upload(port, path):
+    """Stream a file to /upload as multipart/form-data without loading it into memory"""
+    boundary = uuid.uuid4().hex
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="scan.pdf"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n').encode('utf-8')
+    tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+    connection.putrequest('POST', '/upload')
+    connection.putheader('Content-Type', f'multipart/form-data; boundary={boundary}')
+    connection.putheader('Content-Length', str(len(head) + os.path.getsize(path) + len(tail)))
+    connection.endheaders()
+    connection.send(head)
+    with open(path, 'rb') as stream:
+        connection.send(stream)
+    connection.send(tail)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=100, help='approximate size of the uploaded PDF')
+    parser.add_argument('--uploads', type=int, default=4, help='concurrent uploads of the PDF')
+    parser.add_argument('--extract-workers', type=int, default=2, help='PDF_EXTRACT_WORKERS for the server')
+    parser.add_argument('--pdf', help='upload this PDF instead of generating one (generation takes a while)')
+    parser.add_argument('--max-anon-mb', type=float, default=128.0, help='allowed growth of anonymous memory')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='legislens-memory-') as workdir:
+        path = args.pdf
+        if not path:
+            path = os.path.join(workdir, 'scan.pdf')
+            write_scanned_pdf(path, args.size_mb)
+        size = os.path.getsize(path)
+
+        env = dict(os.environ)
+        env.pop('GEMINI_API_KEY', None)
+        env.update({
+            "PYTHONPATH": ROOT,
+            "ASYNC_UPLOADS": 'false',
+            "DOCUMENT_STORE": 'memory',
+            "PREWARM_TRANSLATIONS": 'false',
+            "PRERENDER_EXPORTS": 'false',
+            "PDF_EXTRACT_WORKERS": str(args.extract_workers),
+            "PDF_PARALLEL_MIN_PAGES": '2',
+            "MAX_EXTRACT_BYTES": str(4 * size),
+            "MAX_UPLOAD_BYTES": str(4 * size),
+            "CACHE_PATH": os.path.join(workdir, 'cache.sqlite3'),
+            "EXPORT_CACHE_PATH": os.path.join(workdir, 'exports.sqlite3'),
+            "JOB_STORE_PATH": os.path.join(workdir, 'jobs.sqlite3'),
+            "UPLOAD_DIR": os.path.join(workdir, 'uploads'),
+        })
+        server = subprocess.Popen([sys.executable, '-c', SERVER], cwd=workdir, env=env,
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        try:
+            # The app prints startup notes before the server reports its port
+            line = ''
+            while not line.startswith('PORT '):
+                line = server.stdout.readline()
+                if not line:
+                    raise RuntimeError("Server exited before starting")
+            port = int(line.split()[1])
+            # One upload first, so the extraction pool and imports are in the idle baseline
+            upload(port, path)
+            time.sleep(0.5)
+            idle_rss, idle_anon = tree_memory(server.pid)
+
+            sampler = Sampler(server.pid)
+            sampler.start()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.uploads) as executor:
+                statuses = list(executor.map(lambda _: upload(port, path), range(args.uploads)))
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+        finally:
+            server.terminate()
+            server.wait()
+
+    growth = (sampler.peak_anon - idle_anon) / 2 ** 20
+    print(f"{args.uploads} concurrent uploads of {size / 2 ** 20:.0f} MB in {elapsed:.1f} s, statuses {statuses}")
+    print(f"idle:  rss {idle_rss / 2 ** 20:7.0f} MB  anon {idle_anon / 2 ** 20:7.0f} MB")
+    print(f"peak:  rss {sampler.peak_rss / 2 ** 20:7.0f} MB  anon {sampler.peak_anon / 2 ** 20:7.0f} MB")
+    print(f"anonymous memory growth {growth:.0f} MB (ceiling {args.max_anon_mb:.0f} MB)")
+    if growth > args.max_anon_mb or any(status != 200 for status in statuses):
+        print("FAIL")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Generate synthetic contracts of varying size for benchmarks and load tests.
+
+    python benchmarks/corpus.py OUT_DIR [--count 20] [--min-clauses 5] [--max-clauses 60]
+                                        [--format docx|pdf|mixed] [--seed 1]
+
+Each contract has a title, a preamble and numbered ARTICLE clauses built from
+legal boilerplate, with an occasional fee schedule table in DOCX files. Text
+varies per contract so the app's caches do not turn a load test into a
+cache benchmark.
+"""
+import argparse
+import os
+import random
+
+TOPICS = [
+    "Term", "Rent", "Security Deposit", "Payment Terms", "Late Fees", "Use of Premises", "Maintenance and Repairs",
+    "Alterations", "Insurance", "Indemnification", "Limitation of Liability", "Confidentiality",
+    "Intellectual Property", "Termination", "Renewal", "Assignment", "Subletting", "Default", "Remedies",
+    "Governing Law", "Dispute Resolution", "Notices", "Force Majeure", "Entire Agreement", "Severability"
+]
+
+PARTIES = [("Landlord", "Tenant"), ("Licensor", "Licensee"), ("Company", "Contractor"), ("Lender", "Borrower")]
+
+SENTENCES = [
+    "The {b} shall pay the {a} the amount of ${amount} on or before the {day} day of each calendar month.",
+    "Either party may terminate this Agreement upon {days} days' written notice to the other party.",
+    "The {b} shall indemnify and hold harmless the {a} from any and all claims arising out of the {b}'s use.",
+    "In no event shall the {a} be liable for any indirect, incidental or consequential damages.",
+    "The {b} shall not assign this Agreement without the prior written consent of the {a}.",
+    "Any amount not paid within {days} days of its due date shall bear interest at {rate}% per month.",
+    "The {a} may enter the premises at any time without notice for the purpose of inspection.",
+    "All notices under this Agreement shall be in writing and delivered to the addresses set out above.",
+    "This Agreement shall be governed by and construed in accordance with the laws of the State of {state}.",
+    "The {b} waives any right to a jury trial in any action arising out of this Agreement.",
+    "The {b} shall maintain general liability insurance of not less than ${amount} per occurrence.",
+    "The security deposit of ${amount} shall be returned within {days} days after the end of the term.",
+    "Neither party shall disclose the other party's confidential information to any third party.",
+    "The {a} shall keep the structural parts of the premises in good repair at its own expense.",
+    "This Agreement renews automatically for successive one-year terms unless either party gives notice.",
+]
+
+STATES = ["California", "New York", "Texas", "Delaware", "Illinois", "Washington"]
+
+
+def generate_contract(rng, clauses):
+    """Return (title, preamble, [(heading, body), ...]) for a contract with the given number of clauses"""
+    a, b = rng.choice(PARTIES)
+    values = {
+        "a": a, "b": b, "state": rng.choice(STATES),
+        "amount": lambda: f"{rng.randint(5, 500) * 100:,}",
+        "day": lambda: rng.choice(["first", "fifth", "tenth", "fifteenth"]),
+        "days": lambda: rng.choice([5, 10, 15, 30, 60, 90]),
+        "rate": lambda: rng.choice([1, 1.5, 2, 5]),
+    }
+
+    def sentence():
+        template = rng.choice(SENTENCES)
+        return template.format(**{key: value() if callable(value) else value for key, value in values.items()})
+
+    title = f"{a.upper()} AND {b.upper()} AGREEMENT No. {rng.randint(1000, 99999)}"
+    preamble = (f"This Agreement is entered into between the {a} and the {b} on {rng.randint(1, 28)} "
+                f"{rng.choice(['January', 'April', 'July', 'October'])} {rng.randint(2015, 2026)}.")
+    sections = []
+    for number in range(1, clauses + 1):
+        topic = rng.choice(TOPICS)
+        body = " ".join(sentence() for _ in range(rng.randint(2, 8)))
+        sections.append((f"ARTICLE {number} - {topic}", body))
+    return title, preamble, sections
+
+
+def write_docx(path, title, preamble, sections, rng):
+    import docx
+
+    document = docx.Document()
+    document.add_heading(title, 0)
+    document.add_paragraph(preamble)
+    for heading, body in sections:
+        document.add_heading(heading, 1)
+        document.add_paragraph(body)
+        if rng.random() < 0.1:
+            table = document.add_table(rows=3, cols=3)
+            for row in range(3):
+                for column, text in enumerate([f"Item {row + 1}", rng.choice(TOPICS), f"${rng.randint(10, 999)}"]):
+                    table.cell(row, column).text = text
+    document.save(path)
+
+
+def write_pdf(path, title, preamble, sections):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    styles = getSampleStyleSheet()
+    story = [Paragraph(title, styles['Title']), Paragraph(preamble, styles['Normal']), Spacer(1, 12)]
+    for heading, body in sections:
+        story.append(Paragraph(heading, styles['Heading2']))
+        story.append(Paragraph(body, styles['Normal']))
+    SimpleDocTemplate(path, pagesize=letter).build(story)
+
+
+def generate_corpus(directory, count=20, min_clauses=5, max_clauses=60, file_format='docx', seed=1):
+    """Write `count` contracts into directory and return their paths, smallest first"""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        # Spread sizes evenly between the bounds so every run covers small and large documents
+        clauses = min_clauses + round((max_clauses - min_clauses) * i / max(1, count - 1))
+        extension = file_format if file_format != 'mixed' else ('docx' if i % 2 == 0 else 'pdf')
+        path = os.path.join(directory, f"contract_{i:03d}_{clauses}clauses.{extension}")
+        title, preamble, sections = generate_contract(rng, clauses)
+        if extension == 'pdf':
+            write_pdf(path, title, preamble, sections)
+        else:
+            write_docx(path, title, preamble, sections, rng)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory')
+    parser.add_argument('--count', type=int, default=20)
+    parser.add_argument('--min-clauses', type=int, default=5)
+    parser.add_argument('--max-clauses', type=int, default=60)
+    parser.add_argument('--format', choices=['docx', 'pdf', 'mixed'], default='docx')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.directory, args.count, args.min_clauses, args.max_clauses, args.format, args.seed)
+    total = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {len(paths)} contracts ({total / 1024:.0f} KB) to {args.directory}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""Load-test the app end to end against local Gemini and Translate stand-ins.
+
+    python benchmarks/load_test.py [--scenarios upload,ask,translate_bulk,export] [--requests 40]
+        [--concurrency 8] [--model-latency lognormal:0.4:0.5] [--model-rps 30] [--model-error-rate 0.01]
+        [--translate-latency lognormal:0.08:0.3] [--output run.json] [--baseline previous.json]
+
+Without --url, both stubs and the app are started in this process on free
+ports, with fresh caches and stores in a temporary directory; other app
+settings (ANALYSIS_POLICY, BATCH_CLAUSE_ANALYSIS, ...) are taken from the
+environment, and uploads are synchronous unless ASYNC_UPLOADS=true. With
+--url an already running app is tested; start stub_gemini.py and
+stub_translate.py and point the app at them first. Queued (202) uploads are
+polled until their job finishes.
+
+Each scenario sends --requests requests from --concurrency threads and
+reports throughput and p50/p95/p99 latency of successful requests. Uploads
+use a synthetic corpus (corpus.py) with one distinct contract per request;
+/ask and /export_pdf reuse the uploaded documents. --output saves the run
+as JSON and --baseline prints the change against a saved run, so releases
+can be compared.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from corpus import generate_corpus  # noqa: E402
+from stub_gemini import StubGeminiServer  # noqa: E402
+from stub_translate import StubTranslateServer  # noqa: E402
+
+SCENARIOS = ['upload', 'ask', 'translate_bulk', 'export']
+
+QUESTIONS = [
+    "What is the notice period for termination?", "How much is the security deposit?",
+    "Who pays for repairs?", "Can the agreement be assigned?", "What happens if rent is paid late?",
+    "Which law governs this agreement?", "Does the agreement renew automatically?",
+    "What insurance must be maintained?", "Is there a limitation of liability?", "How are notices delivered?"
+]
+
+UI_TEXTS = [
+    'Document Summary', "Here's what we found in your document", 'Important Clauses',
+    'Click any clause to see details', 'High Risk', 'Medium Risk', 'Low Risk', 'Select a Clause',
+    'What This Means', 'Original Text', 'Ask Questions', 'Export PDF'
+]
+
+LANGUAGES = ['es', 'fr', 'de', 'hi']
+
+
+def request_json(method, url, payload=None, body=None, headers=None, timeout=600):
+    """Send a request and return the decoded JSON (or raw bytes for non-JSON responses)"""
+    if payload is not None:
+        body = json.dumps(payload).encode('utf-8')
+        headers = {"Content-Type": "application/json", **(headers or {})}
+    request = urllib.request.Request(url, data=body, headers=headers or {}, method=method)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = response.read()
+        if response.headers.get_content_type() == 'application/json':
+            return response.status, json.loads(data)
+        return response.status, data
+
+
+def encode_multipart(field, path):
+    """multipart/form-data body with one file field; returns (body, content_type)"""
+    boundary = uuid.uuid4().hex
+    with open(path, 'rb') as stream:
+        content = stream.read()
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; '
+            f'filename="{os.path.basename(path)}"\r\nContent-Type: application/octet-stream\r\n\r\n').encode('utf-8')
+    return head + content + f'\r\n--{boundary}--\r\n'.encode('utf-8'), f'multipart/form-data; boundary={boundary}'
+
+
+class LoadTest:
+    """The scenarios, sharing the ids of uploaded documents"""
+
+    def __init__(self, base_url, corpus):
+        self.base_url = base_url.rstrip('/')
+        self.corpus = corpus
+        self.documents = []
+        self._lock = threading.Lock()
+
+    def upload(self, i):
+        body, content_type = encode_multipart('file', self.corpus[i % len(self.corpus)])
+        status, data = request_json('POST', f"{self.base_url}/upload", body=body,
+                                    headers={"Content-Type": content_type})
+        if status == 202:
+            # Queued upload: the request is only done when its job is
+            while True:
+                time.sleep(0.2)
+                _, job = request_json('GET', f"{self.base_url}{data['status_url']}")
+                if job["status"] == 'succeeded':
+                    break
+                if job["status"] in ('failed', 'cancelled'):
+                    raise RuntimeError(f"Upload job {job['status']}: {job.get('error')}")
+        with self._lock:
+            self.documents.append(data["document_id"])
+
+    def ask(self, i):
+        _, data = request_json('POST', f"{self.base_url}/ask", {
+            "question": QUESTIONS[i % len(QUESTIONS)],
+            "document_id": self.documents[i % len(self.documents)]
+        })
+        if "answer" not in data:
+            raise RuntimeError(data.get("error", "no answer"))
+
+    def translate_bulk(self, i):
+        texts = {f"label_{k}": text for k, text in enumerate(UI_TEXTS)}
+        # A few strings unique to this request, so not everything is a translation cache hit
+        texts.update({f"dynamic_{k}": f"Clause {i}.{k}: {QUESTIONS[(i + k) % len(QUESTIONS)]}" for k in range(4)})
+        _, data = request_json('POST', f"{self.base_url}/translate_bulk",
+                               {"texts": texts, "language": LANGUAGES[i % len(LANGUAGES)]})
+        if "translated_texts" not in data:
+            raise RuntimeError(data.get("error", "no translations"))
+
+    def export(self, i):
+        _, data = request_json('POST', f"{self.base_url}/export_pdf", {
+            "document_id": self.documents[i % len(self.documents)],
+            "language": 'en' if i % 2 == 0 else LANGUAGES[i % len(LANGUAGES)]
+        })
+        if not isinstance(data, bytes) or not data.startswith(b'%PDF'):
+            raise RuntimeError("response is not a PDF")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))]
+
+
+def run_scenario(func, requests, concurrency):
+    """Call func(i) for every request from a pool of threads; returns latency and throughput figures"""
+    def one(i):
+        start = time.perf_counter()
+        try:
+            func(i)
+        except urllib.error.HTTPError as e:
+            return time.perf_counter() - start, f"HTTP {e.code}"
+        except Exception as e:
+            return time.perf_counter() - start, type(e).__name__
+        return time.perf_counter() - start, None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, error in outcomes if error is None)
+    errors = {}
+    for _, error in outcomes:
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+    return {
+        "requests": requests,
+        "errors": sum(errors.values()),
+        "error_types": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def start_local_app(args, workdir):
+    """Start both stubs and the app on free ports; returns (base_url, stubs)"""
+    gemini = StubGeminiServer(('127.0.0.1', 0), args.model_rps, args.model_burst, args.model_latency,
+                              args.chunk_delay, args.model_error_rate, seed=args.seed)
+    translate = StubTranslateServer(('127.0.0.1', 0), args.translate_rps, args.translate_burst,
+                                    args.translate_latency, error_rate=args.translate_error_rate, seed=args.seed)
+    gemini.start()
+    translate.start()
+
+    # Configuration is read when the app is imported, so set it up first
+    os.environ.update({
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY") or 'stub',
+        "GEMINI_API_ENDPOINT": gemini.endpoint,
+        "TRANSLATE_API_ENDPOINT": translate.endpoint,
+        "CACHE_PATH": os.path.join(workdir, 'cache.sqlite3'),
+        "EXPORT_CACHE_PATH": os.path.join(workdir, 'exports.sqlite3'),
+        "DOCUMENT_STORE_PATH": os.path.join(workdir, 'documents.sqlite3'),
+        "JOB_STORE_PATH": os.path.join(workdir, 'jobs.sqlite3'),
+        "UPLOAD_DIR": os.path.join(workdir, 'uploads'),
+        "BATCH_OUTPUT_DIR": os.path.join(workdir, 'batches'),
+    })
+    os.environ.setdefault("ASYNC_UPLOADS", 'false')
+    os.environ.setdefault("PREWARM_TRANSLATIONS", 'false')
+
+    from werkzeug.serving import make_server
+    import app as legislens
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, legislens.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='load-test-app', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", {"gemini": gemini, "translate": translate}
+
+
+def print_results(results):
+    print(f"{'scenario':>15} {'reqs':>6} {'errors':>7} {'req/s':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        cells = [result[key] if result[key] is not None else float('nan')
+                 for key in ('rps', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms')]
+        print(f"{name:>15} {result['requests']:>6} {result['errors']:>7} {cells[0]:>8.2f} "
+              + ' '.join(f"{cell:>9.1f}" for cell in cells[1:]))
+        if result['error_types']:
+            print(f"{'':>15} errors: {result['error_types']}")
+
+
+def print_comparison(results, baseline):
+    """Change of each figure against a saved run; negative latency and positive req/s changes are improvements"""
+    print("\nChange against baseline:")
+    print(f"{'scenario':>15} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        changes = []
+        for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if result[key] and previous.get(key):
+                changes.append(f"{(result[key] - previous[key]) / previous[key] * 100:>+8.1f}%")
+            else:
+                changes.append(f"{'n/a':>9}")
+        print(f"{name:>15} " + ' '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='test a running app instead of starting one with local stubs')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"comma-separated subset of {SCENARIOS}")
+    parser.add_argument('--requests', type=int, default=40, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--corpus', help='directory of contracts to upload instead of a generated corpus')
+    parser.add_argument('--min-clauses', type=int, default=5)
+    parser.add_argument('--max-clauses', type=int, default=40)
+    parser.add_argument('--model-latency', default='lognormal:0.4:0.5', help='stub Gemini latency spec')
+    parser.add_argument('--chunk-delay', type=float, default=0.01, help='stub Gemini seconds per streamed chunk')
+    parser.add_argument('--model-rps', type=float, default=30.0)
+    parser.add_argument('--model-burst', type=int, default=10)
+    parser.add_argument('--model-error-rate', type=float, default=0.01)
+    parser.add_argument('--translate-latency', default='lognormal:0.08:0.3', help='stub Translate latency spec')
+    parser.add_argument('--translate-rps', type=float, default=50.0)
+    parser.add_argument('--translate-burst', type=int, default=20)
+    parser.add_argument('--translate-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='save the settings and results of this run as JSON')
+    parser.add_argument('--baseline', help='JSON from an earlier --output to compare against')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix='legislens-load-')
+    try:
+        if args.corpus:
+            corpus = sorted(os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+                            if name.lower().endswith(('.pdf', '.docx')))
+        else:
+            corpus = generate_corpus(os.path.join(workdir, 'corpus'), count=max(args.requests, 4),
+                                     min_clauses=args.min_clauses, max_clauses=args.max_clauses, seed=args.seed)
+
+        stubs = {}
+        base_url = args.url
+        if not base_url:
+            base_url, stubs = start_local_app(args, workdir)
+        test = LoadTest(base_url, corpus)
+
+        if 'upload' not in scenarios and {'ask', 'export'} & set(scenarios):
+            # Documents to ask about and export, uploaded before timing starts
+            for i in range(min(4, len(corpus))):
+                test.upload(i)
+
+        results = {}
+        for name in scenarios:
+            if name in ('ask', 'export') and not test.documents:
+                print(f"Skipping {name}: no document was uploaded successfully")
+                continue
+            results[name] = run_scenario(getattr(test, name), args.requests, args.concurrency)
+        print_results(results)
+
+        stub_counts = {name: dict(stub.counts) for name, stub in stubs.items()}
+        for name, counts in stub_counts.items():
+            print(f"stub {name}: {counts}")
+
+        if args.baseline:
+            with open(args.baseline) as stream:
+                print_comparison(results, json.load(stream))
+        if args.output:
+            settings = {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')}
+            with open(args.output, 'w') as stream:
+                json.dump({"settings": settings, "results": results, "stubs": stub_counts}, stream, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
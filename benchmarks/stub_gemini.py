@@ -0,0 +1,108 @@
+"""Local stand-in for the Gemini generateContent REST API that throttles like the real quota.
+
+    python benchmarks/stub_gemini.py [--port 8900] [--rps 20] [--burst 5] [--latency 0.05]
+                                     [--chunk-delay 0.02] [--error-rate 0]
+
+Point the app at it with GEMINI_API_ENDPOINT=http://127.0.0.1:8900 and any
+GEMINI_API_KEY. Requests beyond the allowed rate get a 429 RESOURCE_EXHAUSTED
+response and --error-rate of the rest a 503, so client-side rate limiting and
+retries can be exercised offline. --latency takes a number of seconds or a
+distribution such as lognormal:0.4:0.5 (see stub_server.Latency).
+"""
+import argparse
+import json
+import re
+import time
+
+from stub_server import StubHandler, StubServer
+
+
+CLAUSE_ID_RE = re.compile(r'^\s*CLAUSE (\d+):', re.MULTILINE)
+
+
+def canned_response(prompt):
+    """A plausible answer for each of the app's prompt shapes"""
+    clause_ids = CLAUSE_ID_RE.findall(prompt)
+    if clause_ids:
+        return json.dumps([
+            {"id": int(clause_id), "summary": f"Stub summary of clause {clause_id}.", "risk": "medium"}
+            for clause_id in clause_ids
+        ])
+    if 'RISK:' in prompt:
+        return "SUMMARY: Stub summary of this clause.\nRISK: low"
+    return ("Stub answer generated by the local Gemini stand-in. It streams a few words at a time, "
+            "like the real model does for long answers. Each sentence ends with a full stop.")
+
+
+class StubGeminiServer(StubServer):
+    """HTTP server answering generateContent with canned text, throttled by a token bucket"""
+
+    def __init__(self, address, requests_per_second=20.0, burst=5, latency=0.05, chunk_delay=0.02,
+                 error_rate=0.0, seed=None):
+        super().__init__(address, _Handler, requests_per_second, burst, latency, error_rate, seed)
+        self.chunk_delay = chunk_delay
+
+
+def _chunks(text, words_per_chunk=3):
+    words = text.split(' ')
+    return [' '.join(words[start:start + words_per_chunk]) + (' ' if start + words_per_chunk < len(words) else '')
+            for start in range(0, len(words), words_per_chunk)]
+
+
+def _candidate(text, prompt_tokens=0):
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0
+        }],
+        "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": len(text) // 4 + 1}
+    }
+
+
+class _Handler(StubHandler):
+    def handle_json(self, body):
+        prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+        text = canned_response(prompt)
+        if ':streamGenerateContent' in self.path:
+            self._stream(text)
+            return
+        # A non-streamed answer arrives only once every chunk has been generated
+        time.sleep(self.server.chunk_delay * len(_chunks(text)))
+        self.reply(200, _candidate(text, len(prompt) // 4 + 1))
+
+    def _stream(self, text):
+        """Send the answer a few words per chunk, as the streamed JSON array the REST client reads"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'[')
+        for i, chunk in enumerate(_chunks(text)):
+            time.sleep(self.server.chunk_delay)
+            self.wfile.write((',' if i else '').encode('utf-8') + json.dumps(_candidate(chunk)).encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b']')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--rps', type=float, default=20.0, help='requests per second before throttling')
+    parser.add_argument('--burst', type=int, default=5)
+    parser.add_argument('--latency', default='0.05', help='seconds before responding, or a distribution spec')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='seconds between streamed chunks')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of admitted requests failing with 503')
+    args = parser.parse_args()
+
+    server = StubGeminiServer((args.host, args.port), args.rps, args.burst, args.latency, args.chunk_delay,
+                              args.error_rate)
+    print(f"Stub Gemini listening on {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Building blocks shared by the local API stand-ins: throttling, latency distributions and error injection."""
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Latency:
+    """A latency distribution in seconds.
+
+    The spec is a number, or "fixed:S", "uniform:LOW:HIGH" or
+    "lognormal:MEDIAN:SIGMA". Lognormal latencies have the long tail that
+    real model APIs show; sigma 0.5 puts p95 at about 2.3x the median.
+    """
+
+    def __init__(self, spec, seed=None):
+        self.spec = spec
+        if isinstance(spec, (int, float)):
+            kind, params = 'fixed', [float(spec)]
+        else:
+            kind, *params = str(spec).split(':')
+            if not params:
+                kind, params = 'fixed', [kind]
+            params = [float(param) for param in params]
+        expected = {'fixed': 1, 'uniform': 2, 'lognormal': 2}
+        if expected.get(kind) != len(params):
+            raise ValueError(f"Bad latency spec {spec!r}: use S, fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+        self.kind = kind
+        self.params = params
+        self._rng = random.Random(seed)
+
+    def sample(self):
+        if self.kind == 'uniform':
+            return self._rng.uniform(*self.params)
+        if self.kind == 'lognormal':
+            median, sigma = self.params
+            return median * math.exp(self._rng.gauss(0.0, sigma))
+        return self.params[0]
+
+    def __str__(self):
+        return str(self.spec)
+
+
+class StubServer(ThreadingHTTPServer):
+    """HTTP server that throttles with a token bucket, adds latency and fails a fraction of requests.
+
+    `counts` tracks every request: "throttled" got a 429, "errors" an
+    injected 503, and "ok" were answered by the handler.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, handler, requests_per_second=20.0, burst=5, latency=0.05, error_rate=0.0, seed=None):
+        super().__init__(address, handler)
+        self.requests_per_second = requests_per_second
+        self.burst = float(burst)
+        self.latency = latency if isinstance(latency, Latency) else Latency(latency, seed)
+        self.error_rate = error_rate
+        self.counts = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0}
+        self._rng = random.Random(seed)
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def admit(self):
+        """Take one request token; False means the caller is over quota"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.requests_per_second)
+            self._updated_at = now
+            self.counts["requests"] += 1
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.counts["throttled"] += 1
+            return False
+
+    def inject_error(self):
+        """True for the fraction of admitted requests that should fail with a 503"""
+        with self._lock:
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if failed:
+                self.counts["errors"] += 1
+        return failed
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True)
+        thread.start()
+        return thread
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Reads a JSON POST, applies the server's quota, latency and errors, then calls handle_json"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.server.admit():
+            self.reply(429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                       "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        time.sleep(self.server.latency.sample())
+        if self.server.inject_error():
+            self.reply(503, {"error": {"code": 503, "message": "The service is currently unavailable.",
+                                       "status": "UNAVAILABLE"}})
+            return
+
+        self.handle_json(body)
+        self.server.count("ok")
+
+    def handle_json(self, body):
+        raise NotImplementedError
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,59 @@
+"""Local stand-in for the Cloud Translation v2 REST API.
+
+    python benchmarks/stub_translate.py [--port 8901] [--rps 50] [--burst 20] [--latency 0.05] [--error-rate 0]
+
+Point the app at it with TRANSLATE_API_ENDPOINT=http://127.0.0.1:8901; no
+credentials are needed. Every string comes back prefixed with its target
+language (e.g. "[es] Hello"), after --latency (seconds or a distribution spec
+such as lognormal:0.08:0.3) plus --segment-delay per string.
+"""
+import argparse
+import time
+
+from stub_server import StubHandler, StubServer
+
+
+class StubTranslateServer(StubServer):
+    """HTTP server answering translate requests with tagged copies of the input"""
+
+    def __init__(self, address, requests_per_second=50.0, burst=20, latency=0.05, segment_delay=0.0,
+                 error_rate=0.0, seed=None):
+        super().__init__(address, _Handler, requests_per_second, burst, latency, error_rate, seed)
+        self.segment_delay = segment_delay
+
+
+class _Handler(StubHandler):
+    def handle_json(self, body):
+        texts = body.get("q") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        target = body.get("target", "en")
+        time.sleep(self.server.segment_delay * len(texts))
+        self.server.count("segments", len(texts))
+        self.reply(200, {"data": {"translations": [
+            {"translatedText": f"[{target}] {text}", "detectedSourceLanguage": "en"} for text in texts
+        ]}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--rps', type=float, default=50.0, help='requests per second before throttling')
+    parser.add_argument('--burst', type=int, default=20)
+    parser.add_argument('--latency', default='0.05', help='seconds before responding, or a distribution spec')
+    parser.add_argument('--segment-delay', type=float, default=0.0, help='extra seconds per string translated')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of admitted requests failing with 503')
+    args = parser.parse_args()
+
+    server = StubTranslateServer((args.host, args.port), args.rps, args.burst, args.latency, args.segment_delay,
+                                 args.error_rate)
+    print(f"Stub Translate listening on {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
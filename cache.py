@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def normalize_text(text):
+    """Collapse whitespace so copies of the same clause hash identically"""
+    return ' '.join(text.split())
+
+
+def content_key(*parts):
+    """Build a content-addressed cache key from normalized text and version parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(normalize_text(str(part)).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Persistent SQLite-backed key/value cache with LRU and TTL eviction.
+
+    Values must be JSON-serializable. The database file can be shared by
+    several worker processes; hit/miss counters are kept per process.
+
+    To keep writes cheap, the row count is only checked every
+    `evict_interval` inserts, and each eviction trims the table that far
+    below `max_entries`. The table can overshoot the cap by up to that many
+    rows per process between checks. A hit only refreshes `last_access`
+    when the stored time is more than `touch_interval` seconds old, so most
+    reads do not write.
+    """
+
+    def __init__(self, path, table='results', max_entries=10000, ttl_seconds=None, touch_interval=300):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.touch_interval = touch_interval
+        self.evict_interval = max(1, min(1000, max_entries // 100))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Count rows on the first write, in case the table is already over the cap
+        self._inserts_since_check = self.evict_interval
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'created_at REAL NOT NULL, last_access REAL NOT NULL)'
+        )
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)')
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT value, created_at, last_access FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at, last_access = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            # LRU order only needs to be roughly right; skip the write for recently touched entries
+            if now - last_access > self.touch_interval:
+                self._conn.execute(f'UPDATE {self.table} SET last_access = ? WHERE key = ?', (now, key))
+                self._conn.commit()
+            self.hits += 1
+
+        return json.loads(value)
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries when over the size cap"""
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        """Store several (key, value) pairs in one transaction with at most one eviction pass"""
+        now = time.time()
+        rows = [(key, json.dumps(value), now, now) for key, value in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, created_at, last_access) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self._evict(len(rows))
+            self._conn.commit()
+
+    def _evict(self, inserted):
+        """Trim the table below the cap once enough rows were inserted to possibly overflow it"""
+        self._inserts_since_check += inserted
+        if self._inserts_since_check < self.evict_interval:
+            return
+        self._inserts_since_check = 0
+        entries = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        if entries <= self.max_entries:
+            return
+        # Oldest rows first through the last_access index; the cost follows the rows removed, not the table size
+        target = max(0, self.max_entries - self.evict_interval)
+        self._conn.execute(
+            f'DELETE FROM {self.table} WHERE key IN ('
+            f'SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)',
+            (entries - target,)
+        )
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current number of entries"""
+        with self._lock:
+            entries = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+        }
@@ -3,3 +3,139 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'legislens-secret-key'
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+
+    # Gemini model used for each task; every task defaults to GEMINI_MODEL
+    GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash')
+    SUMMARY_MODEL = os.environ.get('SUMMARY_MODEL', GEMINI_MODEL)
+    CLAUSE_MODEL = os.environ.get('CLAUSE_MODEL', GEMINI_MODEL)
+    QA_MODEL = os.environ.get('QA_MODEL', GEMINI_MODEL)
+
+    # Concurrency limits for Gemini calls made while analyzing uploads
+    MAX_CONCURRENT_ANALYSES_PER_UPLOAD = int(os.environ.get('MAX_CONCURRENT_ANALYSES_PER_UPLOAD', 8))
+    MAX_CONCURRENT_MODEL_CALLS = int(os.environ.get('MAX_CONCURRENT_MODEL_CALLS', 16))
+
+    # Pack several clauses into one analysis prompt instead of one call per clause
+    BATCH_CLAUSE_ANALYSIS = os.environ.get('BATCH_CLAUSE_ANALYSIS', 'true').lower() == 'true'
+    CLAUSE_BATCH_TOKEN_BUDGET = int(os.environ.get('CLAUSE_BATCH_TOKEN_BUDGET', 4000))
+    CLAUSE_BATCH_MAX_CLAUSES = int(os.environ.get('CLAUSE_BATCH_MAX_CLAUSES', 10))
+
+    # Token budgets for the document text placed in each prompt, filled by whole sentences.
+    # With SUMMARY_MODE='map_reduce' a document over budget is summarized in budget-sized parts
+    # (SUMMARY_MAP_WORKERS at a time) whose summaries are then combined; 'single' keeps only its start.
+    # 'clauses' builds the summary after clause analysis from the clause summaries, reduced in a tree
+    # of SUMMARY_TOKEN_BUDGET / SUMMARY_NODE_TOKENS items per node (batch runs use map_reduce).
+    SUMMARY_TOKEN_BUDGET = int(os.environ.get('SUMMARY_TOKEN_BUDGET', 1500))
+    CLAUSE_TOKEN_BUDGET = int(os.environ.get('CLAUSE_TOKEN_BUDGET', 600))
+    SUMMARY_MODE = os.environ.get('SUMMARY_MODE', 'map_reduce')
+    SUMMARY_MAP_WORKERS = int(os.environ.get('SUMMARY_MAP_WORKERS', 4))
+    SUMMARY_NODE_TOKENS = int(os.environ.get('SUMMARY_NODE_TOKENS', 100))
+
+    # Persistent cache of Gemini clause analyses and document summaries
+    CACHE_PATH = os.environ.get('CACHE_PATH', os.path.join('instance', 'legislens_cache.sqlite3'))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 50000))
+    CACHE_TTL_SECONDS = int(os.environ.get('CACHE_TTL_SECONDS', 30 * 24 * 3600))
+
+    # Where processed documents live between requests: 'memory', 'sqlite' or 'redis'.
+    # Use sqlite (one host) or redis (several nodes) when running more than one worker. The memory
+    # and sqlite stores drop least recently used documents beyond the count and byte caps.
+    DOCUMENT_STORE = os.environ.get('DOCUMENT_STORE', 'sqlite')
+    DOCUMENT_STORE_PATH = os.environ.get('DOCUMENT_STORE_PATH', os.path.join('instance', 'legislens_documents.sqlite3'))
+    DOCUMENT_STORE_URL = os.environ.get('DOCUMENT_STORE_URL', 'redis://localhost:6379/0')
+    DOCUMENT_STORE_MAX_DOCUMENTS = int(os.environ.get('DOCUMENT_STORE_MAX_DOCUMENTS', 100))
+    DOCUMENT_STORE_MAX_BYTES = int(os.environ.get('DOCUMENT_STORE_MAX_BYTES', 200 * 1024 * 1024))
+    DOCUMENT_TTL_SECONDS = int(os.environ.get('DOCUMENT_TTL_SECONDS', 24 * 3600))
+
+    # Background processing of /upload. With JOB_WORKER_MODE='local' the web process runs
+    # the workers itself; with 'external' run `python worker.py` alongside it instead.
+    # A running job not updated for JOB_LEASE_SECONDS is taken to have lost its worker and is retried.
+    ASYNC_UPLOADS = os.environ.get('ASYNC_UPLOADS', 'true').lower() == 'true'
+    JOB_WORKER_MODE = os.environ.get('JOB_WORKER_MODE', 'local')
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 2))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    JOB_RETRY_BACKOFF_SECONDS = float(os.environ.get('JOB_RETRY_BACKOFF_SECONDS', 2.0))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', os.path.join('instance', 'legislens_jobs.sqlite3'))
+    UPLOAD_DIR = os.environ.get('UPLOAD_DIR', os.path.join('instance', 'uploads'))
+
+    # Extraction limits; PDFs with at least PDF_PARALLEL_MIN_PAGES pages are extracted across
+    # a pool of PDF_EXTRACT_WORKERS processes. MAX_DOCX_XML_BYTES caps a DOCX body's uncompressed size.
+    MAX_PDF_PAGES = int(os.environ.get('MAX_PDF_PAGES', 1000))
+    MAX_EXTRACT_BYTES = int(os.environ.get('MAX_EXTRACT_BYTES', 50 * 1024 * 1024))
+    MAX_DOCX_XML_BYTES = int(os.environ.get('MAX_DOCX_XML_BYTES', 1024 * 1024 * 1024))
+    PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 40))
+    PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+    MAX_EXTRACTED_CHARS = int(os.environ.get('MAX_EXTRACTED_CHARS', 10 * 1000 * 1000))
+
+    # Upload ingestion: request bodies over MAX_UPLOAD_BYTES (MAX_BATCH_UPLOAD_BYTES for /batch zips)
+    # get a 413 before they are read. File parts over UPLOAD_SPOOL_BYTES are spooled to UPLOAD_TMP_DIR
+    # (the system temp dir by default) and parsed memory-mapped; each worker process parses at most
+    # MAX_CONCURRENT_EXTRACTIONS uploads at once, which bounds its peak memory.
+    MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', MAX_EXTRACT_BYTES + 1024 * 1024))
+    MAX_BATCH_UPLOAD_BYTES = int(os.environ.get('MAX_BATCH_UPLOAD_BYTES', 1024 * 1024 * 1024))
+    UPLOAD_SPOOL_BYTES = int(os.environ.get('UPLOAD_SPOOL_BYTES', 1024 * 1024))
+    UPLOAD_TMP_DIR = os.environ.get('UPLOAD_TMP_DIR')
+    MAX_CONCURRENT_EXTRACTIONS = int(os.environ.get('MAX_CONCURRENT_EXTRACTIONS', 2))
+
+    # /ask sends the top-k clauses most relevant to the question, up to this many tokens
+    ASK_CONTEXT_TOKEN_BUDGET = int(os.environ.get('ASK_CONTEXT_TOKEN_BUDGET', 2000))
+    ASK_TOP_K_CLAUSES = int(os.environ.get('ASK_TOP_K_CLAUSES', 8))
+
+    # Persistent translation cache, stored alongside the analysis cache. TRANSLATE_API_ENDPOINT
+    # points the Translation client at another host (e.g. a local stub) without credentials.
+    TRANSLATE_API_ENDPOINT = os.environ.get('TRANSLATE_API_ENDPOINT')
+    TRANSLATION_CACHE_MAX_ENTRIES = int(os.environ.get('TRANSLATION_CACHE_MAX_ENTRIES', 200000))
+    TRANSLATION_CACHE_TTL_SECONDS = int(os.environ.get('TRANSLATION_CACHE_TTL_SECONDS', 90 * 24 * 3600))
+    PREWARM_TRANSLATIONS = os.environ.get('PREWARM_TRANSLATIONS', 'true').lower() == 'true'
+
+    # Rendered reports cached per (document, analysis revision, language, format). With
+    # PRERENDER_EXPORTS the report is rendered in the background once analysis finishes.
+    EXPORT_CACHE_PATH = os.environ.get('EXPORT_CACHE_PATH', os.path.join('instance', 'legislens_exports.sqlite3'))
+    EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    EXPORT_CACHE_MAX_ENTRIES = int(os.environ.get('EXPORT_CACHE_MAX_ENTRIES', 1000))
+    PRERENDER_EXPORTS = os.environ.get('PRERENDER_EXPORTS', 'true').lower() == 'true'
+    EXPORT_PRERENDER_FORMATS = os.environ.get('EXPORT_PRERENDER_FORMATS', 'pdf').split(',')
+    EXPORT_RENDER_WORKERS = int(os.environ.get('EXPORT_RENDER_WORKERS', 1))
+
+    # Batch analysis of many documents (/batch and `python batch.py`). Directories on the
+    # server can only be submitted to /batch when they live under BATCH_INPUT_ROOT.
+    BATCH_DOCUMENT_CONCURRENCY = int(os.environ.get('BATCH_DOCUMENT_CONCURRENCY', 4))
+    BATCH_EXTRACT_WORKERS = int(os.environ.get('BATCH_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+    BATCH_OUTPUT_DIR = os.environ.get('BATCH_OUTPUT_DIR', os.path.join('instance', 'batches'))
+    BATCH_INPUT_ROOT = os.environ.get('BATCH_INPUT_ROOT')
+
+    # Every Gemini call goes through the model gateway (model_gateway.py): client-side
+    # rate limits, AIMD concurrency up to MAX_CONCURRENT_MODEL_CALLS, retries and timeouts.
+    # GEMINI_API_ENDPOINT points the client at another host, e.g. a local stub server.
+    GEMINI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT')
+    MODEL_REQUESTS_PER_MINUTE = int(os.environ.get('MODEL_REQUESTS_PER_MINUTE', 1000))
+    MODEL_TOKENS_PER_MINUTE = int(os.environ.get('MODEL_TOKENS_PER_MINUTE', 1000000))
+    MODEL_MIN_CONCURRENCY = int(os.environ.get('MODEL_MIN_CONCURRENCY', 1))
+    MODEL_MAX_RETRIES = int(os.environ.get('MODEL_MAX_RETRIES', 4))
+    MODEL_BACKOFF_BASE_SECONDS = float(os.environ.get('MODEL_BACKOFF_BASE_SECONDS', 1.0))
+    MODEL_BACKOFF_MAX_SECONDS = float(os.environ.get('MODEL_BACKOFF_MAX_SECONDS', 30.0))
+    MODEL_TIMEOUT_SECONDS = float(os.environ.get('MODEL_TIMEOUT_SECONDS', 60.0))
+
+    # Answers cached by document text, normalized question and language. With ANSWER_FUZZY_MATCH a
+    # question at least ANSWER_SIMILARITY_THRESHOLD similar (word/bigram Jaccard) to an answered one,
+    # with the same numbers, negations, parties and names, also reuses its answer
+    ANSWER_CACHE = os.environ.get('ANSWER_CACHE', 'true').lower() == 'true'
+    ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', 20000))
+    ANSWER_CACHE_TTL_SECONDS = int(os.environ.get('ANSWER_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+    ANSWER_FUZZY_MATCH = os.environ.get('ANSWER_FUZZY_MATCH', 'false').lower() == 'true'
+    ANSWER_SIMILARITY_THRESHOLD = float(os.environ.get('ANSWER_SIMILARITY_THRESHOLD', 0.9))
+
+    # Uploads sent with previous_document_id are diffed against that version: clauses with
+    # unchanged text keep their analysis, and changed clauses are paired with the clause they
+    # revise when at least REVISION_MATCH_SIMILARITY similar (word-level diff ratio)
+    REVISION_MATCH_SIMILARITY = float(os.environ.get('REVISION_MATCH_SIMILARITY', 0.6))
+
+    # When clauses are analyzed: 'eager' (every clause during the upload), 'lazy' (a clause is
+    # analyzed when it is opened or exported) or 'prioritized' (the first ANALYSIS_PRIORITY_CLAUSES
+    # during the upload, the rest by BACKGROUND_ANALYSIS_WORKERS threads afterwards)
+    ANALYSIS_POLICY = os.environ.get('ANALYSIS_POLICY', 'eager').lower()
+    ANALYSIS_PRIORITY_CLAUSES = int(os.environ.get('ANALYSIS_PRIORITY_CLAUSES', 5))
+    BACKGROUND_ANALYSIS_WORKERS = int(os.environ.get('BACKGROUND_ANALYSIS_WORKERS', 2))
+
+    # Every request's stage timings are recorded for /metrics; SERVER_TIMING_HEADER also
+    # returns them to the client in a Server-Timing response header
+    SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'false').lower() == 'true'
@@ -0,0 +1,284 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def new_document_id():
+    """Generate an opaque id for an uploaded document"""
+    return uuid.uuid4().hex
+
+
+class MemoryDocumentStore:
+    """In-process LRU document store capped by document count and serialized size.
+
+    Documents are kept as JSON so callers never share mutable state and the
+    byte cap reflects what is actually held in memory.
+    """
+
+    def __init__(self, max_documents=100, max_bytes=200 * 1024 * 1024, ttl_seconds=None):
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._documents = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, document_id):
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at is not None and time.time() > expires_at:
+                self._remove(document_id)
+                return None
+            self._documents.move_to_end(document_id)
+        return json.loads(payload)
+
+    def save(self, document_id, document):
+        with self._lock:
+            self._put(document_id, document)
+
+    def update(self, document_id, change):
+        """Apply change(document) and save the result atomically; change may return False to skip the write.
+
+        Returns the document as changed, or None when it is not stored.
+        """
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is None or (entry[1] is not None and time.time() > entry[1]):
+                return None
+            document = json.loads(entry[0])
+            if change(document) is not False:
+                self._put(document_id, document)
+            return document
+
+    def delete(self, document_id):
+        with self._lock:
+            if document_id in self._documents:
+                self._remove(document_id)
+
+    def _put(self, document_id, document):
+        payload = json.dumps(document)
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        if document_id in self._documents:
+            self._remove(document_id)
+        self._documents[document_id] = (payload, expires_at)
+        self._bytes += len(payload)
+
+        # Evict least recently used documents until both caps are met
+        while self._documents and (len(self._documents) > self.max_documents or self._bytes > self.max_bytes):
+            oldest = next(iter(self._documents))
+            if oldest == document_id:
+                break
+            self._remove(oldest)
+
+    def _remove(self, document_id):
+        payload, _ = self._documents.pop(document_id)
+        self._bytes -= len(payload)
+
+
+class SQLiteDocumentStore:
+    """Document store in a local SQLite file shared by every worker process on the host.
+
+    Capped by document count and payload bytes like the memory store, evicting
+    the least recently used documents. As in ResultCache, the totals are only
+    checked every `evict_interval` writes (or a hundredth of `max_bytes`
+    written) and reads only refresh `last_access` once it is
+    `touch_interval` seconds old.
+    """
+
+    def __init__(self, path, max_documents=100, max_bytes=200 * 1024 * 1024, ttl_seconds=None, touch_interval=300):
+        self.path = path
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.touch_interval = touch_interval
+        self.evict_interval = max(1, min(100, max_documents // 100))
+        self._lock = threading.Lock()
+        # Check the totals on the first write, in case the store is already over a cap
+        self._writes_since_check = self.evict_interval
+        self._bytes_since_check = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            'id TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL, '
+            'size INTEGER NOT NULL DEFAULT 0, last_access REAL NOT NULL DEFAULT 0)'
+        )
+        # Stores created before the caps existed lack the size and last_access columns
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(documents)')}
+        if 'size' not in columns:
+            self._conn.execute('ALTER TABLE documents ADD COLUMN size INTEGER NOT NULL DEFAULT 0')
+            self._conn.execute('UPDATE documents SET size = LENGTH(payload)')
+        if 'last_access' not in columns:
+            self._conn.execute('ALTER TABLE documents ADD COLUMN last_access REAL NOT NULL DEFAULT 0')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS documents_expires_at ON documents (expires_at)')
+        # Covers size too, so totals and LRU walks never read the payloads
+        self._conn.execute('CREATE INDEX IF NOT EXISTS documents_lru ON documents (last_access, size)')
+        self._conn.commit()
+
+    def get(self, document_id):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT payload, expires_at, last_access FROM documents WHERE id = ?', (document_id,)
+            ).fetchone()
+            if row is not None and now - row[2] > self.touch_interval:
+                self._conn.execute('UPDATE documents SET last_access = ? WHERE id = ?', (now, document_id))
+                self._conn.commit()
+        if row is None:
+            return None
+        payload, expires_at, _ = row
+        if expires_at is not None and now > expires_at:
+            self.delete(document_id)
+            return None
+        return json.loads(payload)
+
+    def save(self, document_id, document):
+        with self._lock:
+            self._put(document_id, json.dumps(document))
+            self._conn.commit()
+
+    def update(self, document_id, change):
+        """Apply change(document) and save the result atomically; change may return False to skip the write.
+
+        The read and the write share one IMMEDIATE transaction, so updates
+        from other worker processes are serialized instead of overwritten.
+        Returns the document as changed, or None when it is not stored.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT payload, expires_at FROM documents WHERE id = ?', (document_id,)
+                ).fetchone()
+                if row is None or (row[1] is not None and time.time() > row[1]):
+                    self._conn.rollback()
+                    return None
+                document = json.loads(row[0])
+                if change(document) is not False:
+                    self._put(document_id, json.dumps(document))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return document
+
+    def delete(self, document_id):
+        with self._lock:
+            self._conn.execute('DELETE FROM documents WHERE id = ?', (document_id,))
+            self._conn.commit()
+
+    def _put(self, document_id, payload):
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else None
+        self._conn.execute(
+            'INSERT OR REPLACE INTO documents (id, payload, expires_at, size, last_access) VALUES (?, ?, ?, ?, ?)',
+            (document_id, payload, expires_at, len(payload), now)
+        )
+        self._writes_since_check += 1
+        self._bytes_since_check += len(payload)
+        if self._writes_since_check >= self.evict_interval or self._bytes_since_check >= self.max_bytes // 100:
+            self._writes_since_check = self._bytes_since_check = 0
+            self._evict(document_id, now)
+
+    def _evict(self, document_id, now):
+        """Purge expired documents, then the least recently used ones over either cap"""
+        self._conn.execute('DELETE FROM documents WHERE expires_at IS NOT NULL AND expires_at < ?', (now,))
+        count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents').fetchone()
+        excess_documents = count - self.max_documents
+        excess_bytes = total - self.max_bytes
+        if excess_documents <= 0 and excess_bytes <= 0:
+            return
+        victims = []
+        for victim, size in self._conn.execute('SELECT id, size FROM documents ORDER BY last_access'):
+            if excess_documents <= 0 and excess_bytes <= 0:
+                break
+            if victim == document_id:
+                continue
+            victims.append((victim,))
+            excess_documents -= 1
+            excess_bytes -= size
+        self._conn.executemany('DELETE FROM documents WHERE id = ?', victims)
+
+
+class RedisDocumentStore:
+    """Document store on a Redis-compatible server, shared across worker nodes"""
+
+    def __init__(self, url, ttl_seconds=None, prefix='legislens:document:'):
+        if redis is None:
+            raise RuntimeError("The redis package is required for DOCUMENT_STORE=redis")
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, document_id):
+        payload = self._client.get(self.prefix + document_id)
+        return json.loads(payload) if payload is not None else None
+
+    def save(self, document_id, document):
+        self._client.set(self.prefix + document_id, json.dumps(document), ex=self.ttl_seconds or None)
+
+    def update(self, document_id, change):
+        """Apply change(document) and save the result atomically; change may return False to skip the write.
+
+        Uses WATCH/MULTI: when another worker writes the document between the
+        read and the write, the transaction is dropped and the change is
+        applied again to the fresh copy. Returns the document as changed, or
+        None when it is not stored.
+        """
+        key = self.prefix + document_id
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    payload = pipe.get(key)
+                    if payload is None:
+                        pipe.unwatch()
+                        return None
+                    document = json.loads(payload)
+                    if change(document) is False:
+                        pipe.unwatch()
+                        return document
+                    pipe.multi()
+                    pipe.set(key, json.dumps(document), ex=self.ttl_seconds or None)
+                    pipe.execute()
+                    return document
+                except redis.WatchError:
+                    continue
+
+    def delete(self, document_id):
+        self._client.delete(self.prefix + document_id)
+
+
+def create_document_store(config):
+    """Build the document store backend selected by config.DOCUMENT_STORE"""
+    backend = config.DOCUMENT_STORE
+    if backend == 'memory':
+        return MemoryDocumentStore(
+            max_documents=config.DOCUMENT_STORE_MAX_DOCUMENTS,
+            max_bytes=config.DOCUMENT_STORE_MAX_BYTES,
+            ttl_seconds=config.DOCUMENT_TTL_SECONDS
+        )
+    elif backend == 'sqlite':
+        return SQLiteDocumentStore(
+            config.DOCUMENT_STORE_PATH,
+            max_documents=config.DOCUMENT_STORE_MAX_DOCUMENTS,
+            max_bytes=config.DOCUMENT_STORE_MAX_BYTES,
+            ttl_seconds=config.DOCUMENT_TTL_SECONDS
+        )
+    elif backend == 'redis':
+        return RedisDocumentStore(config.DOCUMENT_STORE_URL, ttl_seconds=config.DOCUMENT_TTL_SECONDS)
+    raise ValueError(f"Unknown document store backend: {backend}")
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+from cache import content_key
+from report import generate_pdf_content, report_labels, report_styles, supports_pdf, write_report
+
+
+# Export formats: mimetype and file extension of each rendered artifact
+EXPORT_FORMATS = {
+    'pdf': ('application/pdf', 'pdf'),
+    'html': ('text/html; charset=utf-8', 'html'),
+}
+
+
+def analysis_revision(document):
+    """Fingerprint of everything a report shows, so any change to the analysis yields a new revision"""
+    parts = [document.get('summary') or '']
+    for clause in document.get('clauses') or []:
+        parts.extend([clause.get('id'), clause.get('title'), clause.get('risk'), clause.get('summary'), clause.get('content')])
+    return content_key(*parts)[:16]
+
+
+def localize_document(document, language, translate_many=None):
+    """Return (document, labels) for the language, translating summaries and labels in one batch.
+
+    Without a translator only the built-in risk label translations apply.
+    The original clause text is never translated.
+    """
+    labels = report_labels(language)
+    if language == 'en' or translate_many is None:
+        return document, labels
+
+    clauses = document.get('clauses') or []
+    label_keys = list(labels)
+    texts = [labels[key] for key in label_keys]
+    texts.append(document.get('summary') or '')
+    for clause in clauses:
+        texts.extend([clause.get('title') or '', clause.get('summary') or ''])
+
+    translated = translate_many(texts, language)
+    labels = dict(zip(label_keys, translated))
+    position = len(label_keys)
+    localized = dict(document, summary=translated[position])
+    position += 1
+    localized['clauses'] = []
+    for clause in clauses:
+        title, summary = translated[position:position + 2]
+        position += 2
+        localized['clauses'].append(dict(clause, title=title, summary=summary))
+    return localized, labels
+
+
+def render_export(document, language='en', export_format='pdf', translate_many=None):
+    """Render a document's report in the given language and format, returning bytes.
+
+    Raises UnsupportedReportLanguage for a PDF in a script the PDF fonts cannot render.
+    """
+    if export_format == 'pdf':
+        # Fails before paying for a translation that could never be rendered
+        report_styles(language)
+    document, labels = localize_document(document, language, translate_many)
+    if export_format == 'html':
+        return generate_pdf_content(document, language, labels).encode('utf-8')
+
+    out = BytesIO()
+    write_report(document, out, labels, language)
+    return out.getvalue()
+
+
+class ExportCache:
+    """Rendered reports in a SQLite file, evicted least recently used once over a byte budget.
+
+    Shared by the web and worker processes so reports pre-rendered by a
+    background job are served straight from the cache.
+
+    As in ResultCache, the totals are only checked once `evict_interval`
+    artifacts or a hundredth of `max_bytes` were written since the last
+    check, and a hit only refreshes `last_access` when it is more than
+    `touch_interval` seconds old.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, max_entries=1000, touch_interval=300):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.evict_interval = max(1, min(100, max_entries // 100))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Check the totals on the first write, in case the table is already over a cap
+        self._inserts_since_check = self.evict_interval
+        self._bytes_since_check = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS exports ('
+            'key TEXT PRIMARY KEY, document_id TEXT NOT NULL, data BLOB NOT NULL, '
+            'size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)'
+        )
+        # Covers size too, so totals and LRU walks never read the artifact blobs
+        self._conn.execute('DROP INDEX IF EXISTS exports_last_access')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS exports_lru ON exports (last_access, size)')
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached artifact bytes, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT data, last_access FROM exports WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if now - row[1] > self.touch_interval:
+                self._conn.execute('UPDATE exports SET last_access = ? WHERE key = ?', (now, key))
+                self._conn.commit()
+            self.hits += 1
+        return bytes(row[0])
+
+    def set(self, key, document_id, data):
+        """Store an artifact, then evict the least recently used ones over the byte or entry cap"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO exports (key, document_id, data, size, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, document_id, sqlite3.Binary(data), len(data), now, now)
+            )
+            self._evict(key, len(data))
+            self._conn.commit()
+
+    def _evict(self, key, size):
+        """Drop the least recently used artifacts once enough was written to possibly pass a cap"""
+        self._inserts_since_check += 1
+        self._bytes_since_check += size
+        if self._inserts_since_check < self.evict_interval and self._bytes_since_check < self.max_bytes // 100:
+            return
+        self._inserts_since_check = self._bytes_since_check = 0
+        entries, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM exports').fetchone()
+        excess_entries = entries - self.max_entries
+        excess_bytes = total - self.max_bytes
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return
+        # Trim a little below the caps so the next writes do not evict again straight away
+        if excess_entries > 0:
+            excess_entries += self.evict_interval
+        if excess_bytes > 0:
+            excess_bytes += self.max_bytes // 100
+        victims = []
+        for victim, victim_size in self._conn.execute('SELECT key, size FROM exports ORDER BY last_access'):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            if victim == key:
+                continue
+            victims.append((victim,))
+            excess_entries -= 1
+            excess_bytes -= victim_size
+        self._conn.executemany('DELETE FROM exports WHERE key = ?', victims)
+
+    def delete_document(self, document_id):
+        """Drop every artifact rendered for a document"""
+        with self._lock:
+            self._conn.execute('DELETE FROM exports WHERE document_id = ?', (document_id,))
+            self._conn.commit()
+
+    def stats(self):
+        """Hit/miss counters for this process plus the number and total size of artifacts"""
+        with self._lock:
+            entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM exports').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+class Exporter:
+    """Serves rendered reports from the cache, rendering each artifact at most once at a time.
+
+    A render already in flight, such as a background pre-render started when
+    analysis finished, is waited on instead of being repeated.
+    """
+
+    def __init__(self, cache, translate_many=None, workers=1):
+        self.cache = cache
+        self.translate_many = translate_many
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export-prerender')
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def artifact_key(self, document_id, document, language, export_format):
+        return content_key('export', document_id, analysis_revision(document), language, export_format)
+
+    def get(self, document_id, document, language='en', export_format='pdf'):
+        """Return the artifact bytes, rendering and caching them on a miss"""
+        key = self.artifact_key(document_id, document, language, export_format)
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._in_flight[key] = Future()
+
+        if not owner:
+            return pending.result()
+
+        try:
+            data = render_export(document, language, export_format, self.translate_many)
+            self.cache.set(key, document_id, data)
+            pending.set_result(data)
+            return data
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def prerender(self, document_id, document, languages=('en',), formats=('pdf',)):
+        """Render artifacts in the background so a later export is served from the cache"""
+        def run(language, export_format):
+            try:
+                self.get(document_id, document, language, export_format)
+            except Exception as e:
+                print(f"Export pre-render failed for {document_id} ({language}, {export_format}): {e}")
+
+        return [
+            self._executor.submit(run, language, export_format)
+            for language in dict.fromkeys(languages) for export_format in formats
+            if export_format != 'pdf' or supports_pdf(language)
+        ]
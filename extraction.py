@@ -0,0 +1,354 @@
+import bisect
+import io
+import mmap
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+
+import PyPDF2
+from lxml import etree
+
+
+# Extracted document text plus the character offset at which each page starts. DOCX files
+# also report styled headings as (start, end, outline level) offsets into the text.
+ExtractedDocument = namedtuple('ExtractedDocument', ['text', 'page_offsets', 'headings'], defaults=(None,))
+
+# A paragraph or table row of a DOCX body; level is the heading outline level (0 = top) or None
+DocxBlock = namedtuple('DocxBlock', ['kind', 'text', 'level'])
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_BODY, _P, _R, _T, _TBL, _TR, _TC = (_W + tag for tag in ('body', 'p', 'r', 't', 'tbl', 'tr', 'tc'))
+_BREAKS = frozenset([_W + 'tab', _W + 'br', _W + 'cr'])
+# Elements that own paragraphs; only paragraphs and rows owned by the body are emitted
+_CONTAINERS = frozenset([_BODY, _TC, _W + 'txbxContent', _W + 'comment', _W + 'footnote', _W + 'endnote'])
+_HEADING_STYLE_RE = re.compile(r'^heading\s*(\d)$', re.IGNORECASE)
+
+
+class ExtractionLimitError(ValueError):
+    """Raised when an upload exceeds the configured page or byte limits"""
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """Shared process pool, created lazily and recreated after a fork"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # Spawn rather than fork: the web process runs threads that must not be copied mid-lock
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+@contextmanager
+def mapped_source(stream):
+    """A read-only memory map of a file-backed stream, or the stream itself when it is held in memory.
+
+    Parsers read the upload through the map, so its pages come from the OS
+    page cache (and can be dropped again under memory pressure) instead of
+    being copied into the process.
+    """
+    if isinstance(stream, tempfile.SpooledTemporaryFile):
+        # Asking a spooled file for its fileno would copy an in-memory one to disk; use what it holds
+        stream = stream._file
+    try:
+        fileno = stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        yield stream
+        return
+    if os.fstat(fileno).st_size == 0:
+        yield stream
+        return
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+def _open_reader(source):
+    """Open a PdfReader from a file path (memory-mapped) or raw bytes"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return PyPDF2.PdfReader(BytesIO(source))
+    with open(source, 'rb') as stream:
+        # The map keeps its own handle to the file, so it outlives the stream
+        return PyPDF2.PdfReader(mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def _extract_page_range(source, start, stop):
+    """Extract the text of pages [start, stop) in a worker process"""
+    return list(iter_pdf_pages(_open_reader(source), start=start, stop=stop))
+
+
+def iter_pdf_pages(reader, max_pages=None, start=0, stop=None):
+    """Yield page texts lazily, one page at a time"""
+    if max_pages is not None:
+        stop = max_pages if stop is None else min(stop, max_pages)
+    pages = reader.pages
+    for i in range(start, len(pages) if stop is None else min(stop, len(pages))):
+        yield pages[i].extract_text() or ""
+        # PyPDF2 keeps every object it resolves, including the image data of scanned pages;
+        # dropping them after each page keeps memory flat (shared fonts are simply re-read)
+        reader.resolved_objects.clear()
+
+
+def limit_text(pages, max_chars):
+    """Pass page texts through, raising once their total length goes over max_chars"""
+    total = 0
+    for page in pages:
+        total += len(page) + 1
+        if max_chars is not None and total > max_chars:
+            raise ExtractionLimitError(f"Document text is too long (over {max_chars} characters)")
+        yield page
+
+
+def join_pages(pages):
+    """Join page texts with a newline after each page, recording where every page starts"""
+    page_offsets = []
+    offset = 0
+    for page in pages:
+        page_offsets.append(offset)
+        offset += len(page) + 1
+    return ExtractedDocument("".join(page + "\n" for page in pages), page_offsets)
+
+
+def _source_size(stream):
+    """Size in bytes of a seekable stream, without reading it"""
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def extract_pdf(stream, max_pages, max_bytes, parallel_min_pages, workers, max_chars=None):
+    """Extract text from a PDF stream, spreading large files across a process pool.
+
+    Small documents are read page by page in this process. Documents with at
+    least `parallel_min_pages` pages are split into contiguous page ranges
+    that worker processes extract independently; the results are joined once.
+    Size and page limits are checked before any page is extracted.
+    """
+    size = _source_size(stream)
+    if size > max_bytes:
+        raise ExtractionLimitError(f"File is too large ({size} bytes, limit is {max_bytes})")
+
+    with mapped_source(stream) as source:
+        reader = PyPDF2.PdfReader(source)
+        page_count = len(reader.pages)
+        if page_count > max_pages:
+            raise ExtractionLimitError(f"Document has too many pages ({page_count}, limit is {max_pages})")
+
+        if workers <= 1 or page_count < parallel_min_pages:
+            return join_pages(list(limit_text(iter_pdf_pages(reader), max_chars)))
+
+    # Hand workers a file path when there is one (spooled uploads are named files), otherwise the raw bytes
+    path = getattr(stream, 'name', None)
+    if isinstance(path, str) and os.path.isfile(path):
+        source = path
+    else:
+        stream.seek(0)
+        source = stream.read()
+
+    chunk = -(-page_count // workers)
+    ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+    pool = _get_pool(workers)
+    futures = [pool.submit(_extract_page_range, source, start, stop) for start, stop in ranges]
+
+    pages = list(limit_text((page for future in futures for page in future.result()), max_chars))
+    return join_pages(pages)
+
+
+def _docx_heading_levels(archive):
+    """Map paragraph style ids to heading outline levels, following basedOn inheritance"""
+    try:
+        root = etree.fromstring(archive.read('word/styles.xml'), etree.XMLParser(resolve_entities=False))
+    except KeyError:
+        return {}
+
+    levels = {}
+    based_on = {}
+    for style in root.iter(_W + 'style'):
+        if style.get(_W + 'type') != 'paragraph':
+            continue
+        style_id = style.get(_W + 'styleId')
+        outline = style.find(f'{_W}pPr/{_W}outlineLvl')
+        name = style.find(_W + 'name')
+        match = _HEADING_STYLE_RE.match(name.get(_W + 'val', '') if name is not None else '')
+        if outline is not None and outline.get(_W + 'val', '').isdigit():
+            levels[style_id] = int(outline.get(_W + 'val'))
+        elif match:
+            levels[style_id] = int(match.group(1)) - 1
+        parent = style.find(_W + 'basedOn')
+        if parent is not None:
+            based_on[style_id] = parent.get(_W + 'val')
+
+    for style_id in list(based_on):
+        ancestor = style_id
+        for _ in range(10):
+            if ancestor in levels or ancestor not in based_on:
+                break
+            ancestor = based_on[ancestor]
+        if style_id not in levels and ancestor in levels:
+            levels[style_id] = levels[ancestor]
+
+    # Outline level 9 is body text
+    return {style_id: level for style_id, level in levels.items() if level < 9}
+
+
+def _container(element):
+    parent = element.getparent()
+    while parent is not None and parent.tag not in _CONTAINERS:
+        parent = parent.getparent()
+    return parent
+
+
+def _paragraph_text(paragraph):
+    """Text of a paragraph's own runs, with tabs and breaks as in python-docx; deleted text is skipped"""
+    parts = []
+    for node in paragraph.iter(_T, *_BREAKS):
+        run = node.getparent()
+        # Tab stops in the paragraph properties are also w:tab elements
+        if run.tag != _R:
+            continue
+        owner = run.getparent()
+        while owner is not None and owner.tag != _P:
+            owner = owner.getparent()
+        # Skip the paragraphs of text boxes anchored in this paragraph
+        if owner is not paragraph:
+            continue
+        if node.tag == _T:
+            parts.append(node.text or '')
+        else:
+            parts.append('\t' if node.tag == _W + 'tab' else '\n')
+    return ''.join(parts)
+
+
+def _paragraph_level(paragraph, style_levels):
+    properties = paragraph.find(_W + 'pPr')
+    if properties is None:
+        return None
+    outline = properties.find(_W + 'outlineLvl')
+    if outline is not None and outline.get(_W + 'val', '').isdigit():
+        level = int(outline.get(_W + 'val'))
+        return level if level < 9 else None
+    style = properties.find(_W + 'pStyle')
+    if style is None:
+        return None
+    style_id = style.get(_W + 'val')
+    if style_id in style_levels:
+        return style_levels[style_id]
+    match = _HEADING_STYLE_RE.match(style_id or '')
+    return int(match.group(1)) - 1 if match else None
+
+
+def _row_text(row):
+    """Cells of a table row joined with " | ", each cell's paragraphs on one line"""
+    cells = []
+    for cell in row.iter(_TC):
+        owner = cell.getparent()
+        while owner is not None and owner.tag != _TR:
+            owner = owner.getparent()
+        # Cells of nested tables are already part of their enclosing cell's text
+        if owner is not row:
+            continue
+        cells.append(' '.join(' '.join(_paragraph_text(p).split()) for p in cell.iter(_P)).strip())
+    return ' | '.join(cells) if any(cells) else ''
+
+
+def _release(element):
+    """Free a processed element and everything before it, so the parsed tree stays small"""
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+
+def iter_docx_blocks(stream, max_xml_bytes=None):
+    """Stream the body of a DOCX file as DocxBlocks: paragraphs and table rows in document order.
+
+    word/document.xml is parsed incrementally straight from the zip and every
+    block is released once emitted, so memory stays flat however long the
+    document is. Rows are emitted as one line with cells separated by " | ";
+    paragraphs inside table cells, text boxes and notes are not emitted on
+    their own.
+    """
+    with zipfile.ZipFile(stream) as archive:
+        try:
+            info = archive.getinfo('word/document.xml')
+        except KeyError:
+            raise ValueError("Not a Word document: word/document.xml is missing")
+        if max_xml_bytes is not None and info.file_size > max_xml_bytes:
+            raise ExtractionLimitError(
+                f"Document body is too large ({info.file_size} bytes uncompressed, limit is {max_xml_bytes})"
+            )
+        style_levels = _docx_heading_levels(archive)
+
+        with archive.open(info) as xml:
+            for _, element in etree.iterparse(xml, events=('end',), tag=(_P, _TR, _TBL), resolve_entities=False):
+                container = _container(element)
+                if container is None or container.tag != _BODY:
+                    continue
+                if element.tag == _P:
+                    yield DocxBlock('paragraph', _paragraph_text(element), _paragraph_level(element, style_levels))
+                    _release(element)
+                elif element.tag == _TR:
+                    text = _row_text(element)
+                    if text:
+                        yield DocxBlock('row', text, None)
+                    _release(element)
+                else:
+                    # Rows were emitted as they ended; only the table's properties remain
+                    _release(element)
+
+
+def extract_docx(stream, max_bytes=None, max_xml_bytes=None, max_chars=None):
+    """Extract the body text of a DOCX file, tables included, one line per paragraph or table row.
+
+    Word documents have no page offsets; styled headings are returned as
+    (start, end, level) offsets for the clause segmenter.
+    """
+    size = _source_size(stream)
+    if max_bytes is not None and size > max_bytes:
+        raise ExtractionLimitError(f"File is too large ({size} bytes, limit is {max_bytes})")
+
+    text = StringIO()
+    headings = []
+    offset = 0
+    # Not memory-mapped: zipfile needs a real file object, and already reads members piece by piece
+    for block in iter_docx_blocks(stream, max_xml_bytes):
+        if block.level is not None and block.text.strip():
+            headings.append((offset, offset + len(block.text), block.level))
+        text.write(block.text)
+        text.write('\n')
+        offset += len(block.text) + 1
+        if max_chars is not None and offset > max_chars:
+            raise ExtractionLimitError(f"Document text is too long (over {max_chars} characters)")
+    return ExtractedDocument(text.getvalue(), [0], headings)
+
+
+def extract_path(path, max_pages, max_bytes, max_xml_bytes=None, max_chars=None):
+    """Extract a PDF or DOCX file on disk in the current process; None for other file types"""
+    lowered = path.lower()
+    with open(path, 'rb') as stream:
+        if lowered.endswith('.pdf'):
+            return extract_pdf(stream, max_pages, max_bytes, parallel_min_pages=max_pages + 1, workers=1,
+                               max_chars=max_chars)
+        elif lowered.endswith('.docx'):
+            return extract_docx(stream, max_bytes, max_xml_bytes, max_chars)
+    return None
+
+
+def page_for_offset(page_offsets, offset):
+    """Map a character offset in the extracted text to a 1-based page number"""
+    if not page_offsets:
+        return None
+    return bisect.bisect_right(page_offsets, offset)
@@ -0,0 +1,299 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler once cancellation has been requested"""
+
+
+class JobFailed(Exception):
+    """Raised by a job handler for failures that retrying will not fix"""
+
+
+class JobQueue:
+    """Durable job queue in a local SQLite file.
+
+    The web process enqueues jobs and any number of worker threads or
+    worker processes on the same host claim and run them. Job records carry
+    progress, per-stage timings and partial results so they can be polled.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode so claims can use explicit IMMEDIATE transactions
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, '
+            'status TEXT NOT NULL, stage TEXT, progress TEXT NOT NULL, timings TEXT NOT NULL, '
+            'partial TEXT NOT NULL, result TEXT, error TEXT, '
+            'attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, '
+            'cancel_requested INTEGER NOT NULL DEFAULT 0, run_after REAL NOT NULL, '
+            'created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, run_after)')
+
+    def enqueue(self, kind, payload, max_attempts=3, job_id=None):
+        """Add a job and return its id"""
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, kind, payload, status, progress, timings, partial, '
+                'max_attempts, run_after, created_at, updated_at) '
+                "VALUES (?, ?, ?, 'queued', '{}', '{}', '{}', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), max_attempts, now, now, now)
+            )
+        return job_id
+
+    def claim(self):
+        """Atomically take the oldest runnable job, or return None"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ? "
+                    'ORDER BY created_at LIMIT 1', (now,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute('COMMIT')
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (now, row[0])
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return self.get(row[0])
+
+    def expire_leases(self, lease_seconds):
+        """Requeue running jobs not updated for lease_seconds, as their worker has died.
+
+        Jobs already at max_attempts, or asked to cancel, are ended instead
+        and returned so their worker can clean up after them.
+        """
+        now = time.time()
+        cutoff = now - lease_seconds
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'running' AND updated_at < ? "
+                    'AND (attempts >= max_attempts OR cancel_requested = 1)', (cutoff,)
+                ).fetchall()
+                self._conn.execute(
+                    "UPDATE jobs SET status = CASE WHEN cancel_requested = 1 THEN 'cancelled' ELSE 'failed' END, "
+                    "stage = NULL, error = 'Worker stopped responding', updated_at = ? "
+                    "WHERE status = 'running' AND updated_at < ? AND (attempts >= max_attempts OR cancel_requested = 1)",
+                    (now, cutoff)
+                )
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', stage = NULL, error = 'Worker stopped responding', "
+                    "run_after = ?, updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                    (now, now, cutoff)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [self.get(row[0]) for row in rows]
+
+    def get(self, job_id):
+        """Return the job record as a dict, or None"""
+        with self._lock:
+            cursor = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            columns = [c[0] for c in cursor.description]
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        for field in ('payload', 'progress', 'timings', 'partial', 'result'):
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def update(self, job_id, **fields):
+        """Update job columns; dict values are stored as JSON"""
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        values = [json.dumps(v) if isinstance(v, (dict, list)) else v for v in fields.values()]
+        with self._lock:
+            self._conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', values + [job_id])
+
+    def cancel(self, job_id):
+        """Cancel a queued job now, or ask a running job to stop at its next checkpoint"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (now, job_id)
+            )
+            self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'",
+                (now, job_id)
+            )
+
+    def is_cancel_requested(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+
+class JobContext:
+    """Handle passed to job handlers for reporting progress and checking for cancellation"""
+
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.job = job
+        self.timings = dict(job['timings'])
+        self.partial = dict(job['partial'])
+        self._stage = None
+        self._stage_started = None
+
+    def stage(self, name):
+        """Finish timing the current stage and start timing the next one"""
+        self.check_cancelled()
+        self._finish_stage()
+        self._stage = name
+        self._stage_started = time.perf_counter()
+        self.queue.update(self.job['id'], stage=name, timings=self.timings)
+
+    def progress(self, completed, total, **partial):
+        """Record progress within the current stage along with any partial results"""
+        self.partial.update(partial)
+        self.queue.update(
+            self.job['id'],
+            progress={"completed": completed, "total": total},
+            partial=self.partial
+        )
+
+    def check_cancelled(self):
+        if self.queue.is_cancel_requested(self.job['id']):
+            raise JobCancelled()
+
+    def _finish_stage(self):
+        if self._stage is not None:
+            self.timings[self._stage] = round(time.perf_counter() - self._stage_started, 4)
+            self._stage = None
+
+
+class JobWorker:
+    """Pool of threads that claim jobs from a JobQueue and run the matching handler"""
+
+    def __init__(self, queue, handlers, concurrency=2, poll_interval=0.5, retry_backoff=2.0,
+                 lease_seconds=300, on_finished=None):
+        self.queue = queue
+        self.handlers = handlers
+        self.on_finished = on_finished
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        # Running jobs are kept alive every lease_seconds / 3, so only a dead worker's jobs expire
+        self.lease_seconds = lease_seconds
+        self._next_lease_check = 0.0
+        self._threads = []
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads once; safe to call on every request"""
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.concurrency):
+                thread = threading.Thread(target=self.run_forever, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        """Claim and run jobs until stopped"""
+        while not self._stop.is_set():
+            self.recover_expired()
+            job = self.queue.claim()
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def recover_expired(self):
+        """Requeue jobs whose worker died mid-run; checked every lease_seconds / 3 across threads"""
+        now = time.time()
+        with self._start_lock:
+            if now < self._next_lease_check:
+                return
+            self._next_lease_check = now + self.lease_seconds / 3
+        try:
+            ended = self.queue.expire_leases(self.lease_seconds)
+        except sqlite3.Error as e:
+            print(f"Job lease check failed: {e}")
+            return
+        for job in ended:
+            print(f"Job {job['id']} {job['status']} after its worker stopped responding")
+            if self.on_finished is not None:
+                self.on_finished(job)
+
+    def run_job(self, job):
+        context = JobContext(self.queue, job)
+        handler = self.handlers[job['kind']]
+        finished = True
+        # Renew the lease while the handler runs, even through long stages without progress
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._keep_alive, args=(job['id'], done), daemon=True)
+        heartbeat.start()
+        try:
+            result = handler(job['payload'], context)
+            context._finish_stage()
+            self.queue.update(
+                job['id'], status='succeeded', stage=None, timings=context.timings,
+                partial=context.partial, result=result
+            )
+        except JobCancelled:
+            context._finish_stage()
+            self.queue.update(job['id'], status='cancelled', stage=None, timings=context.timings)
+        except Exception as e:
+            context._finish_stage()
+            print(f"Job {job['id']} failed (attempt {job['attempts']}): {e}")
+            if not isinstance(e, JobFailed):
+                traceback.print_exc()
+            if not isinstance(e, JobFailed) and job['attempts'] < job['max_attempts']:
+                # Exponential backoff with jitter before the job becomes claimable again
+                delay = self.retry_backoff * (2 ** (job['attempts'] - 1)) * random.uniform(0.5, 1.5)
+                self.queue.update(
+                    job['id'], status='queued', stage=None, timings=context.timings,
+                    error=str(e), run_after=time.time() + delay
+                )
+                finished = False
+            else:
+                self.queue.update(job['id'], status='failed', stage=None, timings=context.timings, error=str(e))
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if finished and self.on_finished is not None:
+            self.on_finished(job)
+
+    def _keep_alive(self, job_id, done):
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                self.queue.update(job_id)
+            except sqlite3.Error as e:
+                print(f"Job {job_id} lease renewal failed: {e}")
@@ -0,0 +1,197 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Latency buckets in seconds, from 1 ms to 2 minutes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Payload buckets in bytes, from 1 KB to 256 MB
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+
+# Prompt sizes in tokens, from 64 to 64K
+TOKEN_BUCKETS = tuple(64 * 2 ** i for i in range(11))
+
+# Stage timings of the request being handled on this thread, for the Server-Timing header
+_request_timings = ContextVar('request_timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def lines(self):
+        with self._lock:
+            values = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in values:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_value(float(bound))
+                yield f"{self.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(labels)} {count}"
+
+
+class Collector:
+    """Metric read at scrape time from `collect()`, which returns [(labels_dict, value), ...]"""
+
+    def __init__(self, name, help, kind, collect):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.collect = collect
+
+    def lines(self):
+        for labels, value in self.collect():
+            yield f"{self.name}{_format_labels(sorted(labels.items()))} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Every pipeline stage is timed with `span(stage)` (or the `timed(stage)`
+    decorator) into one stage latency histogram; exceptions escaping a span
+    are counted by stage and type. Each worker process keeps its own
+    metrics, so scrape every worker or run a single one per port.
+    """
+
+    def __init__(self, prefix='legislens'):
+        self.prefix = prefix
+        self._metrics = []
+        self._lock = threading.Lock()
+        self.stage_seconds = self.histogram('stage_seconds', 'Time spent in each pipeline stage', labelnames=('stage',))
+        self.errors = self.counter('errors_total', 'Exceptions raised by pipeline stages', labelnames=('stage', 'type'))
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(f"{self.prefix}_{name}", help, labelnames))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        return self._register(Histogram(f"{self.prefix}_{name}", help, buckets, labelnames))
+
+    def collector(self, name, help, kind, collect):
+        """Register a counter or gauge whose samples are produced by `collect()` when scraped"""
+        return self._register(Collector(f"{self.prefix}_{name}", help, kind, collect))
+
+    @contextmanager
+    def span(self, stage):
+        """Time a block as `stage`, counting any exception that escapes it"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.errors.inc(stage=stage, type=type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_seconds.observe(elapsed, stage=stage)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings.append((stage, elapsed))
+
+    def timed(self, stage):
+        """Decorator running the function inside span(stage)"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def begin_request(self):
+        """Start collecting the spans run on this thread for the current request"""
+        _request_timings.set([])
+
+    def server_timing(self, total_seconds=None):
+        """Server-Timing header value for the spans collected since begin_request, summed per stage"""
+        totals = {}
+        for stage, elapsed in _request_timings.get() or []:
+            totals[stage] = totals.get(stage, 0.0) + elapsed
+        entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items()]
+        if total_seconds is not None:
+            entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ', '.join(entries)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.lines())
+            except Exception as e:
+                print(f"Metrics collection for {metric.name} failed: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
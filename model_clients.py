@@ -0,0 +1,48 @@
+import os
+import threading
+
+import google.generativeai as genai
+
+
+class ModelClientRegistry:
+    """One long-lived GenerativeModel per model name, shared by every thread of a worker process.
+
+    The Gemini client keeps its channel and HTTP connections open between
+    calls, so reusing the model objects avoids per-call setup and TLS
+    handshakes. Connections must not be shared across a fork, so a forked
+    child (e.g. a gunicorn worker) configures its own client on first use.
+    """
+
+    def __init__(self, api_key, endpoint=None):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self._models = {}
+        self._pid = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset)
+
+    def _configure(self):
+        if self.endpoint:
+            # Alternate endpoint such as a local stub server; only the REST transport supports plain HTTP
+            genai.configure(api_key=self.api_key, transport='rest', client_options={"api_endpoint": self.endpoint})
+        else:
+            genai.configure(api_key=self.api_key)
+
+    def get(self, model_name):
+        """Return the shared model object for model_name, configuring the client once per process"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._configure()
+                self._models = {}
+                self._pid = os.getpid()
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._models[model_name] = genai.GenerativeModel(model_name)
+            return model
+
+    def reset(self):
+        """Forget the clients inherited from a parent process; the next get() reconnects"""
+        self._lock = threading.Lock()
+        self._models = {}
+        self._pid = None
@@ -0,0 +1,244 @@
+import random
+import threading
+import time
+
+from prompts import estimate_tokens
+
+
+# HTTP statuses worth retrying: throttling first, then transient server errors
+THROTTLE_STATUSES = frozenset([429])
+TRANSIENT_STATUSES = frozenset([408, 500, 502, 503, 504])
+
+
+class ModelGatewayError(Exception):
+    """Raised when a model call still fails after every retry, or cannot be retried"""
+
+
+def error_status(error):
+    """HTTP status of a failed model call, or None when it is not an HTTP error"""
+    for attribute in ('code', 'status_code', 'status'):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    if 'ResourceExhausted' in type(error).__name__ or '429' in str(error)[:200]:
+        return 429
+    return None
+
+
+def is_throttled(error):
+    return error_status(error) in THROTTLE_STATUSES
+
+
+def is_timeout(error):
+    # requests' Timeout and api_core's DeadlineExceeded do not derive from TimeoutError
+    return isinstance(error, TimeoutError) or 'Timeout' in type(error).__name__ or error_status(error) in (408, 504)
+
+
+def is_retryable(error):
+    if is_timeout(error) or isinstance(error, ConnectionError) or 'ConnectionError' in type(error).__name__:
+        return True
+    status = error_status(error)
+    return status in THROTTLE_STATUSES or status in TRANSIENT_STATUSES
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`.
+
+    By default the bucket holds ten seconds' worth of tokens, which bounds
+    the burst allowed after an idle period.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate_per_minute / 6.0))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, amount=1, timeout=None):
+        """Take `amount` tokens, waiting for the bucket to refill; False if that would exceed timeout"""
+        # A request larger than the whole bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server reports the quota is exhausted"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = 0.0
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit: grows by one per round of successes, halves on throttling.
+
+    Decreases are spaced at least `cooldown` seconds apart so one burst of
+    429s from calls already in flight only backs off once.
+    """
+
+    def __init__(self, initial, minimum=1, maximum=None, decrease_factor=0.5, cooldown=1.0):
+        self.minimum = minimum
+        self.maximum = maximum or initial
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.limit = float(max(minimum, min(initial, self.maximum)))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+class ModelGateway:
+    """Single path for every model call: rate limits, adaptive concurrency, retries and timeouts.
+
+    `call(model_name, prompt, timeout)` performs one request and returns the
+    response text, and the optional `stream_call` with the same arguments
+    yields the text in chunks, so a fake client or a local stub server can
+    stand in for Gemini. Requests and estimated tokens are metered by token buckets, the
+    number of calls in flight follows AIMD, and throttled or transient
+    failures are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, call, requests_per_minute, tokens_per_minute, max_concurrency, min_concurrency=1,
+                 max_retries=4, backoff_base=1.0, backoff_max=30.0, timeout=60.0, output_token_estimate=256,
+                 stream_call=None):
+        self.call = call
+        self.stream_call = stream_call
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, minimum=min_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.output_token_estimate = output_token_estimate
+        self.counters = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "throttled": 0, "timeouts": 0}
+        self._counter_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff before retry number `attempt` (0-based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _acquire(self, token_cost):
+        self.requests.acquire()
+        self.tokens.acquire(token_cost)
+        self.concurrency.acquire()
+
+    def _after_failure(self, error, attempt):
+        """Count a failed attempt, then raise if it cannot be retried or back off before the next one"""
+        if is_throttled(error):
+            self._count("throttled")
+            # The server's quota is spent: stop other callers from bursting straight back in
+            self.requests.drain()
+        elif is_timeout(error):
+            self._count("timeouts")
+
+        if not is_retryable(error) or attempt == self.max_retries:
+            self._count("failed")
+            raise ModelGatewayError(f"Model call failed after {attempt + 1} attempt(s): {error}") from error
+
+        self._count("retries")
+        time.sleep(self.backoff(attempt))
+
+    def generate(self, model_name, prompt, timeout=None):
+        """Send a prompt through the limits and retries; returns the response text"""
+        timeout = timeout or self.timeout
+        token_cost = estimate_tokens(prompt) + self.output_token_estimate
+        self._count("calls")
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(token_cost)
+            throttled = False
+            try:
+                text = self.call(model_name, prompt, timeout)
+            except Exception as e:
+                throttled = is_throttled(e)
+                error = e
+            else:
+                self._count("succeeded")
+                return text
+            finally:
+                self.concurrency.release(throttled)
+
+            self._after_failure(error, attempt)
+
+    def stream(self, model_name, prompt, timeout=None):
+        """Yield response text chunks as the model produces them, under the same limits.
+
+        Failures before the first chunk are retried like generate(); once
+        text has been yielded a failure is raised instead, since the caller
+        has already used the partial answer. Falls back to a single chunk
+        when no `stream_call` was given.
+        """
+        if self.stream_call is None:
+            yield self.generate(model_name, prompt, timeout)
+            return
+
+        timeout = timeout or self.timeout
+        token_cost = estimate_tokens(prompt) + self.output_token_estimate
+        self._count("calls")
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(token_cost)
+            throttled = False
+            started = False
+            try:
+                for chunk in self.stream_call(model_name, prompt, timeout):
+                    if chunk:
+                        started = True
+                        yield chunk
+            except Exception as e:
+                throttled = is_throttled(e)
+                error = e
+                if started:
+                    self._count("failed")
+                    raise ModelGatewayError(f"Model stream interrupted: {e}") from e
+            else:
+                self._count("succeeded")
+                return
+            finally:
+                self.concurrency.release(throttled)
+
+            self._after_failure(error, attempt)
+
+    def stats(self):
+        """Call counters plus the current adaptive concurrency limit"""
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats["concurrency_limit"] = int(self.concurrency.limit)
+        stats["in_flight"] = self.concurrency.in_flight
+        return stats
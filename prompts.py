@@ -0,0 +1,87 @@
+import re
+from collections import namedtuple
+
+
+# Letter runs, single digits and single punctuation marks: roughly how Gemini's tokenizer splits legal text
+_TOKEN_PIECE_RE = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+
+# A sentence with its trailing whitespace; line breaks also end one, so headings stay separate
+_SENTENCE_RE = re.compile(r'.+?(?:[.!?]["\')\]]*(?=\s)|\n|\Z)\s*', re.DOTALL)
+
+_WORD_RE = re.compile(r'\S+\s*')
+
+# Text cut to fit a token budget: the kept text, its estimated tokens and whether anything was dropped
+FittedText = namedtuple('FittedText', ['text', 'tokens', 'truncated'])
+
+
+def estimate_tokens(text):
+    """Approximate token count without a tokenizer: one per short word, digit or punctuation mark.
+
+    Words longer than eight letters count one extra token per eight letters,
+    as subword tokenizers split them. Fast enough to run on every prompt.
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECE_RE.findall(text):
+        tokens += 1 + (len(piece) - 1) // 8
+    return tokens
+
+
+def fit_to_budget(text, token_budget):
+    """Keep whole sentences from the start of text while they fit in token_budget.
+
+    When even the first sentence is over budget it is cut at a word
+    boundary instead, so the result is never empty for non-empty text.
+    """
+    tokens = estimate_tokens(text)
+    if tokens <= token_budget:
+        return FittedText(text, tokens, False)
+
+    end = used = 0
+    for match in _SENTENCE_RE.finditer(text):
+        sentence_tokens = estimate_tokens(match.group())
+        if used + sentence_tokens > token_budget:
+            break
+        used += sentence_tokens
+        end = match.end()
+
+    if end == 0:
+        for match in _WORD_RE.finditer(text):
+            word_tokens = estimate_tokens(match.group())
+            if used + word_tokens > token_budget and end:
+                break
+            used += word_tokens
+            end = match.end()
+
+    return FittedText(text[:end].rstrip(), used, True)
+
+
+def split_paragraphs(text):
+    """Non-empty lines of extracted text; headings and clause starts always begin a new line"""
+    return [line for line in text.split('\n') if line.strip()]
+
+
+def pack_chunks(pieces, token_budget):
+    """Join consecutive pieces into chunks of at most token_budget tokens.
+
+    A piece over budget on its own is split by sentences across as many
+    chunks as it needs, so every piece of text ends up in some chunk.
+    """
+    chunks = []
+    current = []
+    used = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and used + tokens > token_budget:
+            chunks.append('\n'.join(current))
+            current, used = [], 0
+        while tokens > token_budget:
+            fitted = fit_to_budget(piece, token_budget)
+            chunks.append(fitted.text)
+            piece = piece[len(fitted.text):].lstrip()
+            tokens = estimate_tokens(piece)
+        if piece:
+            current.append(piece)
+            used += tokens
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
@@ -0,0 +1,372 @@
+import threading
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.colors import HexColor
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+
+
+# Styles are built once per font and shared, read-only, by every report.
+# Flowables themselves are created per report since ReportLab mutates them during layout.
+_styles = getSampleStyleSheet()
+
+RISK_COLORS = {
+    'HIGH': HexColor('#e74c3c'),
+    'MEDIUM': HexColor('#f39c12'),
+    'LOW': HexColor('#27ae60'),
+}
+UNKNOWN_RISK_COLOR = HexColor('#95a5a6')
+
+# Helvetica only has Latin glyphs. Japanese and Chinese use ReportLab's built-in CID fonts, which
+# need no font files; Hindi and Arabic need glyph shaping ReportLab does not do, so no PDF for them.
+PDF_FONTS = {'ja': 'HeiseiKakuGo-W5', 'zh': 'STSong-Light'}
+PDF_UNSUPPORTED_LANGUAGES = {'hi', 'ar'}
+
+
+class UnsupportedReportLanguage(ValueError):
+    """Raised for a PDF report in a language whose script the PDF fonts cannot render"""
+
+
+def supports_pdf(language):
+    return language not in PDF_UNSUPPORTED_LANGUAGES
+
+
+def _risk_badge_style(name, back_color, font):
+    return ParagraphStyle(
+        name,
+        parent=_styles['Normal'],
+        fontSize=10,
+        spaceAfter=6,
+        textColor=colors.white,
+        backColor=back_color,
+        alignment=TA_CENTER,
+        fontName=font
+    )
+
+
+def _build_styles(font, bold_font):
+    """Paragraph and table styles of a report set in the given fonts"""
+    return {
+        'title': ParagraphStyle(
+            'Title',
+            parent=_styles['Heading1'],
+            fontSize=18,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=HexColor('#2c3e50'),
+            fontName=bold_font
+        ),
+        'heading': ParagraphStyle(
+            'Heading2',
+            parent=_styles['Heading2'],
+            fontSize=14,
+            spaceAfter=12,
+            spaceBefore=20,
+            textColor=HexColor('#2c3e50'),
+            fontName=bold_font
+        ),
+        'clause_title': ParagraphStyle(
+            'ClauseTitle',
+            parent=_styles['Heading3'],
+            fontSize=12,
+            spaceAfter=6,
+            textColor=HexColor('#2c3e50'),
+            fontName=bold_font
+        ),
+        'summary': ParagraphStyle(
+            'Summary',
+            parent=_styles['Normal'],
+            fontSize=10,
+            spaceAfter=8,
+            textColor=HexColor('#2c3e50'),
+            alignment=TA_JUSTIFY,
+            fontName=font
+        ),
+        'content': ParagraphStyle(
+            'Content',
+            parent=_styles['Normal'],
+            fontSize=9,
+            spaceAfter=12,
+            textColor=HexColor('#7f8c8d'),
+            alignment=TA_JUSTIFY,
+            fontName=font
+        ),
+        # One badge style per risk level instead of recoloring a shared style for every clause
+        'badges': {
+            level: _risk_badge_style(f'Risk{level.title()}', color, font) for level, color in RISK_COLORS.items()
+        },
+        'unknown_badge': _risk_badge_style('RiskUnknown', UNKNOWN_RISK_COLOR, font),
+        'legend': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), HexColor('#2c3e50')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), bold_font),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (0, 1), RISK_COLORS['HIGH']),
+            ('BACKGROUND', (0, 2), (0, 2), RISK_COLORS['MEDIUM']),
+            ('BACKGROUND', (0, 3), (0, 3), RISK_COLORS['LOW']),
+            ('FONTNAME', (0, 1), (-1, -1), font),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey)
+        ]),
+        'font': font,
+    }
+
+
+_font_styles = {('Helvetica', 'Helvetica-Bold'): _build_styles('Helvetica', 'Helvetica-Bold')}
+_font_lock = threading.Lock()
+
+
+def report_styles(language='en'):
+    """Styles for a PDF report in the language, registering its CID font on first use"""
+    if not supports_pdf(language):
+        raise UnsupportedReportLanguage(f"PDF reports cannot render {language} text; export as HTML instead")
+    font = PDF_FONTS.get(language)
+    fonts = (font, font) if font else ('Helvetica', 'Helvetica-Bold')
+    with _font_lock:
+        if fonts not in _font_styles:
+            # CID fonts have no bold face, so <b> markup maps back to the same font
+            pdfmetrics.registerFont(UnicodeCIDFont(font))
+            pdfmetrics.registerFontFamily(font, normal=font, bold=font, italic=font, boldItalic=font)
+            _font_styles[fonts] = _build_styles(*fonts)
+        return _font_styles[fonts]
+
+
+# Every fixed string in a report, so a localized report can translate them in one batch
+REPORT_LABELS = {
+    'title': 'LEGISLENS ANALYSIS REPORT',
+    'overview': 'DOCUMENT OVERVIEW',
+    'no_summary': 'No summary available.',
+    'legend': 'RISK ASSESSMENT GUIDE',
+    'risk_level': 'RISK LEVEL',
+    'description': 'DESCRIPTION',
+    'high_risk': 'HIGH RISK',
+    'medium_risk': 'MEDIUM RISK',
+    'low_risk': 'LOW RISK',
+    'unknown_risk': 'UNKNOWN RISK',
+    'high_description': 'Unusual terms, heavily favors one party, removes standard protections',
+    'medium_description': 'Somewhat unfavorable terms or slightly unusual clauses',
+    'low_description': 'Standard, fair terms that protect both parties equally',
+    'clause_analysis': 'DETAILED CLAUSE ANALYSIS',
+    'continued': '(CONTINUED)',
+    'analysis': 'Analysis:',
+    'no_analysis': 'No analysis available.',
+    'original_text': 'Original Text:',
+    'footer': 'Generated by LegisLens - Your Legal Document Assistant',
+}
+
+# Risk labels that are known without calling the translation API
+RISK_LABEL_TRANSLATIONS = {
+    'hi': {'high_risk': 'उच्च जोखिम', 'medium_risk': 'मध्यम जोखिम', 'low_risk': 'कम जोखिम', 'unknown_risk': 'अज्ञात जोखिम'},
+    'es': {'high_risk': 'Alto Riesgo', 'medium_risk': 'Riesgo Medio', 'low_risk': 'Bajo Riesgo', 'unknown_risk': 'Riesgo Desconocido'},
+    'fr': {'high_risk': 'Risque Élevé', 'medium_risk': 'Risque Moyen', 'low_risk': 'Faible Risque', 'unknown_risk': 'Risque Inconnu'}
+}
+
+
+def report_labels(language='en'):
+    """English report labels with the built-in risk label translations for the language applied"""
+    labels = dict(REPORT_LABELS)
+    labels.update(RISK_LABEL_TRANSLATIONS.get(language, {}))
+    return labels
+
+
+def _risk_legend_data(labels):
+    return [
+        [labels['risk_level'], labels['description']],
+        [labels['high_risk'], labels['high_description']],
+        [labels['medium_risk'], labels['medium_description']],
+        [labels['low_risk'], labels['low_description']]
+    ]
+
+CLAUSE_HEADER_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+    ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+])
+
+
+def _page_footer(footer_text, font='Helvetica'):
+    """Footer with page numbers"""
+    def add_page_number(canvas, doc):
+        canvas.saveState()
+        canvas.setFont(font, 8)
+        canvas.setFillColor(HexColor('#7f8c8d'))
+        page_num = f"Page {doc.page}"
+        canvas.drawString(100 * mm, 15 * mm, page_num)
+        canvas.drawString(20 * mm, 15 * mm, footer_text)
+        canvas.restoreState()
+    return add_page_number
+
+
+def build_story(document, labels=None, styles=None):
+    """Build the list of flowables for a document's analysis report.
+
+    Reports are cached per analysis revision, so they carry no render
+    timestamp; the download's file name records when it was served.
+    """
+    labels = labels or REPORT_LABELS
+    styles = styles or report_styles()
+    story = []
+
+    # Header
+    story.append(Paragraph(escape(labels['title']), styles['title']))
+    story.append(Spacer(1, 20))
+
+    # Document Summary Section
+    story.append(Paragraph(escape(labels['overview']), styles['heading']))
+    story.append(Paragraph(escape(document.get('summary') or labels['no_summary']), styles['summary']))
+    story.append(Spacer(1, 25))
+
+    # Risk Legend
+    risk_table = Table(_risk_legend_data(labels), colWidths=[60 * mm, 100 * mm])
+    risk_table.setStyle(styles['legend'])
+    story.append(Paragraph(escape(labels['legend']), styles['heading']))
+    story.append(risk_table)
+    story.append(Spacer(1, 25))
+
+    # Clause Analysis Section
+    story.append(Paragraph(escape(labels['clause_analysis']), styles['heading']))
+    story.append(Spacer(1, 15))
+
+    for i, clause in enumerate(document.get("clauses", [])):
+        # Add page break after every 3 clauses to avoid overcrowding
+        if i > 0 and i % 3 == 0:
+            story.append(PageBreak())
+            story.append(Paragraph(escape(f"{labels['clause_analysis']} {labels['continued']}"), styles['heading']))
+            story.append(Spacer(1, 15))
+
+        # Clause header with color-coded risk badge
+        risk_level = clause.get('risk', 'unknown').upper()
+        badge_style = styles['badges'].get(risk_level, styles['unknown_badge'])
+        clause_title = clause.get('title', f"Clause {clause.get('id', '')}")
+
+        clause_table = Table(
+            [[Paragraph(f"<b>{escape(clause_title)}</b>", styles['clause_title']), Paragraph(risk_level, badge_style)]],
+            colWidths=[120 * mm, 40 * mm]
+        )
+        clause_table.setStyle(CLAUSE_HEADER_STYLE)
+        story.append(clause_table)
+
+        # Clause summary
+        summary_text = clause.get('summary') or labels['no_analysis']
+        story.append(Paragraph(f"<b>{escape(labels['analysis'])}</b> {escape(summary_text)}", styles['summary']))
+
+        # Original text (truncated for readability)
+        original_text = clause.get('content', '')
+        if len(original_text) > 3000:
+            original_text = original_text[:3000] + '...'
+
+        story.append(Paragraph(f"<b>{escape(labels['original_text'])}</b> {escape(original_text)}", styles['content']))
+        story.append(Spacer(1, 20))
+
+    return story
+
+
+def write_report(document, out, labels=None, language='en'):
+    """Render a document's analysis report as PDF into a binary file-like object"""
+    labels = labels or REPORT_LABELS
+    styles = report_styles(language)
+    doc = SimpleDocTemplate(
+        out,
+        pagesize=A4,
+        leftMargin=20 * mm,
+        rightMargin=20 * mm,
+        topMargin=20 * mm,
+        bottomMargin=20 * mm
+    )
+    add_page_number = _page_footer(labels['footer'], styles['font'])
+    doc.build(build_story(document, labels, styles), onFirstPage=add_page_number, onLaterPages=add_page_number)
+
+
+def generate_pdf_content(document_data, language='en', labels=None):
+    """Generate HTML content for PDF export"""
+    labels = labels or report_labels(language)
+    risk_texts = {
+        'high': labels['high_risk'],
+        'medium': labels['medium_risk'],
+        'low': labels['low_risk'],
+        'unknown': labels['unknown_risk']
+    }
+
+    html_content = f"""
+    <!DOCTYPE html>
+    <html lang="{escape(language)}">
+    <head>
+        <meta charset="UTF-8">
+        <title>LegisLens Analysis Report</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }}
+            .header {{ text-align: center; margin-bottom: 30px; border-bottom: 2px solid #3498db; padding-bottom: 20px; }}
+            .summary {{ background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin-bottom: 30px; }}
+            .clause {{ margin-bottom: 25px; padding: 15px; border-left: 4px solid #95a5a6; page-break-inside: avoid; }}
+            .risk-high {{ border-left-color: #ff6b6b; background-color: #fff5f5; }}
+            .risk-medium {{ border-left-color: #ffd93d; background-color: #fff9e6; }}
+            .risk-low {{ border-left-color: #6bcb77; background-color: #f0fff4; }}
+            .risk-badge {{ 
+                display: inline-block; padding: 4px 12px; border-radius: 12px; 
+                font-weight: bold; margin-left: 15px; font-size: 0.8em; 
+            }}
+            .risk-high-badge {{ background-color: #ff6b6b; color: white; }}
+            .risk-medium-badge {{ background-color: #ffd93d; color: #333; }}
+            .risk-low-badge {{ background-color: #6bcb77; color: white; }}
+            .risk-unknown-badge {{ background-color: #95a5a6; color: white; }}
+            .clause-content {{ margin-top: 10px; }}
+            .original-text {{ font-style: italic; color: #666; border-top: 1px solid #eee; padding-top: 10px; margin-top: 10px; }}
+            @media print {{
+                body {{ margin: 20px; }}
+                .clause {{ page-break-inside: avoid; }}
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>{escape(labels['title'])}</h1>
+        </div>
+
+        <div class="summary">
+            <h2>{escape(labels['overview'])}</h2>
+            <p>{escape(document_data.get('summary') or labels['no_summary'])}</p>
+        </div>
+
+        <h2>{escape(labels['clause_analysis'])}</h2>
+    """
+
+    # Add each clause to the report
+    parts = [html_content]
+    for clause in document_data.get("clauses", []):
+        risk = clause.get('risk', 'unknown')
+        if risk not in risk_texts:
+            risk = 'unknown'
+        risk_badge = f"<span class='risk-badge risk-{risk}-badge'>{escape(risk_texts[risk])}</span>"
+        clause_title = clause.get('title', f"Clause {clause.get('id', '')}")
+
+        parts.append(f"""
+        <div class="clause risk-{risk}">
+            <h3>{escape(clause_title)} {risk_badge}</h3>
+            <div class="clause-content">
+                <p><strong>{escape(labels['analysis'])}</strong> {escape(clause.get('summary') or labels['no_analysis'])}</p>
+                <div class="original-text">
+                    <p><strong>{escape(labels['original_text'])}</strong> {escape(clause.get('content', '')[:500])}...</p>
+                </div>
+            </div>
+        </div>
+        """)
+
+    parts.append("""
+    </body>
+    </html>
+    """)
+
+    return "".join(parts)
+
+
+def report_filename(extension='pdf'):
+    return f"LegisLens_Analysis_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
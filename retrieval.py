@@ -0,0 +1,91 @@
+import math
+import re
+from collections import Counter
+
+from prompts import estimate_tokens, fit_to_budget
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Common words that carry no signal for matching questions to clauses
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in is it its my of on or
+shall that the their there this to under was what when where which who will with would you your
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords"""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def build_index(clauses):
+    """Build a BM25 index over clause titles and contents.
+
+    The index is plain JSON-serializable data so it can be stored with the
+    document in any document store backend.
+    """
+    postings = {}
+    lengths = []
+    for position, clause in enumerate(clauses):
+        counts = Counter(tokenize(f"{clause.get('title', '')} {clause['content']}"))
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append([position, tf])
+
+    return {
+        "postings": postings,
+        "lengths": lengths,
+        "average_length": sum(lengths) / len(lengths) if lengths else 0.0
+    }
+
+
+def search(index, query, k1=1.5, b=0.75):
+    """Score clauses against the query with BM25; returns [(position, score)] best first"""
+    lengths = index["lengths"]
+    if not lengths:
+        return []
+    count = len(lengths)
+    average_length = index["average_length"] or 1.0
+
+    scores = {}
+    for term in set(tokenize(query)):
+        postings = index["postings"].get(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+        for position, tf in postings:
+            norm = k1 * (1 - b + b * lengths[position] / average_length)
+            scores[position] = scores.get(position, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def select_context(document, question, token_budget, top_k):
+    """Pick the clauses most relevant to the question that fit in the token budget.
+
+    Selected clauses are returned in document order. Falls back to the start
+    of the full text when the document has no index or nothing matches.
+    """
+    clauses = document.get("clauses") or []
+    index = document.get("retrieval_index")
+    ranked = search(index, question) if index and clauses else []
+
+    if not ranked:
+        return fit_to_budget(document["full_text"], token_budget).text
+
+    selected = []
+    used = 0
+    for position, _ in ranked[:top_k]:
+        clause = clauses[position]
+        tokens = estimate_tokens(clause["content"])
+        if used + tokens > token_budget:
+            if not selected:
+                # The best match alone is over budget; keep as much of it as fits
+                selected.append((position, fit_to_budget(clause["content"], token_budget).text))
+            continue
+        selected.append((position, clause["content"]))
+        used += tokens
+
+    selected.sort()
+    return "\n\n".join(f"[{clauses[position].get('title', 'Clause')}]\n{content}" for position, content in selected)
@@ -0,0 +1,141 @@
+from difflib import SequenceMatcher
+
+from cache import content_key
+
+
+# Order used to report whether a revised clause became more or less risky
+RISK_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+
+def clause_fingerprint(clause):
+    """Content hash of a clause, ignoring whitespace so re-flowed text still matches"""
+    return content_key(clause["content"])
+
+
+def has_analysis(clause):
+    """True if a stored clause carries a usable summary and risk"""
+    summary = clause.get("summary") or ""
+    return bool(summary) and clause.get("risk") != "unknown" and not summary.startswith("Analysis failed")
+
+
+def clause_similarity(a, b):
+    """Word-level similarity ratio (0-1) of two clause texts"""
+    matcher = SequenceMatcher(None, a.split(), b.split(), autojunk=False)
+    if matcher.real_quick_ratio() == 0 or matcher.quick_ratio() == 0:
+        return 0.0
+    return matcher.ratio()
+
+
+def match_clauses(previous, current, min_similarity=0.6):
+    """Pair every current clause with the previous clause it revises.
+
+    Identical clauses (by content hash) are paired first, then the remaining
+    clauses are paired greedily by word-level similarity, best pairs first.
+    Returns ({current_id: (previous_clause, similarity, unchanged)}, removed_clauses),
+    where unchanged is True only when the normalized texts are identical
+    (the rounded similarity of an edited clause can still reach 1.0) and
+    clauses without a predecessor are absent from the mapping.
+    """
+    by_fingerprint = {}
+    for clause in previous:
+        by_fingerprint.setdefault(clause_fingerprint(clause), []).append(clause)
+
+    matches = {}
+    unmatched = []
+    for clause in current:
+        candidates = by_fingerprint.get(clause_fingerprint(clause))
+        if candidates:
+            matches[clause["id"]] = (candidates.pop(0), 1.0, True)
+        else:
+            unmatched.append(clause)
+
+    remaining = [clause for candidates in by_fingerprint.values() for clause in candidates]
+    scored = []
+    for clause in unmatched:
+        words = clause["content"].split()
+        for old in remaining:
+            # The length ratio bounds the similarity, so hopeless pairs are skipped cheaply
+            old_words = old["content"].split()
+            shorter, longer = sorted((len(words), len(old_words)))
+            if longer and 2.0 * shorter / (shorter + longer) < min_similarity:
+                continue
+            score = clause_similarity(old["content"], clause["content"])
+            if score >= min_similarity:
+                scored.append((score, clause, old))
+
+    used = set()
+    for score, clause, old in sorted(scored, key=lambda item: -item[0]):
+        if clause["id"] in matches or old["id"] in used:
+            continue
+        # Duplicated clauses left over from the hash pass can pair with identical text here
+        unchanged = clause_fingerprint(clause) == clause_fingerprint(old)
+        matches[clause["id"]] = (old, 1.0 if unchanged else min(round(score, 4), 0.9999), unchanged)
+        used.add(old["id"])
+
+    removed = [clause for clause in remaining if clause["id"] not in used]
+    return matches, removed
+
+
+def plan_revision(previous, current, min_similarity=0.6):
+    """Reuse the previous analysis of unchanged clauses and list the clauses that need a model call.
+
+    Only clauses whose text is unchanged inherit the previous summary and
+    risk: a single added "not" can reverse a clause's meaning, so a fuzzy
+    match only identifies which clause was edited. Current clauses are
+    updated in place. Returns (pending_clauses, matches, removed_clauses).
+    """
+    matches, removed = match_clauses(previous, current, min_similarity)
+
+    pending = []
+    for clause in current:
+        old, _similarity, unchanged = matches.get(clause["id"], (None, 0.0, False))
+        if unchanged and has_analysis(old):
+            clause["summary"], clause["risk"] = old["summary"], old["risk"]
+        else:
+            pending.append(clause)
+    return pending, matches, removed
+
+
+def risk_change(old_risk, new_risk):
+    """'increased', 'decreased' or 'unchanged'; None when either risk is unknown"""
+    if old_risk not in RISK_ORDER or new_risk not in RISK_ORDER:
+        return None
+    delta = RISK_ORDER[new_risk] - RISK_ORDER[old_risk]
+    return "increased" if delta > 0 else "decreased" if delta < 0 else "unchanged"
+
+
+def revision_report(previous_document_id, current, matches, removed, analyzed_count):
+    """Describe what changed between two versions once the pending clauses have been analyzed"""
+    changes = []
+    unchanged_count = 0
+    for clause in current:
+        old, similarity, unchanged = matches.get(clause["id"], (None, 0.0, False))
+        if old is None:
+            changes.append({"id": clause["id"], "title": clause["title"], "status": "added", "risk": clause["risk"]})
+        elif unchanged:
+            unchanged_count += 1
+        else:
+            changes.append({
+                "id": clause["id"],
+                "previous_id": old["id"],
+                "title": clause["title"],
+                "status": "modified",
+                "similarity": similarity,
+                "previous_risk": old.get("risk", "unknown"),
+                "risk": clause["risk"],
+                "risk_change": risk_change(old.get("risk"), clause["risk"])
+            })
+    for old in removed:
+        changes.append({"previous_id": old["id"], "title": old["title"], "status": "removed",
+                        "previous_risk": old.get("risk", "unknown")})
+
+    return {
+        "previous_document_id": previous_document_id,
+        "unchanged": unchanged_count,
+        "modified": sum(1 for change in changes if change["status"] == "modified"),
+        "added": sum(1 for change in changes if change["status"] == "added"),
+        "removed": len(removed),
+        "reanalyzed": analyzed_count,
+        "reused": len(current) - analyzed_count,
+        "changes": changes
+    }
@@ -0,0 +1,201 @@
+import re
+from collections import namedtuple
+
+from extraction import page_for_offset
+
+
+# A clause's title and the offsets of its content in the original text
+ClauseSpan = namedtuple('ClauseSpan', ['title', 'start', 'end'])
+
+# Heading styles in order of preference; the first style that yields clauses wins
+HEADING_STYLES = ('article', 'section', 'clause', 'paragraph', 'numbered')
+
+# Every heading style in one alternation, so the text is scanned once. Headings start
+# after a newline and run to the end of their line; the trailing newline is left
+# unconsumed so a heading of another style may start right after it.
+_HEADING_RE = re.compile(
+    r'\n\s*(?:'
+    r'(?P<article>ARTICLE)'
+    r'|(?P<section>SECTION)'
+    r'|(?P<clause>CLAUSE)'
+    r'|(?P<paragraph>§\s*[\d\.]+)'
+    r'|(?P<numbered>[\dIVX]+\.\s+[A-Z])'
+    r')[^\n]*(?=\n)'
+)
+_BLANK_LINE_RE = re.compile(r'\n\s*\n')
+
+# The three heading prefixes that used to be stripped one re.sub at a time, as optional
+# groups in the same order: a keyword or numeral, a "1 -" marker, then a "(a)" marker
+_TITLE_PREFIX_RE = re.compile(
+    r'^(?:(?:ARTICLE|SECTION|CLAUSE|§|[\dIVX]+\.)\s*)?'
+    r'(?:\s*[\dIVX]+\s*[-–]\s*)?'
+    r'(?:\s*\([a-zA-Z]\)\s*)?',
+    re.IGNORECASE
+)
+
+MIN_CLAUSE_CHARS = 50
+MIN_SECTION_CHARS = 100
+
+
+def extract_title_from_header(header):
+    """Extract a clean title from a section header"""
+    # Remove excessive whitespace
+    header = ' '.join(header.split())
+
+    # Remove common prefixes and clean up
+    header = header[_TITLE_PREFIX_RE.match(header).end():]
+
+    # Limit length and ensure it's not empty
+    if not header or header.isspace():
+        return "Untitled Clause"
+
+    if len(header) > 60:
+        return header[:57] + '...'
+
+    return header
+
+
+def _strip_span(text, start, end):
+    """Offsets equivalent to text[start:end].strip(), without copying"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def find_headings(text):
+    """Scan the text once and return {style: [(start, header_start, end), ...]}
+
+    `start` is the newline that opens the heading, `header_start` the first
+    non-space character and `end` the newline that closes the heading line.
+    Within a style, headings never share a newline, matching what a separate
+    re.split per style would find.
+    """
+    headings = {style: [] for style in HEADING_STYLES}
+    last_end = {style: -2 for style in HEADING_STYLES}
+
+    for match in _HEADING_RE.finditer(text):
+        style = match.lastgroup
+        start = match.start()
+        header_start = match.start(style)
+
+        # The previous heading of this style consumed its closing newline, so this one
+        # needs another newline of its own before the heading text
+        if start <= last_end[style]:
+            start = text.find('\n', last_end[style] + 1, header_start)
+            if start == -1:
+                continue
+
+        headings[style].append((start, header_start, match.end()))
+        last_end[style] = match.end()
+
+    return headings
+
+
+def _heading_spans(text, matches):
+    """Turn the headings of one style into clause spans covering the text after each heading"""
+    spans = []
+    for i, (_, header_start, header_end) in enumerate(matches):
+        content_end = matches[i + 1][0] if i + 1 < len(matches) else len(text)
+        start, end = _strip_span(text, header_end + 1, content_end)
+        if end - start > MIN_CLAUSE_CHARS:
+            title = extract_title_from_header(text[header_start:header_end])
+            spans.append(ClauseSpan(title, start, end))
+    return spans
+
+
+def _paragraph_spans(text):
+    """Fallback: split on blank lines and treat short title-like first lines as headings"""
+    spans = []
+    ids = []
+    boundaries = [(m.start(), m.end()) for m in _BLANK_LINE_RE.finditer(text)]
+    piece_starts = [0] + [end for _, end in boundaries]
+    piece_ends = [start for start, _ in boundaries] + [len(text)]
+
+    for i, (piece_start, piece_end) in enumerate(zip(piece_starts, piece_ends)):
+        start, end = _strip_span(text, piece_start, piece_end)
+        if end - start <= MIN_SECTION_CHARS:
+            continue
+
+        # Heuristic: Heading-like lines are usually short and often in title case or all caps
+        newline = text.find('\n', start, end)
+        first_line = text[start:newline if newline != -1 else end].strip()
+        is_heading = (len(first_line) < 80 and
+                      (first_line.isupper() or
+                       (len(first_line.split()) < 8 and first_line.istitle())))
+
+        if is_heading and newline != -1:
+            spans.append(ClauseSpan(first_line, newline + 1, end))
+        else:
+            spans.append(ClauseSpan(f"Clause {i + 1}", start, end))
+        ids.append(i)
+
+    return spans, ids
+
+
+def _styled_spans(text, styled_headings):
+    """Clause spans from the shallowest heading outline level that yields at least two clauses"""
+    for level in sorted({level for _, _, level in styled_headings}):
+        # Same (start, header_start, end) shape as find_headings; start is the preceding newline
+        matches = [(max(start - 1, 0), start, end) for start, end, heading_level in styled_headings
+                   if heading_level == level]
+        spans = _heading_spans(text, matches)
+        if len(spans) >= 2:
+            return spans
+    return []
+
+
+def segment(text, styled_headings=None):
+    """Split legal text into clause spans in a single scan for headings.
+
+    Headings styled as such in a Word document, given as (start, end, level)
+    offsets, are used first. Otherwise each heading style is scored by the
+    number of substantial clauses it produces, and the first style in
+    HEADING_STYLES with a non-zero score is used. Returns (spans, ids); when
+    fewer than two clauses are found the text is split on blank lines instead.
+    """
+    if styled_headings:
+        spans = _styled_spans(text, styled_headings)
+        if spans:
+            return spans, list(range(len(spans)))
+
+    headings = find_headings(text)
+
+    spans = []
+    for style in HEADING_STYLES:
+        if headings[style]:
+            spans = _heading_spans(text, headings[style])
+            if spans:
+                break
+
+    if len(spans) >= 2:
+        return spans, list(range(len(spans)))
+
+    return _paragraph_spans(text)
+
+
+def split_into_clauses(text, page_offsets=None, styled_headings=None):
+    """Split legal text into clauses with meaningful titles and their offsets in the text"""
+    spans, ids = segment(text, styled_headings)
+
+    clauses = []
+    for clause_id, span in zip(ids, spans):
+        content = text[span.start:span.end]
+        preview = content[:150].replace('\n', ' ') + '...' if len(content) > 150 else content
+
+        clause = {
+            "id": clause_id,
+            "title": span.title,
+            "content": content,
+            "preview": preview,
+            "summary": "",
+            "risk": "unknown",
+            "start": span.start,
+            "end": span.end
+        }
+        if page_offsets:
+            clause["page"] = page_for_offset(page_offsets, span.start)
+        clauses.append(clause)
+
+    return clauses
@@ -0,0 +1,16 @@
+import os
+
+
+# Development server: python serve.py (python app.py hands over to this file).
+# The app is only imported under the guard, since extraction and batch workers are
+# spawned processes that re-import the main script.
+if __name__ == '__main__':
+    from app import app, job_worker
+    from config import Config
+
+    port = int(os.environ.get('PORT', 5000))
+    debug = os.environ.get('FLASK_ENV') != 'production'
+    # With the debug reloader only the child process serves requests and runs jobs
+    if Config.JOB_WORKER_MODE == 'local' and (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        job_worker.start()
+    app.run(host='0.0.0.0', port=port, debug=debug)
@@ -487,39 +487,38 @@ document.addEventListener('DOMContentLoaded', function() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
-            }
+            },
+            body: JSON.stringify({
+                document_id: currentDocument ? currentDocument.document_id : null,
+                language: currentLanguage
+            })
         });
 
-        const data = await response.json();
-
-        if (data.pdf_data) {
-            // Convert base64 to blob
-            const byteCharacters = atob(data.pdf_data);
-            const byteNumbers = new Array(byteCharacters.length);
-            for (let i = 0; i < byteCharacters.length; i++) {
-                byteNumbers[i] = byteCharacters.charCodeAt(i);
-            }
-            const byteArray = new Uint8Array(byteNumbers);
-            const blob = new Blob([byteArray], { type: 'application/pdf' });
-
-            // Create download link
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.style.display = 'none';
-            a.href = url;
-            a.download = data.filename || 'legislens_analysis_report.pdf';
-            document.body.appendChild(a);
-            a.click();
-
-            // Clean up
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-
-            // Show success message
-            alert('PDF report downloaded successfully!');
-        } else {
+        if (!response.ok) {
             throw new Error('PDF generation failed');
         }
+
+        // The server streams the PDF itself; take the filename from Content-Disposition
+        const blob = await response.blob();
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const filenameMatch = disposition.match(/filename="?([^";]+)"?/);
+        const filename = filenameMatch ? filenameMatch[1] : 'legislens_analysis_report.pdf';
+
+        // Create download link
+        const url = window.URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.style.display = 'none';
+        a.href = url;
+        a.download = filename;
+        document.body.appendChild(a);
+        a.click();
+
+        // Clean up
+        window.URL.revokeObjectURL(url);
+        document.body.removeChild(a);
+
+        // Show success message
+        alert('PDF report downloaded successfully!');
     } catch (error) {
         console.error('Export error:', error);
         alert('Failed to generate PDF report. Please try again.');
@@ -660,19 +659,23 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Translate document content
     async function translateDocumentContent(targetLanguage) {
-        // Translate document summary
-        const translatedSummary = await translateText(currentDocument.summary, targetLanguage);
-        displayDocumentSummary(translatedSummary);
-
-        // Translate clauses
-        const translatedClauses = await Promise.all(
-            currentDocument.clauses.map(async clause => ({
-                ...clause,
-                title: await translateText(clause.title, targetLanguage),
-                summary: await translateText(clause.summary, targetLanguage),
-                preview: await translateText(clause.preview || generateContentPreview(clause.content), targetLanguage)
-            }))
-        );
+        // Send the summary and every clause's title, summary and preview in one bulk request
+        const texts = { summary: currentDocument.summary };
+        currentDocument.clauses.forEach(clause => {
+            texts[`title_${clause.id}`] = clause.title;
+            texts[`summary_${clause.id}`] = clause.summary;
+            texts[`preview_${clause.id}`] = clause.preview || generateContentPreview(clause.content);
+        });
+        const translated = await translateTexts(texts, targetLanguage);
+
+        displayDocumentSummary(translated.summary);
+
+        const translatedClauses = currentDocument.clauses.map(clause => ({
+            ...clause,
+            title: translated[`title_${clause.id}`],
+            summary: translated[`summary_${clause.id}`],
+            preview: translated[`preview_${clause.id}`]
+        }));
 
         displayClauseList(translatedClauses);
 
@@ -687,6 +690,27 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Bulk translation of a {key: text} map; untranslated keys keep their original text
+    async function translateTexts(texts, targetLanguage) {
+        if (targetLanguage === 'en') return texts;
+
+        try {
+            const response = await fetch('/translate_bulk', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ texts, language: targetLanguage })
+            });
+
+            const data = await response.json();
+            return { ...texts, ...(data.translated_texts || {}) };
+        } catch (error) {
+            console.error('Translation error:', error);
+            return texts;
+        }
+    }
+
     // Single text translation
     async function translateText(text, targetLanguage) {
         if (!text || targetLanguage === 'en') return text;
@@ -738,14 +762,59 @@ document.addEventListener('DOMContentLoaded', function() {
         formData.append('file', file);
 
         try {
-            const response = await fetch('/upload', {
+            const response = await fetch('/upload_stream', {
                 method: 'POST',
                 body: formData
             });
-            const data = await response.json();
 
-            clearInterval(interval);
-            progressBar.style.width = '100%';
+            if (!response.ok || !response.body) {
+                const data = await response.json();
+                throw new Error(data.error || 'Upload failed');
+            }
+
+            const data = { summary: '', clauses: [] };
+            currentDocument = data;
+
+            // Render each part of the analysis as soon as the server sends it
+            await readEventStream(response, (event, payload) => {
+                if (event === 'clauses') {
+                    data.document_id = payload.document_id;
+                    clearInterval(interval);
+                    progressBar.style.width = '100%';
+                    uploadProgress.style.display = 'none';
+                    resultsSection.style.display = 'block';
+                    historySection.style.display = 'none';
+
+                    data.clauses = payload.clauses;
+                    if (currentLanguage === 'en') {
+                        displayClauseList(data.clauses);
+                    }
+                } else if (event === 'summary') {
+                    data.summary = payload.summary;
+                    if (currentLanguage === 'en') {
+                        displayDocumentSummary(data.summary);
+                    }
+                } else if (event === 'clause') {
+                    const clause = data.clauses.find(c => c.id === payload.id);
+                    if (clause) {
+                        clause.summary = payload.summary;
+                        clause.risk = payload.risk;
+                        if (currentLanguage === 'en') {
+                            updateClauseElement(clause);
+                        }
+                    }
+                } else if (event === 'error') {
+                    throw new Error(payload.error);
+                }
+            });
+
+            exportButton.style.display = 'block';
+            if (currentLanguage === 'en') {
+                displayClauseList(data.clauses);
+            } else {
+                // If not English, translate the new content
+                translateDocumentContent(currentLanguage);
+            }
 
             // Save to Firestore
             const documentData = {
@@ -755,32 +824,63 @@ document.addEventListener('DOMContentLoaded', function() {
                 fileType: file.type
             };
             const docId = await saveDocumentToFirestore(documentData);
+            currentDocument = { ...data, id: docId };
 
-            setTimeout(() => {
-                uploadProgress.style.display = 'none';
-                resultsSection.style.display = 'block';
-                historySection.style.display = 'none';
-                exportButton.style.display = 'block';
-
-                currentDocument = { ...data, id: docId };
-                if (currentLanguage === 'en') {
-                    displayDocumentSummary(data.summary);
-                    displayClauseList(data.clauses);
-                } else {
-                    // If not English, translate the new content
-                    translateDocumentContent(currentLanguage);
-                }
-                
-                // Reload history to show new document
-                loadUserHistory();
-            }, 500);
+            // Reload history to show new document
+            loadUserHistory();
         } catch (error) {
             console.error('Error:', error);
             alert('Error uploading file');
+            clearInterval(interval);
             uploadProgress.style.display = 'none';
         }
     }
 
+    // Read a text/event-stream response and call onEvent(event, data) for each event
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let dataLines = [];
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        event = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        dataLines.push(line.slice(5).trim());
+                    }
+                });
+                if (dataLines.length) {
+                    onEvent(event, JSON.parse(dataLines.join('\n')));
+                }
+            }
+        }
+    }
+
+    // Refresh a single clause in the list once its analysis arrives
+    function updateClauseElement(clause) {
+        const existing = clauseList.querySelector(`.clause-item[data-id="${clause.id}"]`);
+        if (!existing) return;
+
+        const updated = createClauseElement(clause);
+        if (existing.classList.contains('selected')) {
+            updated.classList.add('selected');
+            displayClauseDetails(clause.id);
+        }
+        clauseList.replaceChild(updated, existing);
+    }
+
     // Display document summary
     function displayDocumentSummary(summary) {
         documentSummary.textContent = summary;
@@ -886,6 +986,12 @@ document.addEventListener('DOMContentLoaded', function() {
         noClauseSelected.style.display = 'none';
         clauseDetail.style.display = 'block';
 
+        // Lazily analyzed uploads leave clauses pending until they are opened
+        if ((!clause.summary || clause.risk === 'unknown') && !clause.analysisRequested && currentDocument.document_id) {
+            clause.analysisRequested = true;
+            analyzeClauseOnDemand(clause);
+        }
+
         // Translate clause content if not in English
         let displayTitle = clause.title;
         let displaySummary = clause.summary;
@@ -914,6 +1020,20 @@ document.addEventListener('DOMContentLoaded', function() {
         riskBadge.className = `risk-badge ${RISK_CONFIG[riskLevel].class}`;
     }
 
+    // Fetch the analysis of a clause the server has not analyzed yet
+    async function analyzeClauseOnDemand(clause) {
+        try {
+            const response = await fetch(`/analyze_clause/${clause.id}?document_id=${encodeURIComponent(currentDocument.document_id)}`);
+            if (!response.ok) return;
+            const analyzed = await response.json();
+            clause.summary = analyzed.summary;
+            clause.risk = analyzed.risk;
+            updateClauseElement(clause);
+        } catch (error) {
+            console.error('Error analyzing clause:', error);
+        }
+    }
+
     // Handle asking questions
     async function handleQuestion() {
         const question = questionInput.value.trim();
@@ -934,29 +1054,49 @@ document.addEventListener('DOMContentLoaded', function() {
         addMessage(question, 'user');
         questionInput.value = '';
 
+        // The answer is streamed into this message as it is generated
+        const botMessage = addMessage('', 'bot');
+        let answer = '';
+
         try {
             // Send question to backend (in English)
-            const response = await fetch('/ask', {
+            const response = await fetch('/ask_stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
                 },
                 body: JSON.stringify({
                     question: processedQuestion,
-                    language: currentLanguage  // Send current language for answer translation
+                    language: currentLanguage,  // Send current language for answer translation
+                    document_id: currentDocument ? currentDocument.document_id : null
                 })
             });
-            const data = await response.json();
-            
-            addMessage(data.answer, 'bot');
-            
+
+            if (!response.ok) {
+                const data = await response.json();
+                throw new Error(data.error || 'Question failed');
+            }
+
+            await readEventStream(response, (event, data) => {
+                if (event === 'token') {
+                    answer += data.text;
+                    botMessage.textContent = answer;
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                } else if (event === 'done') {
+                    answer = data.answer;
+                    botMessage.textContent = answer;
+                } else if (event === 'error') {
+                    throw new Error(data.error);
+                }
+            });
+
             // Save chat message to Firestore
             if (currentDocument && currentDocument.id) {
-                await saveChatMessage(currentDocument.id, question, data.answer);
+                await saveChatMessage(currentDocument.id, question, answer);
             }
         } catch (error) {
             console.error('Error:', error);
-            addMessage('Sorry, I encountered an error processing your question.', 'bot');
+            botMessage.textContent = 'Sorry, I encountered an error processing your question.';
         }
     }
 
@@ -967,6 +1107,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
         chatMessages.appendChild(messageDiv);
         chatMessages.scrollTop = chatMessages.scrollHeight;
+        return messageDiv;
     }
 
     // Initialize the application
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import analysis
+from analysis import analyze_document
+
+
+class FakeModel:
+    """Stands in for the Gemini calls: fixed latency per call, tracking how many run at once"""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _call(self, latency):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(latency)
+        with self._lock:
+            self.active -= 1
+
+    def summarize(self, text):
+        self._call(self.latency)
+        return "document summary"
+
+    def analyze(self, clause_text):
+        # Later clauses finish first, so completion order differs from document order
+        number = int(clause_text.split()[1])
+        self._call(self.latency * (2 if number < 4 else 1))
+        return f"summary of {clause_text}", "low"
+
+
+def test_clauses_are_analyzed_concurrently_within_the_slot_limit(monkeypatch):
+    monkeypatch.setattr(analysis, "_process_slots", threading.BoundedSemaphore(4))
+    model = FakeModel()
+    clauses = [{"id": i, "content": f"Clause {i} text"} for i in range(16)]
+    # Every call one after another: the summary, twelve clauses and four slower ones
+    serial = model.latency * (len(clauses) + 1 + 4)
+
+    start = time.perf_counter()
+    summary, analyzed = analyze_document("document text", clauses, model.summarize, model.analyze, max_workers=8)
+    elapsed = time.perf_counter() - start
+
+    assert model.calls == len(clauses) + 1
+    assert 1 < model.peak <= 4
+    assert elapsed < serial / 2
+    assert summary == "document summary"
+    assert [clause["id"] for clause in analyzed] == list(range(16))
+    assert [clause["summary"] for clause in analyzed] == [f"summary of Clause {i} text" for i in range(16)]
+
+
+def test_batches_share_the_slot_limit(monkeypatch):
+    monkeypatch.setattr(analysis, "_process_slots", threading.BoundedSemaphore(2))
+    model = FakeModel()
+    clauses = [{"id": i, "content": f"Clause {i} text"} for i in range(6)]
+
+    def analyze_batch(texts):
+        model._call(model.latency)
+        return [(f"summary of {text}", "medium") for text in texts]
+
+    monkeypatch.setattr(analysis.Config, "CLAUSE_BATCH_MAX_CLAUSES", 2)
+    summary, analyzed = analyze_document("document text", clauses, model.summarize, model.analyze,
+                                         max_workers=8, analyze_batch=analyze_batch)
+
+    assert model.calls == 4
+    assert model.peak <= 2
+    assert [clause["summary"] for clause in analyzed] == [f"summary of Clause {i} text" for i in range(6)]
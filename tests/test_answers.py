@@ -0,0 +1,63 @@
+import pytest
+
+from answers import AnswerCache
+from cache import ResultCache
+
+
+# Pairs that differ in a decisive word yet score about 0.8 or more on word/bigram similarity
+NEAR_MISSES = [
+    ("Can the tenant terminate the residential lease early after 12 months by giving written notice "
+     "to the landlord under the renewal terms?",
+     "Can the tenant terminate the residential lease early after 6 months by giving written notice "
+     "to the landlord under the renewal terms?"),
+    ("Can the tenant terminate the furnished residential lease early and without penalty by giving "
+     "written notice to the landlord under the standard renewal terms and conditions?",
+     "Can the landlord terminate the furnished residential lease early and without penalty by giving "
+     "written notice to the tenant under the standard renewal terms and conditions?"),
+    ("Is the tenant allowed to sublet the furnished apartment to close family members during the "
+     "initial lease term?",
+     "Is the tenant not allowed to sublet the furnished apartment to close family members during the "
+     "initial lease term?"),
+    ("What happens if Acme fails to deliver the licensed software, documentation and training materials before "
+     "the agreed delivery date in the schedule?",
+     "What happens if Globex fails to deliver the licensed software, documentation and training materials before "
+     "the agreed delivery date in the schedule?"),
+    ("Does the indemnity in section 7 cover reasonable legal fees incurred by the supplier when defending "
+     "third party infringement claims?",
+     "Does the indemnity in section 9 cover reasonable legal fees incurred by the supplier when defending "
+     "third party infringement claims?"),
+]
+
+
+def make_cache(tmp_path, **options):
+    return AnswerCache(ResultCache(str(tmp_path / "answers.sqlite3"), table="answers"), "test", **options)
+
+
+@pytest.mark.parametrize("fuzzy", [False, True])
+@pytest.mark.parametrize("answered, asked", NEAR_MISSES)
+def test_near_miss_questions_do_not_share_answers(tmp_path, fuzzy, answered, asked):
+    cache = make_cache(tmp_path, fuzzy=fuzzy)
+    cache.set("doc", answered, "en", "cached answer")
+
+    assert cache.get("doc", answered, "en") == "cached answer"
+    assert cache.get("doc", asked, "en") is None
+
+
+def test_rephrased_questions_share_answers(tmp_path):
+    cache = make_cache(tmp_path, fuzzy=True)
+    cache.set("doc", "What is the notice period for terminating this agreement without cause?", "en", "30 days")
+
+    assert cache.get("doc", "What's the notice period for terminating the agreement without cause?", "en") == "30 days"
+    cache.set("doc", "What notice must the landlord give before ending this residential lease agreement "
+                     "without any cause?", "en", "60 days")
+    assert cache.get("doc", "What notice must the landlord give before ending this residential lease agreement "
+                            "without any cause at all?", "en") == "60 days"
+    assert cache.stats()["similar_hits"] == 1
+
+
+def test_fuzzy_matching_is_off_by_default(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("doc", "What is the notice period for terminating this agreement without cause?", "en", "30 days")
+
+    assert cache.get("doc", "What is the notice period for terminating this agreement without cause, exactly?",
+                     "en") is None
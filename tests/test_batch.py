@@ -0,0 +1,65 @@
+import os
+import zipfile
+
+import pytest
+
+from batch import collect_sources, run_batch_input
+
+
+def escaping_member(outside, kind):
+    if kind == "absolute":
+        return str(outside / "secret.pdf")
+    return "../outside/secret.pdf"
+
+
+@pytest.mark.parametrize("kind", ["absolute", "parent"])
+def test_zip_members_cannot_escape_workdir(tmp_path, kind):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "secret.pdf").write_bytes(b"%PDF-1.4 secret")
+    archive_path = tmp_path / "batch.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("contracts/lease.pdf", b"%PDF-1.4 lease")
+        archive.writestr(escaping_member(outside, kind), b"%PDF-1.4 from zip")
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+
+    sources, rejected = collect_sources(str(archive_path), str(workdir))
+
+    root = os.path.realpath(workdir)
+    for source in sources:
+        assert os.path.commonpath([root, os.path.realpath(source.path)]) == root
+        assert not source.name.startswith(("/", ".."))
+    assert (outside / "secret.pdf").read_bytes() == b"%PDF-1.4 secret"
+    assert "contracts/lease.pdf" in [source.name for source in sources]
+    # zipfile itself strips a leading "/" and "..", so such members land inside workdir
+    assert len(sources) + rejected == 2
+
+
+def test_directory_symlinks_outside_input_are_rejected(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "secret.pdf").write_bytes(b"%PDF-1.4 secret")
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    (input_dir / "lease.pdf").write_bytes(b"%PDF-1.4 lease")
+    os.symlink(outside / "secret.pdf", input_dir / "linked.pdf")
+
+    sources, rejected = collect_sources(str(input_dir), str(tmp_path / "work"))
+
+    assert [source.name for source in sources] == ["lease.pdf"]
+    assert rejected == 1
+
+
+def test_rejected_files_are_reported_in_batch_stats(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "secret.pdf").write_bytes(b"%PDF-1.4 secret")
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    os.symlink(outside / "secret.pdf", input_dir / "linked.pdf")
+
+    stats = run_batch_input(str(input_dir), str(tmp_path / "results.jsonl"), None, None)
+
+    assert stats.as_dict()["rejected"] == 1
+    assert stats.total == 0
@@ -0,0 +1,64 @@
+import threading
+
+from document_store import MemoryDocumentStore, SQLiteDocumentStore
+
+
+def make_document(clauses):
+    return {"summary": "", "clauses": [{"id": i, "summary": "", "risk": "unknown"} for i in range(clauses)]}
+
+
+def record_results(store, document_id, clause_ids):
+    for clause_id in clause_ids:
+        def apply(document):
+            document["clauses"][clause_id]["summary"] = f"summary {clause_id}"
+        store.update(document_id, apply)
+
+
+def test_concurrent_updates_from_separate_connections_are_not_lost(tmp_path):
+    path = str(tmp_path / "documents.sqlite3")
+    # Separate store objects share only the file, like gunicorn workers do
+    stores = [SQLiteDocumentStore(path) for _ in range(4)]
+    stores[0].save("doc", make_document(80))
+
+    threads = [threading.Thread(target=record_results, args=(store, "doc", range(i, 80, 4)))
+               for i, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    document = stores[0].get("doc")
+    assert [clause["summary"] for clause in document["clauses"]] == [f"summary {i}" for i in range(80)]
+
+
+def test_update_can_skip_the_write(tmp_path):
+    for store in (MemoryDocumentStore(), SQLiteDocumentStore(str(tmp_path / "documents.sqlite3"))):
+        store.save("doc", make_document(1))
+
+        def apply(document):
+            document["summary"] = "changed"
+            return False
+
+        assert store.update("doc", apply)["summary"] == "changed"
+        assert store.get("doc")["summary"] == ""
+        assert store.update("missing", apply) is None
+
+
+def test_sqlite_store_evicts_least_recently_used_documents_over_the_caps(tmp_path):
+    store = SQLiteDocumentStore(str(tmp_path / "documents.sqlite3"), max_documents=5, max_bytes=10 ** 9,
+                                touch_interval=0)
+    for i in range(5):
+        store.save(f"doc{i}", make_document(1))
+    store.get("doc0")
+    store.save("doc5", make_document(1))
+
+    assert store.get("doc0") is not None
+    assert store.get("doc1") is None
+    assert all(store.get(f"doc{i}") is not None for i in range(2, 6))
+
+    small = SQLiteDocumentStore(str(tmp_path / "small.sqlite3"), max_documents=100, max_bytes=4000)
+    for i in range(20):
+        small.save(f"doc{i}", make_document(10))
+    kept = [i for i in range(20) if small.get(f"doc{i}") is not None]
+    assert kept == list(range(20 - len(kept), 20))
+    assert 0 < len(kept) < 20
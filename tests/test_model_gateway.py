@@ -0,0 +1,152 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import model_gateway
+from model_gateway import AdaptiveConcurrency, ModelGateway, ModelGatewayError, TokenBucket
+
+
+class HttpError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FakeClient:
+    """Fails with the queued statuses first, then answers; optionally throttles above a concurrency"""
+
+    def __init__(self, statuses=(), max_concurrent=None, latency=0.0):
+        self.statuses = list(statuses)
+        self.max_concurrent = max_concurrent
+        self.latency = latency
+        self.attempts = 0
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, model_name, prompt, timeout):
+        with self._lock:
+            self.attempts += 1
+            status = self.statuses.pop(0) if self.statuses else None
+            self.active += 1
+            overloaded = self.max_concurrent is not None and self.active > self.max_concurrent
+        try:
+            time.sleep(self.latency)
+            if status is not None:
+                raise HttpError(status)
+            if overloaded:
+                raise HttpError(429)
+            return f"answer to {prompt}"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def make_gateway(client, **options):
+    settings = dict(requests_per_minute=60000, tokens_per_minute=10 ** 7, max_concurrency=8,
+                    backoff_base=0.01, backoff_max=1.0)
+    settings.update(options)
+    return ModelGateway(client, **settings)
+
+
+def test_throttled_and_transient_failures_are_retried_with_growing_backoff(monkeypatch):
+    monkeypatch.setattr(model_gateway.random, "uniform", lambda low, high: high)
+    client = FakeClient(statuses=[429, 503, 429])
+    gateway = make_gateway(client)
+    delays = []
+    backoff = gateway.backoff
+    gateway.backoff = lambda attempt: delays.append(backoff(attempt)) or delays[-1]
+
+    start = time.perf_counter()
+    assert gateway.generate("model", "prompt") == "answer to prompt"
+
+    assert client.attempts == 4
+    assert delays == [0.01, 0.02, 0.04]
+    assert time.perf_counter() - start >= sum(delays)
+    stats = gateway.stats()
+    assert (stats["retries"], stats["throttled"], stats["succeeded"]) == (3, 2, 1)
+
+
+def test_errors_that_retrying_cannot_fix_fail_at_once():
+    client = FakeClient(statuses=[400])
+    gateway = make_gateway(client)
+
+    with pytest.raises(ModelGatewayError):
+        gateway.generate("model", "prompt")
+    assert client.attempts == 1
+
+
+def test_retries_give_up_after_max_retries():
+    client = FakeClient(statuses=[503] * 10)
+    gateway = make_gateway(client, max_retries=2)
+
+    with pytest.raises(ModelGatewayError):
+        gateway.generate("model", "prompt")
+    assert client.attempts == 3
+    assert gateway.stats()["failed"] == 1
+
+
+def test_aimd_halves_on_throttling_and_recovers():
+    limiter = AdaptiveConcurrency(8, cooldown=0.0)
+
+    for expected in (4, 2, 1, 1):
+        limiter.acquire()
+        limiter.release(throttled=True)
+        assert limiter.limit == expected
+
+    for _ in range(60):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 8
+
+
+def test_aimd_backs_off_once_per_burst_of_throttling():
+    limiter = AdaptiveConcurrency(8, cooldown=60.0)
+    for _ in range(4):
+        limiter.acquire()
+    for _ in range(4):
+        limiter.release(throttled=True)
+    assert limiter.limit == 4
+
+
+def test_gateway_concurrency_follows_server_throttling():
+    client = FakeClient(max_concurrent=2, latency=0.02)
+    gateway = make_gateway(client, max_retries=10)
+    gateway.concurrency.cooldown = 0.0
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        answers = list(executor.map(lambda i: gateway.generate("model", f"prompt {i}"), range(24)))
+
+    assert answers == [f"answer to prompt {i}" for i in range(24)]
+    assert gateway.stats()["throttled"] > 0
+    assert gateway.concurrency.limit < 8
+
+    # Once the server stops throttling, successes raise the limit back to the maximum
+    client.latency = 0.0
+    for i in range(60):
+        gateway.generate("model", f"prompt {i}")
+    assert gateway.stats()["concurrency_limit"] == 8
+
+
+def test_token_bucket_caps_the_request_rate():
+    bucket = TokenBucket(rate_per_minute=1200, capacity=1)
+
+    start = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    elapsed = time.perf_counter() - start
+
+    # One token up front, then ten more at 20 per second
+    assert elapsed >= 0.45
+    assert not bucket.acquire(timeout=0.0)
+
+
+def test_token_bucket_allows_a_burst_up_to_its_capacity():
+    bucket = TokenBucket(rate_per_minute=60, capacity=5)
+
+    start = time.perf_counter()
+    for _ in range(5):
+        assert bucket.acquire(timeout=0.0)
+    assert time.perf_counter() - start < 0.1
+    assert not bucket.acquire(timeout=0.0)
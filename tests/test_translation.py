@@ -0,0 +1,58 @@
+import pytest
+
+from translation import MAX_CHARACTERS_PER_REQUEST, MAX_SEGMENTS_PER_REQUEST, Translator, chunk_texts
+
+
+class FakeTranslateClient:
+    """Uppercases texts; rejects requests over a character limit, or every request when down"""
+
+    def __init__(self, down=False, max_characters=MAX_CHARACTERS_PER_REQUEST):
+        self.down = down
+        self.max_characters = max_characters
+        self.requests = []
+
+    def translate(self, texts, target_language, format_):
+        self.requests.append(list(texts))
+        if self.down:
+            raise RuntimeError("503 Service Unavailable")
+        if len(texts) > 1 and sum(len(text) for text in texts) > self.max_characters:
+            raise RuntimeError("400 Request payload size exceeds the limit")
+        return [{"translatedText": text.upper()} for text in texts]
+
+
+def test_chunks_respect_segment_and_character_limits():
+    texts = [f"clause {i} " * 500 for i in range(40)] + [f"label {i}" for i in range(300)]
+
+    chunks = chunk_texts(texts)
+
+    assert [text for chunk in chunks for text in chunk] == texts
+    for chunk in chunks:
+        assert len(chunk) <= MAX_SEGMENTS_PER_REQUEST
+        assert sum(len(text) for text in chunk) <= MAX_CHARACTERS_PER_REQUEST
+
+
+def test_long_clauses_are_translated_in_several_requests(tmp_path):
+    client = FakeTranslateClient()
+    translator = Translator(client, str(tmp_path / "translations.sqlite3"))
+    texts = [f"clause {i} " * 500 for i in range(40)]
+
+    assert translator.translate_many(texts, "fr") == [text.upper() for text in texts]
+    assert len(client.requests) > 1
+
+
+def test_a_rejected_chunk_falls_back_to_one_request_per_string(tmp_path):
+    # The API rejects a chunk that fits our character limit, e.g. on bytes of non-Latin text
+    client = FakeTranslateClient(max_characters=15)
+    translator = Translator(client, str(tmp_path / "translations.sqlite3"))
+
+    assert translator.translate_many(["short one", "short two"], "fr") == ["SHORT ONE", "SHORT TWO"]
+    assert [len(request) for request in client.requests] == [2, 1, 1]
+
+
+def test_an_unavailable_api_fails_fast(tmp_path):
+    client = FakeTranslateClient(down=True)
+    translator = Translator(client, str(tmp_path / "translations.sqlite3"))
+
+    with pytest.raises(RuntimeError):
+        translator.translate_many(["one", "two", "three"], "fr")
+    assert len(client.requests) == 2
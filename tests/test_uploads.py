@@ -0,0 +1,84 @@
+import os
+import tracemalloc
+import uuid
+
+import pytest
+from flask import Flask, jsonify, request
+
+from config import Config
+from uploads import UploadRequest
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "UPLOAD_SPOOL_BYTES", 1024 * 1024)
+    monkeypatch.setattr(Config, "MAX_UPLOAD_BYTES", 32 * 1024 * 1024)
+    monkeypatch.setattr(Config, "UPLOAD_TMP_DIR", str(tmp_path))
+
+    app = Flask(__name__)
+    app.request_class = UploadRequest
+
+    @app.route("/upload", methods=["POST"])
+    def upload():
+        stream = request.files["file"].stream
+        stream.seek(0, os.SEEK_END)
+        return jsonify({"path": getattr(stream, "name", None), "size": stream.tell()})
+
+    return app.test_client()
+
+
+def write_multipart(path, size):
+    """A multipart body holding one file part of `size` bytes, written without holding it in memory"""
+    boundary = uuid.uuid4().hex
+    with open(path, "wb") as body:
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="scan.pdf"\r\n'
+                   f'Content-Type: application/pdf\r\n\r\n'.encode())
+        chunk = b"%PDF" * (64 * 1024 // 4)
+        for _ in range(size // len(chunk)):
+            body.write(chunk)
+        body.write(f"\r\n--{boundary}--\r\n".encode())
+    return boundary
+
+
+def post(client, path, boundary):
+    with open(path, "rb") as body:
+        return client.post("/upload", input_stream=body, content_length=os.path.getsize(path),
+                           content_type=f"multipart/form-data; boundary={boundary}")
+
+
+def test_large_upload_is_spooled_to_disk_within_a_memory_ceiling(client, tmp_path):
+    size = 16 * 1024 * 1024
+    body_path = tmp_path / "body"
+    boundary = write_multipart(body_path, size)
+
+    tracemalloc.start()
+    try:
+        response = post(client, body_path, boundary)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert response.status_code == 200
+    assert response.json["size"] == size
+    assert os.path.dirname(response.json["path"]) == str(tmp_path)
+    assert peak < 2 * 1024 * 1024
+
+
+def test_small_upload_stays_in_memory(client, tmp_path):
+    body_path = tmp_path / "body"
+    boundary = write_multipart(body_path, 64 * 1024)
+
+    response = post(client, body_path, boundary)
+
+    assert response.status_code == 200
+    assert response.json["path"] is None
+
+
+def test_upload_over_the_size_cap_is_rejected_before_reading(client, tmp_path):
+    body_path = tmp_path / "body"
+    boundary = write_multipart(body_path, 33 * 1024 * 1024)
+
+    response = post(client, body_path, boundary)
+
+    assert response.status_code == 413
+    assert os.listdir(tmp_path) == ["body"]
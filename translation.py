@@ -0,0 +1,148 @@
+import hashlib
+import re
+import threading
+from contextlib import nullcontext
+
+from cache import ResultCache
+
+
+# Languages offered by the language selector in static/js/script.js (besides English)
+SUPPORTED_LANGUAGES = ['hi', 'es', 'fr', 'de', 'pt', 'it', 'ja', 'zh', 'ar']
+
+# The static UI labels script.js sends to /translate_bulk on every language switch
+UI_LABELS = [
+    'LegisLens', 'Your Legal Document Assistant',
+    'Upload any legal document and get instant, easy-to-understand analysis of important clauses and potential risks',
+    'Get Started', 'Upload your contract, agreement, or any legal document', 'Drop your document here',
+    'Supports PDF and Word documents', 'or', 'Choose File', 'Secure & Private', 'Instant Analysis', 'Multi-Language',
+    'Analyzing Your Document',
+    "We're reading through your document and identifying important clauses...",
+    'Translating Content', "We're translating the interface and document content...",
+    'Document Summary', "Here's what we found in your document", 'Important Clauses',
+    'Click any clause to see details', 'High Risk', 'Medium Risk', 'Low Risk', 'Select a Clause',
+    'Choose any clause from the list to see a detailed explanation in plain English', 'What This Means',
+    'Original Text', 'Ask Questions', 'Have questions? Ask me!', 'Ask about your document...',
+    "Hi! I've analyzed your document. Feel free to ask me questions like:",
+    'What are the main risks?', 'Can I cancel this agreement?', 'What are my obligations?', 'Send', 'Export PDF'
+]
+
+# Google Cloud Translation v2 accepts at most 128 segments per request, and recommends
+# keeping a request under 30k characters (larger payloads are rejected)
+MAX_SEGMENTS_PER_REQUEST = 128
+MAX_CHARACTERS_PER_REQUEST = 30000
+
+
+# End of a sentence: terminal punctuation, optional closing quotes or brackets, then whitespace
+_SENTENCE_END_RE = re.compile(r'[.!?。！？]["\')\]]*\s+')
+
+
+def split_complete_sentences(text):
+    """Split streamed text into (complete sentences, unfinished remainder)"""
+    end = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        end = match.end()
+    return text[:end], text[end:]
+
+
+def chunk_texts(texts, max_segments=MAX_SEGMENTS_PER_REQUEST, max_characters=MAX_CHARACTERS_PER_REQUEST):
+    """Group texts into request-sized chunks by segment count and total characters.
+
+    A text longer than max_characters on its own goes out as a chunk by itself.
+    """
+    chunks = []
+    current = []
+    characters = 0
+    for text in texts:
+        if current and (len(current) >= max_segments or characters + len(text) > max_characters):
+            chunks.append(current)
+            current = []
+            characters = 0
+        current.append(text)
+        characters += len(text)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def translation_key(text, target_language):
+    """Cache key for a translation: hash of the exact source text plus the target language.
+
+    The ':text' suffix keeps plain-text translations apart from the
+    HTML-escaped ones cached before format_='text' was requested.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest() + ':' + target_language + ':text'
+
+
+class Translator:
+    """Translates many strings per API call and caches every translation persistently.
+
+    With a MetricsRegistry, each API call is timed as the "translation_api" stage.
+    """
+
+    def __init__(self, client, cache_path, max_entries=100000, ttl_seconds=None, metrics=None):
+        self.client = client
+        self.metrics = metrics
+        self.cache = ResultCache(cache_path, table='translations', max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def translate_many(self, texts, target_language):
+        """Translate a list of strings, returning translations in the same order.
+
+        Cached strings cost nothing; the rest go out in as few batched API
+        calls as possible. Empty strings are returned unchanged.
+        """
+        results = list(texts)
+        pending = {}
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            cached = self.cache.get(translation_key(text, target_language))
+            if cached is not None:
+                results[i] = cached
+            else:
+                # Translate each distinct string once even if it appears several times
+                pending.setdefault(text, []).append(i)
+
+        for chunk in chunk_texts(list(pending)):
+            translated = self._translate_chunk(chunk, target_language)
+            # One transaction (and at most one eviction pass) per API batch
+            self.cache.set_many(
+                (translation_key(text, target_language), item['translatedText']) for text, item in zip(chunk, translated)
+            )
+            for text, item in zip(chunk, translated):
+                for i in pending[text]:
+                    results[i] = item['translatedText']
+
+        return results
+
+    def _translate_chunk(self, chunk, target_language):
+        """One API call for the chunk; if it is rejected, one call per string so one bad string cannot sink the rest"""
+        try:
+            return self._call_api(chunk, target_language)
+        except Exception as e:
+            if len(chunk) == 1:
+                raise
+            print(f"Translation of {len(chunk)} strings failed, retrying them one by one: {e}")
+        # A failure here (e.g. the API is down) is raised on the first string instead of once per string
+        return [self._call_api([text], target_language)[0] for text in chunk]
+
+    def _call_api(self, texts, target_language):
+        with self.metrics.span('translation_api') if self.metrics else nullcontext():
+            # Plain text, not HTML: the reports and the UI escape translations themselves
+            return self.client.translate(texts, target_language=target_language, format_='text')
+
+    def translate(self, text, target_language):
+        """Translate a single string through the cache"""
+        return self.translate_many([text], target_language)[0]
+
+    def prewarm(self, texts=UI_LABELS, languages=SUPPORTED_LANGUAGES):
+        """Translate the static UI labels into every supported language in a background thread"""
+        def run():
+            for language in languages:
+                try:
+                    self.translate_many(texts, language)
+                except Exception as e:
+                    print(f"Translation pre-warm failed for {language}: {e}")
+
+        thread = threading.Thread(target=run, name='translation-prewarm', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,32 @@
+import tempfile
+import threading
+from io import BytesIO
+
+from flask import Request
+
+from config import Config
+
+
+# Caps the number of uploads parsed at once by this process; the rest wait with their file on disk
+extraction_slots = threading.BoundedSemaphore(max(1, Config.MAX_CONCURRENT_EXTRACTIONS))
+
+
+class UploadRequest(Request):
+    """Request that rejects oversized bodies up front and spools large file parts to named temp files.
+
+    The body size is checked against Content-Length before anything is read
+    (and enforced while reading chunked bodies), answering 413. Small file
+    parts stay in memory; larger ones are written to disk as they arrive, so
+    extraction can memory-map them and hand worker processes a path.
+    """
+
+    @property
+    def max_content_length(self):
+        if self.path == '/batch':
+            return Config.MAX_BATCH_UPLOAD_BYTES
+        return Config.MAX_UPLOAD_BYTES
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= Config.UPLOAD_SPOOL_BYTES:
+            return BytesIO()
+        return tempfile.NamedTemporaryFile('w+b', prefix='upload-', dir=Config.UPLOAD_TMP_DIR)
@@ -0,0 +1,15 @@
+import time
+
+
+# Standalone job worker for JOB_WORKER_MODE=external: python worker.py
+# app is imported under the guard so spawned extraction workers, which re-import this script, stay light
+if __name__ == '__main__':
+    from app import job_worker
+
+    job_worker.start()
+    print(f"Job worker running with {job_worker.concurrency} threads")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        job_worker.stop()